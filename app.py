@@ -6,23 +6,45 @@ Adapted by Le Guillouzic Maël from : Lennart Rikk
 Available for personal and educational use only.
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
-from gtts import gTTS
-import whisper
+from flask import Flask, Request, render_template, request, jsonify, Response, send_file
 import io
 import os
-import base64
-import tempfile
-import subprocess
-import warnings
 import platform
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from shutil import which
 
+from audio_utils import decode_pcm_and_mp3, decode_to_pcm, encode_mp3
+from cache import MemoryCache, TieredCache, make_key
+from media import ArtifactStore, send_bytes, send_media_file
+from storage import JSONStorage, SQLiteStorage
+from vocab_index import SuggestionIndex
+import assets
+import evaluation
+import jobs
+import metrics
+import profiling
+import tts
+import fluency
+import streaming
+import vad
+import whisper_service
+
+class InMemoryRequest(Request):
+    """Keep uploaded files in memory instead of spooling large ones to temp files"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Uploads are bounded by MAX_CONTENT_LENGTH
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
+# Per-route timings and counters for /metrics, Server-Timing header on every response
+metrics.init_app(app)
 
 # New data directory structure
 DATA_DIR = Path(__file__).parent / 'data'
@@ -63,57 +85,35 @@ CONFIG_FILE = DATA_DIR / 'config.json'
 UPLOADS_DIR = DATA_DIR / 'uploads'
 UPLOADS_DIR.mkdir(exist_ok=True)
 
-# Helper functions for JSON prompt management (Tasks 2, 3, 4, 5, 6)
+# Storage backend: 'json' (one file per kind of data, prompt banks served from
+# memory) or 'sqlite' (data/app.db, row-level writes). See storage.py.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+SQLITE_DB = DATA_DIR / 'app.db'
+if STORAGE_BACKEND == 'sqlite':
+    storage = SQLiteStorage(SQLITE_DB)
+else:
+    storage = JSONStorage(
+        {2: TASK2_PROMPTS, 3: TASK3_PROMPTS, 4: TASK4_PROMPTS, 5: TASK5_PROMPTS, 6: TASK6_PROMPTS},
+        PROMPTS_FILE, VOCABULARY_FILE, CONFIG_FILE
+    )
+
+# Helper functions for prompt management (Tasks 2, 3, 4, 5, 6)
 def load_task_prompts(task_num):
-    """Load prompts for a specific task from JSON (Task 2, 3, 4, 5, 6)"""
-    if task_num == 1:
-        # Task 1 uses plain text file
-        return {"prompts": []}
-
-    prompt_files = {
-        2: TASK2_PROMPTS,
-        3: TASK3_PROMPTS,
-        4: TASK4_PROMPTS,
-        5: TASK5_PROMPTS,
-        6: TASK6_PROMPTS
-    }
-
-    file_path = prompt_files.get(task_num)
-    if not file_path or not file_path.exists():
-        return {"prompts": []}
-
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading Task {task_num} prompts: {e}")
-        return {"prompts": []}
+    """Load prompts for a specific task (Task 2, 3, 4, 5, 6); the result may be shared, save it after changes"""
+    # Task 1 uses plain text file
+    with metrics.stage('prompts'):
+        return storage.load_task_prompts(task_num)
 
 def save_task_prompts(task_num, data):
-    """Save prompts for a specific task to JSON (Task 2, 3, 4, 5, 6)"""
-    if task_num == 1:
-        # Task 1 uses plain text file
-        return False
-
-    prompt_files = {
-        2: TASK2_PROMPTS,
-        3: TASK3_PROMPTS,
-        4: TASK4_PROMPTS,
-        5: TASK5_PROMPTS,
-        6: TASK6_PROMPTS
-    }
+    """Save prompts for a specific task (Task 2, 3, 4, 5, 6)"""
+    with metrics.stage('prompts'):
+        return storage.save_task_prompts(task_num, data)
 
-    file_path = prompt_files.get(task_num)
-    if not file_path:
-        return False
-
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Error saving Task {task_num} prompts: {e}")
-        return False
+def first_prompt_field(task_num, field):
+    """`field` of the task's first prompt, shown by default on its practice page"""
+    with metrics.stage('prompts'):
+        prompt = storage.first_prompt(task_num)
+    return prompt.get(field, '') if prompt else ''
 
 def get_audio_dir(task_num):
     """Get the audio directory for a specific task"""
@@ -205,64 +205,167 @@ def check_ffmpeg_installed():
 
         return False
 
-# Initialize Whisper model
-print("Loading Whisper model (this may take a minute)...")
-whisper_model = whisper.load_model("base")
-print("Whisper model loaded!")
+# Whisper startup mode: 'background' (default), 'lazy' or 'eager'.
+# Heavy imports (whisper/torch, gtts, openai) are deferred so pages are served right away.
+WHISPER_STARTUP = os.environ.get('WHISPER_STARTUP', 'background')
+# How long /transcribe waits for the model before answering 503
+WHISPER_READY_TIMEOUT = float(os.environ.get('WHISPER_READY_TIMEOUT', '20'))
+# Number of Whisper worker processes (0 = transcribe in the web process)
+WHISPER_WORKERS = int(os.environ.get('WHISPER_WORKERS', '0'))
+# Load the model once in the web process and fork the workers from it, sharing
+# its weights copy-on-write (WHISPER_PRELOAD=1, see serve.py)
+WHISPER_PRELOAD = os.environ.get('WHISPER_PRELOAD', '0') == '1'
+# Torch threads per worker process (0 = torch's default, all the cores)
+WHISPER_THREADS = int(os.environ.get('WHISPER_THREADS', '0'))
+# Maximum number of recordings waiting for a free worker
+WHISPER_QUEUE_SIZE = int(os.environ.get('WHISPER_QUEUE_SIZE', '8'))
+# Maximum time a request waits for its transcription
+WHISPER_JOB_TIMEOUT = float(os.environ.get('WHISPER_JOB_TIMEOUT', '300'))
+# Model size (tiny, base, small...) and int8 dynamic quantization (CPU only)
+WHISPER_MODEL = os.environ.get('WHISPER_MODEL', whisper_service.WHISPER_MODEL_NAME)
+WHISPER_QUANTIZE = os.environ.get('WHISPER_QUANTIZE', '0') == '1'
+# Default decode profile ('fast', 'balanced', 'accurate'); "whisper": {"profile": ...}
+# in config.json overrides it, and requests can pass their own
+WHISPER_PROFILE = os.environ.get('WHISPER_PROFILE', whisper_service.DEFAULT_PROFILE)
+# Only feed the speech regions of recordings to Whisper (WHISPER_VAD=0 to disable)
+WHISPER_VAD = os.environ.get('WHISPER_VAD', '1') == '1'
+APP_STARTED_AT = time.time()
+
+whisper_service.configure(WHISPER_MODEL, quantize=WHISPER_QUANTIZE)
+
+# Decoding settings used for uploaded recordings (the decode profile is added to them).
+# Word timestamps feed the fluency metrics; the disfluent prompt keeps the fillers.
+TRANSCRIBE_OPTIONS = {'language': 'en', 'task': 'transcribe', 'word_timestamps': True,
+                      'initial_prompt': fluency.FILLER_PROMPT}
+
+# Transcription cache: keyed by the audio bytes and model/decoding settings
+TRANSCRIPT_CACHE_DIR = DATA_DIR / 'cache' / 'transcripts'
+transcript_cache = TieredCache(
+    memory_bytes=int(os.environ.get('TRANSCRIPT_CACHE_MEMORY_MB', '16')) * 1024 * 1024,
+    directory=TRANSCRIPT_CACHE_DIR,
+    disk_bytes=int(os.environ.get('TRANSCRIPT_CACHE_DISK_MB', '64')) * 1024 * 1024,
+    suffix='.json'
+)
+
+# Generated media (TTS audio, MP3 recordings), downloaded from /media/<id>
+media_artifacts = ArtifactStore(
+    max_bytes=int(os.environ.get('MEDIA_MEMORY_MB', '64')) * 1024 * 1024,
+    ttl=int(os.environ.get('MEDIA_TTL_SECONDS', '3600'))
+)
+# Cache lifetime of the per-task audio library (revalidated with ETags)
+TASK_AUDIO_MAX_AGE = int(os.environ.get('TASK_AUDIO_MAX_AGE', '86400'))
+
+# Text-to-speech cache keyed by (text, lang, engine)
+TTS_CACHE_DIR = DATA_DIR / 'cache' / 'tts'
+TTS_MAX_AGE = 365 * 24 * 3600
+# Set TTS_PRERENDER=1 to render all prompts in the background at startup
+TTS_PRERENDER = os.environ.get('TTS_PRERENDER', '0') == '1'
+
+# GPT feedback already given for a response (same task, context and transcript)
+feedback_cache = MemoryCache(
+    max_bytes=int(os.environ.get('FEEDBACK_CACHE_MB', '8')) * 1024 * 1024,
+    ttl=int(os.environ.get('FEEDBACK_CACHE_TTL_SECONDS', '86400'))
+)
+
+# Recordings handed over as background jobs (transcription, then optional evaluation)
+transcription_jobs = jobs.JobQueue(
+    workers=int(os.environ.get('JOB_WORKERS', '2')),
+    max_pending=int(os.environ.get('JOB_QUEUE_SIZE', '32'))
+)
+
+# Evaluations of a complete test run in parallel, at most this many at a time
+EVALUATION_CONCURRENCY = int(os.environ.get('EVALUATION_CONCURRENCY', '4'))
+# Largest number of responses accepted by one batch evaluation
+EVALUATION_BATCH_MAX = 12
+evaluation_executor = ThreadPoolExecutor(max_workers=EVALUATION_CONCURRENCY, thread_name_prefix='evaluate')
+
+# OpenAI clients reused across evaluations (one connection pool per API key)
+openai_clients = evaluation.ClientPool(
+    max_clients=int(os.environ.get('OPENAI_MAX_CLIENTS', '32')),
+    idle_seconds=int(os.environ.get('OPENAI_CLIENT_IDLE_SECONDS', '600')),
+    connect_timeout=float(os.environ.get('OPENAI_CONNECT_TIMEOUT', '5')),
+    read_timeout=float(os.environ.get('OPENAI_READ_TIMEOUT', '60'))
+)
+
+# On-demand profiling of single requests (see profiling.py): PROFILE_REQUESTS=1 profiles
+# every request, PROFILE_TOKEN=<secret> only those sent with "X-Profile: <secret>"
+request_profiler = profiling.RequestProfiler(
+    DATA_DIR / 'profiles',
+    every_request=os.environ.get('PROFILE_REQUESTS', '0') == '1',
+    token=os.environ.get('PROFILE_TOKEN'),
+    keep=int(os.environ.get('PROFILE_KEEP', '50'))
+)
+request_profiler.init_app(app)
+
+# Content-hashed, precompressed copies of static/ served from /assets/ with
+# immutable caching; templates link to them with asset_url() (see assets.py)
+static_assets = assets.StaticAssets(Path(__file__).parent / 'static', DATA_DIR / 'cache' / 'assets')
+static_assets.init_app(app)
 
 # Check ffmpeg availability
 FFMPEG_AVAILABLE = check_ffmpeg_installed()
 FFMPEG_PATH = find_ffmpeg()
 
+tts.configure(TTS_CACHE_DIR, int(os.environ.get('TTS_CACHE_DISK_MB', '256')) * 1024 * 1024,
+              ffmpeg_path=FFMPEG_PATH if FFMPEG_AVAILABLE else None)
+
 def load_prompts():
-    """Load prompts from file"""
-    try:
-        if PROMPTS_FILE.exists():
-            with open(PROMPTS_FILE, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-    except Exception as e:
-        print(f"Error loading prompts: {e}")
-    return ""
+    """Load Task 1 prompts (one per line)"""
+    with metrics.stage('prompts'):
+        return storage.load_task1_prompts()
+
+def split_prompt_lines(content):
+    """Task 1 prompts file content -> list of questions"""
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+def tts_prompt_texts():
+    """Every text the practice pages read aloud: Task 1 questions and task questions"""
+    texts = split_prompt_lines(load_prompts())
+    for task_num in [2, 3, 4, 5, 6]:
+        for prompt in load_task_prompts(task_num).get('prompts', []):
+            if prompt.get('question'):
+                texts.append(prompt['question'])
+    return texts
+
+def tts_settings():
+    """TTS engine chain from the "tts" section of config.json (see tts.py)"""
+    return load_config().get('tts', {})
 
 def load_vocabulary_cards():
-    """Load vocabulary cards from file"""
-    try:
-        if VOCABULARY_FILE.exists():
-            with open(VOCABULARY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading vocabulary cards: {e}")
-    return []
+    """Load vocabulary cards"""
+    with metrics.stage('vocabulary'):
+        return storage.load_vocabulary_cards()
 
 def save_vocabulary_cards(cards):
-    """Save vocabulary cards to file"""
+    """Replace all vocabulary cards"""
+    with metrics.stage('vocabulary'):
+        saved = storage.save_vocabulary_cards(cards)
+    suggestion_index.reset()
+    return saved
+
+# Words the evaluator already suggested alternatives for, kept up to date by the card routes
+suggestion_index = SuggestionIndex(load_vocabulary_cards)
+
+def previous_suggestions_context(closing):
+    """Prompt paragraph listing the words already worked on, or '' for an empty deck"""
     try:
-        with open(VOCABULARY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cards, f, indent=2, ensure_ascii=False)
-        return True
+        previous_suggestions = suggestion_index.top(15)
     except Exception as e:
-        print(f"Error saving vocabulary cards: {e}")
-        return False
+        print(f"Error loading previous suggestions: {e}")
+        return ""
+    if not previous_suggestions:
+        return ""
+    return f"\n\n**IMPORTANT - Previous Vocabulary Work:**\nYou have already suggested alternatives for: {', '.join(previous_suggestions)}.\nIt's okay to mention them ONCE if they reappear, but PRIORITIZE NEW, DIFFERENT vocabulary. {closing}"
 
 def load_config():
-    """Load config from file"""
-    try:
-        if CONFIG_FILE.exists():
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading config: {e}")
-    return {}
+    """Load config"""
+    with metrics.stage('config'):
+        return storage.load_config()
 
 def save_config(config):
-    """Save config to file"""
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Error saving config: {e}")
-        return False
+    """Save config"""
+    with metrics.stage('config'):
+        return storage.save_config(config)
 
 @app.route('/')
 def index():
@@ -271,46 +374,10 @@ def index():
     api_key = config.get('api_key', '')
 
     # Load saved content for all tasks
-    task1_content = ''
-    if PROMPTS_FILE.exists():
-        try:
-            with open(PROMPTS_FILE, 'r', encoding='utf-8') as f:
-                task1_content = f.read()
-        except Exception as e:
-            print(f"Error loading Task 1 prompts: {e}")
-
-    task2_content = ''
-    if TASK2_FILE.exists():
-        try:
-            with open(TASK2_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Extract reading from first prompt in the prompts array
-                if 'prompts' in data and len(data['prompts']) > 0:
-                    task2_content = data['prompts'][0].get('reading', '')
-        except Exception as e:
-            print(f"Error loading Task 2 content: {e}")
-
-    task3_content = ''
-    if TASK3_FILE.exists():
-        try:
-            with open(TASK3_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Extract reading from first prompt in the prompts array
-                if 'prompts' in data and len(data['prompts']) > 0:
-                    task3_content = data['prompts'][0].get('reading', '')
-        except Exception as e:
-            print(f"Error loading Task 3 content: {e}")
-
-    task4_content = ''
-    if TASK4_FILE.exists():
-        try:
-            with open(TASK4_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Extract notes from first prompt in the prompts array
-                if 'prompts' in data and len(data['prompts']) > 0:
-                    task4_content = data['prompts'][0].get('notes', '')
-        except Exception as e:
-            print(f"Error loading Task 4 content: {e}")
+    task1_content = load_prompts()
+    task2_content = first_prompt_field(2, 'reading')
+    task3_content = first_prompt_field(3, 'reading')
+    task4_content = first_prompt_field(4, 'notes')
 
     return render_template('index.html',
                          api_key=api_key,
@@ -337,8 +404,14 @@ def save_prompts():
     try:
         data = request.get_json()
         prompts = data.get('prompts', '')
-        with open(PROMPTS_FILE, 'w', encoding='utf-8') as f:
-            f.write(prompts)
+        old_questions = set(split_prompt_lines(load_prompts()))
+        with metrics.stage('prompts'):
+            storage.save_task1_prompts(prompts)
+
+        # Drop audio of edited/removed questions, render the new ones ahead of time
+        new_questions = set(split_prompt_lines(prompts))
+        tts.invalidate(old_questions - new_questions)
+        tts.prerender_in_background(new_questions - old_questions, settings=tts_settings())
         return jsonify({'success': True, 'message': 'Prompts saved successfully!'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -348,9 +421,9 @@ def save_config_route():
     """Save config (API key) to file"""
     try:
         data = request.get_json()
-        config = load_config()
-        config['api_key'] = data.get('api_key', '')
-        if save_config(config):
+        with metrics.stage('config'):
+            saved = storage.set_config_value('api_key', data.get('api_key', ''))
+        if saved:
             return jsonify({'success': True, 'message': 'Config saved successfully!'})
         else:
             return jsonify({'success': False, 'error': 'Failed to save config'}), 500
@@ -371,8 +444,6 @@ def add_vocabulary_card():
     """Add a new vocabulary card"""
     try:
         data = request.get_json()
-        cards = load_vocabulary_cards()
-
         new_card = {
             'date': data.get('date'),
             'question': data.get('question'),
@@ -380,9 +451,10 @@ def add_vocabulary_card():
             'content': data.get('content')
         }
 
-        cards.append(new_card)
-
-        if save_vocabulary_cards(cards):
+        with metrics.stage('vocabulary'):
+            saved = storage.add_vocabulary_card(new_card)
+        if saved:
+            suggestion_index.add_card(new_card)
             return jsonify({'success': True, 'message': 'Vocabulary card saved!'})
         else:
             return jsonify({'success': False, 'error': 'Failed to save'}), 500
@@ -393,22 +465,18 @@ def add_vocabulary_card():
 def delete_vocabulary_card(index):
     """Delete a vocabulary card by index"""
     try:
-        cards = load_vocabulary_cards()
-
-        if 0 <= index < len(cards):
-            cards.pop(index)
-            if save_vocabulary_cards(cards):
-                return jsonify({'success': True, 'message': 'Card deleted!'})
-            else:
-                return jsonify({'success': False, 'error': 'Failed to save'}), 500
-        else:
+        with metrics.stage('vocabulary'):
+            card = storage.delete_vocabulary_card(index)
+        if card is None:
             return jsonify({'error': 'Invalid index'}), 400
+        suggestion_index.remove_card(card)
+        return jsonify({'success': True, 'message': 'Card deleted!'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/create_audio', methods=['POST'])
 def create_audio():
-    """Create audio from text using gTTS"""
+    """Create audio from text with the configured TTS engine chain"""
     try:
         data = request.get_json()
         text = data.get('text', '')
@@ -416,110 +484,461 @@ def create_audio():
         if not text:
             return jsonify({'error': 'No text provided'}), 400
 
-        # Create audio
-        tts = gTTS(text=text, lang='en')
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)
-
-        # Convert to base64
-        audio_b64 = base64.b64encode(mp3_fp.read()).decode()
+        # Known questions are served from the on-disk TTS cache
+        settings = tts_settings()
+        with metrics.stage('tts'):
+            key, mp3_data, cache_hit = tts.synthesize(text, lang='en', settings=settings)
+        metrics.cache_result('tts', cache_hit)
+        with metrics.stage('store'):
+            if tts.cached_path(key) is not None:
+                audio_id, audio_url = key, f'/tts/{key}.mp3'
+            else:
+                audio_id, audio_url = store_media(mp3_data)
+        return jsonify({'audio_id': audio_id, 'audio_url': audio_url, 'cached': cache_hit})
 
-        return jsonify({'audio': audio_b64})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
+@app.route('/tts/<key>.mp3')
+def serve_tts_audio(key):
+    """Serve a cached TTS rendering; the key is a content hash, so it never changes"""
+    path = tts.cached_path(key)
+    if path is None:
+        return jsonify({'error': 'Audio not found'}), 404
+    response = send_media_file(path, max_age=TTS_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/tts/invalidate', methods=['POST'])
+def invalidate_tts():
+    """Drop cached TTS audio for some texts ({"texts": [...]}) or everything ({"all": true})"""
+    try:
+        data = request.get_json() or {}
+        if data.get('all'):
+            dropped = tts.clear()
+        else:
+            dropped = tts.invalidate(data.get('texts', []))
+        return jsonify({'success': True, 'dropped': dropped})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def feedback_event_stream(pieces, cached=False):
+    """SSE response relaying evaluation.stream() pieces ('delta' events, then 'done')"""
+    return Response(evaluation.sse_feedback(pieces, cached=cached), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no',
+                             'X-Cache': 'HIT' if cached else 'MISS'})
+
+def feedback_response(feedback, cached):
+    response = jsonify({'feedback': feedback, 'cached': cached})
+    response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+    return response
+
+def cached_feedback(data, key):
+    """Feedback already given for this response, unless the request asks for a fresh one ("no_cache": true)"""
+    if data.get('no_cache'):
+        return None
+    with metrics.stage('cache_read'):
+        feedback = feedback_cache.get(key)
+    metrics.cache_result('feedback', feedback is not None)
+    return feedback
+
+def store_feedback(key, feedback):
+    if feedback:
+        feedback_cache.set(key, feedback, size=len(feedback.encode('utf-8')))
+
+def storing_feedback(key, pieces):
+    """Relay streamed feedback pieces, caching the feedback once it is complete"""
+    parts = []
+    for piece in pieces:
+        parts.append(piece)
+        yield piece
+    store_feedback(key, ''.join(parts))
+
+class TranscriptionUnavailable(Exception):
+    """Whisper cannot take the request right now (model loading, queue full, pool too slow)"""
+
+    def __init__(self, message, retry_after, details=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.details = details or {}
+
+def unavailable_response(error):
+    """503 + Retry-After for a TranscriptionUnavailable error"""
+    response = jsonify({'error': str(error), **error.details})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def transcribe_options(profile=None):
+    """Whisper options for a recording: TRANSCRIBE_OPTIONS plus the decode profile's"""
+    profile = profile or load_config().get('whisper', {}).get('profile') or WHISPER_PROFILE
+    return {**TRANSCRIBE_OPTIONS, **whisper_service.decode_options(profile)}
+
+def requested_profile():
+    """Decode profile asked for by the request ('profile' field or query parameter), or an error response"""
+    profile = request.values.get('profile') or None
+    if profile is not None and profile not in whisper_service.DECODE_PROFILES:
+        return None, (jsonify({'error': f"Unknown decode profile '{profile}'",
+                               'profiles': list(whisper_service.DECODE_PROFILES)}), 400)
+    return profile, None
+
+def transcribe_recording(audio_bytes, with_mp3=False, profile=None):
+    """
+    Transcribe an uploaded recording, going through the transcription cache.
+    With `with_mp3`, the MP3 version is produced by the same ffmpeg pass
+    (None if it could not be produced).
+    Returns (payload, mp3_bytes or None, cache_hit).
+    """
+    options = transcribe_options(profile)
+    # Same recording + same model/decoding settings -> same transcript
+    cache_key = make_key(audio_bytes, whisper_service.settings(), options, vad.SETTINGS if WHISPER_VAD else None)
+    with metrics.stage('cache_read'):
+        cached = transcript_cache.get_json(cache_key)
+    metrics.cache_result('transcripts', cached is not None)
+    if cached is not None:
+        mp3_data = None
+        if with_mp3:
+            try:
+                with metrics.stage('encode'):
+                    mp3_data = encode_mp3(audio_bytes, FFMPEG_PATH)
+            except RuntimeError as e:
+                print(f"MP3 conversion failed: {e}")
+        return cached, mp3_data, True
+
+    with metrics.stage('model_wait'):
+        ready = whisper_service.wait_until_ready(WHISPER_READY_TIMEOUT)
+    if not ready:
+        raise TranscriptionUnavailable('Whisper model is still loading, please retry in a few seconds',
+                                       retry_after=5, details={'whisper': whisper_service.status()})
+
+    # Decode in memory (ffmpeg stdin -> 16 kHz float PCM on stdout), no temp file
+    mp3_data = None
+    with metrics.stage('decode'):
+        if with_mp3:
+            audio, mp3_data = decode_pcm_and_mp3(audio_bytes, FFMPEG_PATH)
+        else:
+            audio = decode_to_pcm(audio_bytes, FFMPEG_PATH or 'ffmpeg')
+
+    # Leading/trailing silence and long pauses are cut before inference;
+    # segment times are mapped back to the original recording
+    with metrics.stage('vad'):
+        trimmed = vad.trim(audio)
+    segments = []
+    if trimmed.has_speech or not WHISPER_VAD:
+        try:
+            with metrics.stage('whisper'):
+                result = whisper_service.transcribe(
+                    trimmed.audio if WHISPER_VAD else audio,
+                    timeout=WHISPER_JOB_TIMEOUT,
+                    verbose=False,
+                    **options
+                )
+        except whisper_service.PoolBusy as e:
+            raise TranscriptionUnavailable(str(e), retry_after=10)
+        except whisper_service.TranscriptionTimeout as e:
+            raise TranscriptionUnavailable(str(e), retry_after=30)
+        segments = trimmed.map_segments(result["segments"]) if WHISPER_VAD else result["segments"]
+
+    with metrics.stage('postprocess'):
+        payload = whisper_service.format_transcript(segments)
+        payload['duration'] = round(trimmed.original_duration, 2)
+        payload['speech_duration'] = round(trimmed.speech_duration, 2)
+        payload['fluency'] = fluency.metrics(segments)
+        if not segments:
+            payload['warning'] = 'No speech detected in the recording'
+    with metrics.stage('cache_write'):
+        transcript_cache.set_json(cache_key, payload)
+    return payload, mp3_data, False
+
+def store_media(data, mimetype='audio/mpeg', filename=None):
+    """Keep generated media for a while and return (id, download URL)"""
+    artifact_id = media_artifacts.put(data, mimetype=mimetype, filename=filename)
+    return artifact_id, f'/media/{artifact_id}'
+
+def read_upload(name='audio'):
+    """Bytes of an uploaded file (None if missing); the multipart body is parsed here, timed as 'upload'"""
+    with metrics.stage('upload'):
+        upload = request.files.get(name)
+        return upload.read() if upload is not None else None
+
 @app.route('/transcribe', methods=['POST'])
 def transcribe():
     """Transcribe audio using Whisper"""
     try:
-        if 'audio' not in request.files:
+        audio_bytes = read_upload()
+        if audio_bytes is None:
             return jsonify({'error': 'No audio file provided'}), 400
+        profile, error = requested_profile()
+        if error:
+            return error
 
-        audio_file = request.files['audio']
-
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as temp_audio:
-            audio_file.save(temp_audio.name)
-            temp_path = temp_audio.name
         try:
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
-                result = whisper_model.transcribe(
-                    temp_path,
-                    verbose=False,
-                    language="en",
-                    task="transcribe"
-                )
+            payload, _, cache_hit = transcribe_recording(audio_bytes, profile=profile)
+        except TranscriptionUnavailable as e:
+            return unavailable_response(e)
 
-            formatted_transcript = ""
-            word_count = 0
+        response = jsonify(payload)
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
 
-            for segment in result["segments"]:
-                start_time = segment["start"]
-                text = segment["text"].strip()
-                word_count += len(text.split())
-                formatted_transcript += f"[{start_time:.1f}s] {text}\n"
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-            return jsonify({
-                'transcript': formatted_transcript,
-                'word_count': word_count
-            })
+@app.route('/transcribe_with_mp3', methods=['POST'])
+def transcribe_with_mp3():
+    """Transcribe a recording and convert it to MP3 from a single upload and decode"""
+    try:
+        audio_bytes = read_upload()
+        if audio_bytes is None:
+            return jsonify({'error': 'No audio file provided'}), 400
+        if not FFMPEG_AVAILABLE or not FFMPEG_PATH:
+            return jsonify({'error': 'FFmpeg not installed. Please install FFmpeg to enable MP3 conversion.'}), 400
+        profile, error = requested_profile()
+        if error:
+            return error
 
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+        try:
+            payload, mp3_data, cache_hit = transcribe_recording(audio_bytes, with_mp3=True, profile=profile)
+        except TranscriptionUnavailable as e:
+            return unavailable_response(e)
+
+        if mp3_data is not None:
+            with metrics.stage('store'):
+                mp3_id, mp3_url = store_media(mp3_data, filename='recording.mp3')
+            response = jsonify({**payload, 'mp3_id': mp3_id, 'mp3_url': mp3_url})
+        else:
+            # Only the download is lost
+            response = jsonify({**payload, 'mp3_error': 'MP3 conversion failed'})
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/evaluate', methods=['POST'])
-def evaluate():
-    """Evaluate speaking response using OpenAI GPT"""
+@app.route('/media/<artifact_id>')
+def download_media(artifact_id):
+    """Stream generated media by ID (Range, ETag and caching supported)"""
+    artifact = media_artifacts.get(artifact_id)
+    if artifact is None:
+        return jsonify({'error': 'Media expired or not found'}), 404
+
+    # Content behind an ID never changes
+    download_name = artifact['filename'] if request.args.get('download') == '1' else None
+    return send_bytes(artifact['data'], artifact['mimetype'], artifact['etag'],
+                      max_age=media_artifacts.ttl, immutable=True, download_name=download_name)
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Hit/miss counters and sizes of the server-side caches"""
+    return jsonify({
+        'transcripts': transcript_cache.stats(),
+        'media': media_artifacts.stats(),
+        'tts': tts.stats(),
+        'feedback': feedback_cache.stats(),
+        'assets': static_assets.stats(),
+    })
+
+# ============================================================================
+# Incremental transcription (audio slices uploaded while recording)
+# ============================================================================
+
+@app.route('/api/stream/start', methods=['POST'])
+def stream_start():
+    """Open an incremental transcription session"""
+    if not FFMPEG_AVAILABLE or not FFMPEG_PATH:
+        return jsonify({'error': 'FFmpeg not installed. Incremental transcription is disabled.'}), 400
+    profile, error = requested_profile()
+    if error:
+        return error
+
+    session = streaming.create_session(FFMPEG_PATH, transcribe_options(profile), trim_silence=WHISPER_VAD)
+    return jsonify({'session_id': session.id})
+
+@app.route('/api/stream/<session_id>/chunk', methods=['POST'])
+def stream_chunk(session_id):
+    """Append an audio slice to a session; transcription happens in the background"""
+    session = streaming.get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown transcription session'}), 404
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio file provided'}), 400
+
     try:
-        from openai import OpenAI
+        session.add_chunk(request.files['audio'].read())
+        return jsonify({'success': True, 'chunks': session.chunks})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/api/stream/<session_id>/events')
+def stream_events(session_id):
+    """Server-Sent Events with the partial transcript as it grows"""
+    session = streaming.get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown transcription session'}), 404
+
+    return Response(streaming.sse_events(session), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream/<session_id>/finish', methods=['POST'])
+def stream_finish(session_id):
+    """Finalise a session and return the same payload as /transcribe (plus mp3_url with ?mp3=1)"""
+    session = streaming.get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown transcription session'}), 404
+
+    # ?mp3=1 also converts the recording already held by the session
+    with_mp3 = request.args.get('mp3') == '1'
+    try:
+        payload = dict(session.finish(timeout=WHISPER_JOB_TIMEOUT, with_mp3=with_mp3))
+        if session.mp3 is not None:
+            payload['mp3_id'], payload['mp3_url'] = store_media(session.mp3, filename='recording.mp3')
+        elif with_mp3:
+            payload['mp3_error'] = 'MP3 conversion failed'
+        return jsonify(payload)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        streaming.drop_session(session_id)
 
-        data = request.get_json()
-        api_key = data.get('api_key', '')
-        question = data.get('question', '')
-        transcript = data.get('transcript', '')
-        word_count = data.get('word_count', 0)
-        speaking_time = data.get('speaking_time', 45)
+# ============================================================================
+# Background jobs (the complete test moves on while recordings are processed)
+# ============================================================================
 
-        if not api_key:
-            return jsonify({'error': 'No API key provided'}), 400
+def transcribe_in_background(audio_bytes, profile=None):
+    """transcribe_recording() for jobs: waits for Whisper instead of failing while it is busy"""
+    deadline = time.time() + WHISPER_JOB_TIMEOUT
+    while True:
+        try:
+            return transcribe_recording(audio_bytes, profile=profile)[0]
+        except TranscriptionUnavailable as e:
+            if time.time() + e.retry_after > deadline:
+                raise
+            time.sleep(e.retry_after)
+
+def transcription_job(job, audio_bytes, session_id, evaluate, profile=None):
+    """Transcribe a recording (or finish an incremental session), then evaluate it if asked"""
+    job.set_stage('transcribing')
+    if session_id is not None:
+        session = streaming.get_session(session_id)
+        if session is None:
+            raise RuntimeError('Unknown transcription session')
+        try:
+            payload = dict(session.finish(timeout=WHISPER_JOB_TIMEOUT))
+        finally:
+            streaming.drop_session(session_id)
+    else:
+        payload = transcribe_in_background(audio_bytes, profile)
+    result = {'transcription': payload}
 
-        # Load existing vocabulary cards to avoid repetition
-        vocab_context = ""
+    if evaluate:
+        job.set_stage('evaluating')
+        data = {**evaluate, 'transcript': payload['transcript'], 'word_count': payload['word_count'],
+                'speech_duration': payload.get('speech_duration') or None, 'fluency': payload.get('fluency')}
         try:
-            vocab_file = Path('vocabulary_cards.json')
-            if vocab_file.exists():
-                with open(vocab_file, 'r', encoding='utf-8') as f:
-                    vocab_cards = json.load(f)
-                    if vocab_cards:
-                        # Extract unique words/phrases that have been suggested before
-                        previous_suggestions = set()
-                        for card in vocab_cards:
-                            content = card.get('content', '')
-                            # Simple extraction - look for quoted words in "Instead of"
-                            import re
-                            matches = re.findall(r'Instead of ["\']([^"\']+)["\']', content)
-                            previous_suggestions.update(matches)
-
-                        if previous_suggestions:
-                            vocab_context = f"\n\n**IMPORTANT - Previous Vocabulary Work:**\nYou have already suggested alternatives for: {', '.join(list(previous_suggestions)[:15])}.\nIt's okay to mention them ONCE if they reappear, but PRIORITIZE NEW, DIFFERENT vocabulary. Focus on variety and progression to build a comprehensive vocabulary toolkit."
-        except:
-            pass
-
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
-
-        # Create evaluation prompt
-        wpm = (word_count / speaking_time * 60) if speaking_time > 0 else 0
-
-        prompt = f"""You are an experienced TOEFL speaking evaluator. Your MISSION: Help this student achieve the HIGHEST possible TOEFL score by teaching them HIGH-IMPACT vocabulary and expressions that IMPRESS graders.
+            feedback, cached = evaluate_response(evaluate['task_num'], data, evaluate['api_key'])
+            result['evaluation'] = {'feedback': feedback, 'cached': cached, 'score': evaluation.parse_score(feedback)}
+        except Exception as e:
+            # The transcript is still worth returning
+            result['evaluation'] = {'error': str(e)}
+    return result
+
+@app.route('/api/jobs/transcribe', methods=['POST'])
+def submit_transcription_job():
+    """
+    Transcribe a recording in the background: the `audio` upload, or the
+    incremental session `session_id`. An optional `evaluate` field (JSON with
+    task_num, api_key and the per-task fields) also evaluates the transcript.
+    Returns 202 with the job id right away.
+    """
+    session_id = request.form.get('session_id') or None
+    audio = request.files.get('audio')
+    if session_id is None and audio is None:
+        return jsonify({'error': 'No audio file provided'}), 400
+    if session_id is not None and streaming.get_session(session_id) is None:
+        return jsonify({'error': 'Unknown transcription session'}), 404
+    profile, error = requested_profile()
+    if error:
+        return error
+
+    evaluate = None
+    if request.form.get('evaluate'):
+        try:
+            evaluate = json.loads(request.form['evaluate'])
+        except ValueError:
+            return jsonify({'error': 'Invalid evaluate field'}), 400
+        if not isinstance(evaluate, dict) or evaluate.get('task_num') not in [1, 2, 3, 4]:
+            return jsonify({'error': 'Invalid task number'}), 400
+        if not evaluate.get('api_key'):
+            return jsonify({'error': 'API key is required'}), 400
+
+    audio_bytes = audio.read() if session_id is None else None
+    try:
+        job = transcription_jobs.submit('transcribe', transcription_job, audio_bytes, session_id, evaluate, profile)
+    except jobs.QueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '10'
+        return response, 503
+
+    return jsonify({
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}',
+        'events_url': f'/api/jobs/{job.id}/events',
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Status of a job, with its result once done"""
+    job = transcription_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events: 'status' on progress, then 'done' (with the result) or 'failed'"""
+    job = transcription_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+
+    return Response(jobs.sse_events(job), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/stats')
+def job_stats():
+    """Job worker pool size and jobs per status"""
+    return jsonify(transcription_jobs.stats())
+
+def speech_wpm(word_count, data, default_time):
+    """Words per minute, over the measured speech duration when the transcription reported it"""
+    duration = data.get('speech_duration') or data.get('speaking_time', default_time)
+    return (word_count / duration * 60) if duration > 0 else 0
+
+def fluency_prompt(data):
+    """(statistics lines, Grammar & Fluency instruction) for the measured fluency metrics, if any"""
+    metrics = data.get('fluency')
+    if not metrics:
+        return "", ""
+    return (f"\n{fluency.summary(metrics)}",
+            "\n   - Comment on fluency using the measured pauses, fillers and fluent runs above")
+
+def speaking_feedback_key(data):
+    context = {'question': data.get('question', ''), 'speaking_time': data.get('speaking_time', 45),
+               'speech_duration': data.get('speech_duration'), 'fluency': data.get('fluency')}
+    return evaluation.cache_key(1, context, data.get('transcript', ''), data.get('word_count', 0))
+
+def speaking_evaluation_messages(data):
+    """Chat messages asking for feedback on a Task 1 response"""
+    question = data.get('question', '')
+    transcript = data.get('transcript', '')
+    word_count = data.get('word_count', 0)
+
+    # Words already suggested in saved vocabulary cards, to avoid repetition
+    vocab_context = previous_suggestions_context("Focus on variety and progression to build a comprehensive vocabulary toolkit.")
+
+    # Create evaluation prompt
+    wpm = speech_wpm(word_count, data, 45)
+    fluency_stats, fluency_instruction = fluency_prompt(data)
+
+    prompt = f"""You are an experienced TOEFL speaking evaluator. Your MISSION: Help this student achieve the HIGHEST possible TOEFL score by teaching them HIGH-IMPACT vocabulary and expressions that IMPRESS graders.
 
 **CRITICAL FOCUS:** "Low-frequency words" - sophisticated, academic vocabulary that demonstrates advanced proficiency. These are the words that distinguish a score of 3 from a score of 5. Avoid common words - we want TOEFL power vocabulary!{vocab_context}
 
@@ -530,7 +949,7 @@ def evaluate():
 
 **Statistics:**
 - Total words: {word_count}
-- Words per minute: {wpm:.1f}
+- Words per minute: {wpm:.1f}{fluency_stats}
 
 **Your task:**
 Provide a detailed evaluation following this structure:
@@ -565,7 +984,7 @@ Provide a detailed evaluation following this structure:
 6. **Grammar & Fluency**:
    - Note any grammatical errors (with corrections)
    - Comment on sentence variety and complexity
-   - Suggest ONE advanced grammatical structure they could incorporate next time
+   - Suggest ONE advanced grammatical structure they could incorporate next time{fluency_instruction}
 
 7. **Recommendations for Score Improvement**:
    - Give 2-3 SPECIFIC, ACTIONABLE tactics to boost their score
@@ -587,28 +1006,45 @@ IMPORTANT:
 - MUST use <h4> for section titles
 - Return only pure HTML content"""
 
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # More affordable than gpt-4
-            messages=[
-                {"role": "system", "content": "You are an expert TOEFL speaking evaluator. Provide detailed, constructive feedback. Do not use any emojis. Return only HTML content without markdown code blocks."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
-
-        feedback = response.choices[0].message.content
-
-        # Clean up the feedback: remove markdown code blocks and emojis
-        import re
-        # Remove ```html and ``` markers
-        feedback = re.sub(r'^```html\s*', '', feedback, flags=re.MULTILINE)
-        feedback = re.sub(r'```\s*$', '', feedback, flags=re.MULTILINE)
-        # Remove emojis (basic emoji removal)
-        feedback = re.sub(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+', '', feedback)
-
-        return jsonify({'feedback': feedback})
+    system_message = "You are an expert TOEFL speaking evaluator. Provide detailed, constructive feedback. Do not use any emojis. Return only HTML content without markdown code blocks."
+    return evaluation.messages(system_message, prompt)
+
+@app.route('/evaluate', methods=['POST'])
+def evaluate():
+    """Evaluate speaking response using OpenAI GPT"""
+    try:
+        data = request.get_json()
+        api_key = data.get('api_key', '')
+
+        if not api_key:
+            return jsonify({'error': 'No API key provided'}), 400
+
+        feedback, cached = evaluate_response(1, data, api_key)
+        return feedback_response(feedback, cached)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/evaluate/stream', methods=['POST'])
+def evaluate_stream():
+    """Same as /evaluate, relaying the feedback as Server-Sent Events while it is generated"""
+    try:
+        data = request.get_json()
+        api_key = data.get('api_key', '')
+
+        if not api_key:
+            return jsonify({'error': 'No API key provided'}), 400
+
+        key = speaking_feedback_key(data)
+        feedback = cached_feedback(data, key)
+        if feedback is not None:
+            return feedback_event_stream([feedback], cached=True)
+
+        client = openai_clients.get(api_key)
+        with metrics.stage('prompt'):
+            chat_messages = speaking_evaluation_messages(data)
+        pieces = evaluation.stream(client, chat_messages)
+        return feedback_event_stream(storing_feedback(key, pieces))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -617,47 +1053,90 @@ IMPORTANT:
 def convert_to_mp3():
     """Convert WebM audio to MP3"""
     try:
-        if 'audio' not in request.files:
+        audio_bytes = read_upload()
+        if audio_bytes is None:
             return jsonify({'error': 'No audio file provided'}), 400
 
-        audio_file = request.files['audio']
-
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as temp_webm:
-            audio_file.save(temp_webm.name)
-            webm_path = temp_webm.name
-
-        mp3_path = webm_path.replace('.webm', '.mp3')
+        # Check if ffmpeg is available
+        if not FFMPEG_AVAILABLE or not FFMPEG_PATH:
+            return jsonify({'error': 'FFmpeg not installed. Please install FFmpeg to enable MP3 conversion.'}), 400
 
-        try:
-            # Check if ffmpeg is available
-            if not FFMPEG_AVAILABLE or not FFMPEG_PATH:
-                return jsonify({'error': 'FFmpeg not installed. Please install FFmpeg to enable MP3 conversion.'}), 400
-
-            # Convert using ffmpeg
-            subprocess.run([
-                FFMPEG_PATH, '-i', webm_path,
-                '-codec:a', 'libmp3lame',
-                '-qscale:a', '2',
-                mp3_path,
-                '-y'
-            ], check=True, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
-            with open(mp3_path, 'rb') as f:
-                mp3_data = f.read()
-            mp3_b64 = base64.b64encode(mp3_data).decode()
-
-            return jsonify({'mp3': mp3_b64})
+        # Convert using ffmpeg, piping the upload through stdin/stdout
+        with metrics.stage('encode'):
+            mp3_data = encode_mp3(audio_bytes, FFMPEG_PATH)
+        with metrics.stage('store'):
+            mp3_id, mp3_url = store_media(mp3_data, filename='recording.mp3')
 
-        finally:
-            # Clean up temporary files
-            if os.path.exists(webm_path):
-                os.unlink(webm_path)
-            if os.path.exists(mp3_path):
-                os.unlink(mp3_path)
+        return jsonify({'mp3_id': mp3_id, 'mp3_url': mp3_url})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the web server is up"""
+    return jsonify({'status': 'ok', 'uptime': round(time.time() - APP_STARTED_AT, 2)})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: the Whisper model is loaded and /transcribe can be served"""
+    whisper_status = whisper_service.status()
+    if whisper_status['status'] == 'failed':
+        return jsonify({'ready': False, 'whisper': whisper_status}), 500
+    if not whisper_status['ready']:
+        response = jsonify({'ready': False, 'whisper': whisper_status})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    return jsonify({'ready': True, 'whisper': whisper_status})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, stage and cache metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def profiles_access_error():
+    """Error response when profiles are off or the request lacks the token, else None"""
+    if request_profiler.token is None:
+        return jsonify({'error': 'Profile downloads need PROFILE_TOKEN (profiles are kept in data/profiles/)'}), 404
+    if not request_profiler.authorized(request.headers.get('X-Profile') or request.args.get('token')):
+        return jsonify({'error': 'Invalid profiling token'}), 403
+    return None
+
+@app.route('/api/profiles')
+def list_profiles():
+    """Most recent request profiles"""
+    error = profiles_access_error()
+    if error:
+        return error
+    return jsonify({**request_profiler.stats(), 'profiles': request_profiler.list()})
+
+@app.route('/api/profiles/<profile_id>')
+def download_profile(profile_id):
+    """A saved profile: the .prof file (pstats, snakeviz...), or a text report with ?format=text"""
+    error = profiles_access_error()
+    if error:
+        return error
+    path = request_profiler.path(profile_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'ncalls'):
+            return jsonify({'error': 'sort must be cumulative, tottime or ncalls'}), 400
+        return Response(request_profiler.summary(profile_id, sort=sort), mimetype='text/plain')
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{profile_id}.prof')
+
+@app.route('/api/whisper/stats')
+def whisper_stats():
+    """Whisper model status, worker pool size, queue depth and per-worker utilisation"""
+    return jsonify(whisper_service.status())
+
+@app.route('/api/openai/stats')
+def openai_stats():
+    """Pooled OpenAI clients: how many, reuse counters, timeouts"""
+    return jsonify(openai_clients.stats())
+
 # ============================================================================
 # Routes for Other Tasks (Task 2, 3, 4)
 # ============================================================================
@@ -673,17 +1152,7 @@ def task2():
     config = load_config()
     api_key = config.get('api_key', '')
 
-    # Load saved content from JSON structure
-    saved_reading = ''
-    if TASK2_FILE.exists():
-        try:
-            with open(TASK2_FILE, 'r', encoding='utf-8') as f:
-                task_data = json.load(f)
-                # Extract reading from first prompt in the prompts array
-                if 'prompts' in task_data and len(task_data['prompts']) > 0:
-                    saved_reading = task_data['prompts'][0].get('reading', '')
-        except Exception as e:
-            print(f"Error loading Task 2 content: {e}")
+    saved_reading = first_prompt_field(2, 'reading')
 
     return render_template('task2.html', api_key=api_key, saved_reading=saved_reading)
 
@@ -693,17 +1162,7 @@ def task3():
     config = load_config()
     api_key = config.get('api_key', '')
 
-    # Load saved content from JSON structure
-    saved_reading = ''
-    if TASK3_FILE.exists():
-        try:
-            with open(TASK3_FILE, 'r', encoding='utf-8') as f:
-                task_data = json.load(f)
-                # Extract reading from first prompt in the prompts array
-                if 'prompts' in task_data and len(task_data['prompts']) > 0:
-                    saved_reading = task_data['prompts'][0].get('reading', '')
-        except Exception as e:
-            print(f"Error loading Task 3 content: {e}")
+    saved_reading = first_prompt_field(3, 'reading')
 
     return render_template('task3.html', api_key=api_key, saved_reading=saved_reading)
 
@@ -713,17 +1172,7 @@ def task4():
     config = load_config()
     api_key = config.get('api_key', '')
 
-    # Load saved notes from JSON structure
-    saved_notes = ''
-    if TASK4_FILE.exists():
-        try:
-            with open(TASK4_FILE, 'r', encoding='utf-8') as f:
-                task_data = json.load(f)
-                # Extract notes from first prompt in the prompts array
-                if 'prompts' in task_data and len(task_data['prompts']) > 0:
-                    saved_notes = task_data['prompts'][0].get('notes', '')
-        except Exception as e:
-            print(f"Error loading Task 4 content: {e}")
+    saved_notes = first_prompt_field(4, 'notes')
 
     return render_template('task4.html', api_key=api_key, saved_notes=saved_notes)
 
@@ -760,11 +1209,11 @@ def get_prompt(task_num, prompt_id):
         return jsonify({'error': 'Invalid task number'}), 400
 
     try:
-        data = load_task_prompts(task_num)
-        for prompt in data.get('prompts', []):
-            if prompt['id'] == prompt_id:
-                return jsonify(prompt)
-        return jsonify({'error': 'Prompt not found'}), 404
+        with metrics.stage('prompts'):
+            prompt = storage.get_prompt(task_num, prompt_id)
+        if prompt is None:
+            return jsonify({'error': 'Prompt not found'}), 404
+        return jsonify(prompt)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -776,13 +1225,9 @@ def create_prompt(task_num):
 
     try:
         incoming_data = request.get_json()
-        data = load_task_prompts(task_num)
-
-        # Generate new ID
-        new_id = max([p['id'] for p in data['prompts']], default=0) + 1
 
-        # Create new prompt
-        new_prompt = {'id': new_id}
+        # Create new prompt (the storage assigns the id)
+        new_prompt = {}
 
         if task_num == 2:
             new_prompt['reading'] = incoming_data.get('reading', '')
@@ -799,9 +1244,9 @@ def create_prompt(task_num):
             new_prompt['notes'] = incoming_data.get('notes', '')
             new_prompt['topic'] = incoming_data.get('topic', '')
 
-        data['prompts'].append(new_prompt)
-
-        if save_task_prompts(task_num, data):
+        with metrics.stage('prompts'):
+            new_prompt = storage.add_prompt(task_num, new_prompt)
+        if new_prompt is not None:
             return jsonify({'success': True, 'prompt': new_prompt})
         else:
             return jsonify({'error': 'Failed to save prompt'}), 500
@@ -816,45 +1261,28 @@ def update_prompt(task_num, prompt_id):
 
     try:
         incoming_data = request.get_json()
-        data = load_task_prompts(task_num)
+        with metrics.stage('prompts'):
+            exists = storage.get_prompt(task_num, prompt_id) is not None
+        if not exists:
+            return jsonify({'error': 'Prompt not found'}), 404
 
-        # Find and update the prompt
-        for i, prompt in enumerate(data['prompts']):
-            if prompt['id'] == prompt_id:
-                if task_num == 2:
-                    if 'reading' in incoming_data:
-                        prompt['reading'] = incoming_data['reading']
-                    if 'audio_file' in incoming_data:
-                        prompt['audio_file'] = incoming_data['audio_file']
-                    if 'notes' in incoming_data:
-                        prompt['notes'] = incoming_data['notes']
-                elif task_num == 3:
-                    if 'reading' in incoming_data:
-                        prompt['reading'] = incoming_data['reading']
-                    if 'question' in incoming_data:
-                        prompt['question'] = incoming_data['question']
-                    if 'audio_file' in incoming_data:
-                        prompt['audio_file'] = incoming_data['audio_file']
-                    if 'notes' in incoming_data:
-                        prompt['notes'] = incoming_data['notes']
-                elif task_num == 4:
-                    if 'question' in incoming_data:
-                        prompt['question'] = incoming_data['question']
-                    if 'audio_file' in incoming_data:
-                        prompt['audio_file'] = incoming_data['audio_file']
-                    if 'notes' in incoming_data:
-                        prompt['notes'] = incoming_data['notes']
-                    if 'topic' in incoming_data:
-                        prompt['topic'] = incoming_data['topic']
-
-                data['prompts'][i] = prompt
-
-                if save_task_prompts(task_num, data):
-                    return jsonify({'success': True, 'prompt': prompt})
-                else:
-                    return jsonify({'error': 'Failed to save prompt'}), 500
-
-        return jsonify({'error': 'Prompt not found'}), 404
+        if task_num == 2:
+            fields = ['reading', 'audio_file', 'notes']
+        elif task_num == 3:
+            fields = ['reading', 'question', 'audio_file', 'notes']
+        elif task_num == 4:
+            fields = ['question', 'audio_file', 'notes', 'topic']
+        else:
+            fields = []
+        changes = {field: incoming_data[field] for field in fields if field in incoming_data}
+
+        with metrics.stage('prompts'):
+            updated = storage.update_prompt(task_num, prompt_id, changes)
+            prompt = storage.get_prompt(task_num, prompt_id) if updated else None
+        if updated:
+            return jsonify({'success': True, 'prompt': prompt})
+        else:
+            return jsonify({'error': 'Failed to save prompt'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -865,12 +1293,9 @@ def delete_prompt(task_num, prompt_id):
         return jsonify({'error': 'Invalid task number'}), 400
 
     try:
-        data = load_task_prompts(task_num)
-
-        # Find and remove the prompt
-        data['prompts'] = [p for p in data['prompts'] if p['id'] != prompt_id]
-
-        if save_task_prompts(task_num, data):
+        with metrics.stage('prompts'):
+            deleted = storage.delete_prompt(task_num, prompt_id)
+        if deleted:
             return jsonify({'success': True, 'message': 'Prompt deleted'})
         else:
             return jsonify({'error': 'Failed to delete prompt'}), 500
@@ -893,9 +1318,7 @@ def task_content(task_num):
         # Load content
         if file_path.exists():
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                return jsonify(data)
+                return jsonify(load_task_prompts(task_num))
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         return jsonify({})
@@ -904,13 +1327,9 @@ def task_content(task_num):
         # Save content - now creates a new prompt
         try:
             incoming_data = request.get_json()
-            data = load_task_prompts(task_num)
 
-            # Generate new ID
-            new_id = max([p['id'] for p in data['prompts']], default=0) + 1
-
-            # Create new prompt
-            new_prompt = {'id': new_id}
+            # Create new prompt (the storage assigns the id)
+            new_prompt = {}
 
             if task_num in [2, 3]:
                 new_prompt['reading'] = incoming_data.get('reading', '')
@@ -921,9 +1340,9 @@ def task_content(task_num):
                 new_prompt['notes'] = incoming_data.get('notes', '')
                 new_prompt['topic'] = ''
 
-            data['prompts'].append(new_prompt)
-
-            if save_task_prompts(task_num, data):
+            with metrics.stage('prompts'):
+                new_prompt = storage.add_prompt(task_num, new_prompt)
+            if new_prompt is not None:
                 return jsonify({'success': True, 'message': 'Content saved successfully!', 'prompt': new_prompt})
             else:
                 return jsonify({'error': 'Failed to save'}), 500
@@ -1022,8 +1441,7 @@ def get_task_audio(task_num):
         if not file_path.exists():
             return jsonify({'error': 'No content saved for this task'}), 404
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            task_data = json.load(f)
+        task_data = load_task_prompts(task_num)
 
         audio_filename = task_data.get('audio_path')
         if not audio_filename:
@@ -1033,7 +1451,7 @@ def get_task_audio(task_num):
         if not audio_path.exists():
             return jsonify({'error': 'Audio file not found'}), 404
 
-        return send_file(audio_path)
+        return send_media_file(audio_path, max_age=TASK_AUDIO_MAX_AGE)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1053,105 +1471,82 @@ def serve_task_audio_file(task_num, filename):
         if not audio_path.exists():
             return jsonify({'error': 'Audio file not found'}), 404
 
-        return send_file(audio_path)
+        return send_media_file(audio_path, max_age=TASK_AUDIO_MAX_AGE)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/task/<int:task_num>/evaluate', methods=['POST'])
-def evaluate_task(task_num):
-    """Evaluate a task response using OpenAI"""
-    if task_num not in [2, 3, 4, 5, 6]:
-        return jsonify({'error': 'Invalid task number'}), 400
+def task_feedback_key(task_num, data):
+    if task_num in [5, 6]:
+        context = {'reading_text': data.get('reading_text', ''), 'discussion_data': data.get('discussion_data', {})}
+        transcript = data.get('text', '')
+    else:
+        context = {'reading_text': data.get('reading_text', ''), 'has_audio': data.get('has_audio', False),
+                   'speaking_time': data.get('speaking_time', 0), 'speech_duration': data.get('speech_duration'),
+                   'fluency': data.get('fluency')}
+        transcript = data.get('transcript', '')
+    return evaluation.cache_key(task_num, context, transcript, data.get('word_count', 0))
 
-    try:
-        from openai import OpenAI
+def task_evaluation_messages(task_num, data):
+    """Chat messages asking for feedback on a Task 2-6 response"""
+    # Words already suggested in saved vocabulary cards, to avoid repetition
+    vocab_context = previous_suggestions_context("Focus on variety and progression.")
 
-        data = request.get_json()
-        api_key = data.get('api_key')
+    # Handle writing tasks (5, 6) differently from speaking tasks (2, 3, 4)
+    is_writing_task = task_num in [5, 6]
 
-        if not api_key:
-            return jsonify({'error': 'API key is required'}), 400
+    if is_writing_task:
+        # Writing task data
+        text = data.get('text', '')
+        word_count = data.get('word_count', 0)
+        reading_text = data.get('reading_text', '')
+        discussion_data = data.get('discussion_data', {})
+        transcript = text  # Use same variable name for consistency
+        wpm = 0
+        has_audio = False
+    else:
+        # Speaking task data
+        transcript = data.get('transcript', '')
+        word_count = data.get('word_count', 0)
+        reading_text = data.get('reading_text', '')
+        has_audio = data.get('has_audio', False)
+        wpm = speech_wpm(word_count, data, 0)
+    fluency_stats, fluency_instruction = fluency_prompt(data) if not is_writing_task else ("", "")
 
-        # Load existing vocabulary cards to avoid repetition
-        vocab_context = ""
-        try:
-            vocab_file = Path('vocabulary_cards.json')
-            if vocab_file.exists():
-                with open(vocab_file, 'r', encoding='utf-8') as f:
-                    vocab_cards = json.load(f)
-                    if vocab_cards:
-                        # Extract unique words/phrases that have been suggested before
-                        previous_suggestions = set()
-                        for card in vocab_cards:
-                            content = card.get('content', '')
-                            # Simple extraction - look for quoted words in "Instead of"
-                            import re
-                            matches = re.findall(r'Instead of ["\']([^"\']+)["\']', content)
-                            previous_suggestions.update(matches)
-
-                        if previous_suggestions:
-                            vocab_context = f"\n\n**IMPORTANT - Previous Vocabulary Work:**\nYou have already suggested alternatives for: {', '.join(list(previous_suggestions)[:15])}.\nIt's okay to mention them ONCE if they reappear, but PRIORITIZE NEW, DIFFERENT vocabulary. Focus on variety and progression."
-        except:
-            pass
-
-        client = OpenAI(api_key=api_key)
-
-        # Handle writing tasks (5, 6) differently from speaking tasks (2, 3, 4)
-        is_writing_task = task_num in [5, 6]
-
-        if is_writing_task:
-            # Writing task data
-            text = data.get('text', '')
-            word_count = data.get('word_count', 0)
-            reading_text = data.get('reading_text', '')
-            discussion_data = data.get('discussion_data', {})
-            transcript = text  # Use same variable name for consistency
-            wpm = 0
-            has_audio = False
-        else:
-            # Speaking task data
-            transcript = data.get('transcript', '')
-            word_count = data.get('word_count', 0)
-            speaking_time = data.get('speaking_time', 0)
-            reading_text = data.get('reading_text', '')
-            has_audio = data.get('has_audio', False)
-            wpm = (word_count / speaking_time * 60) if speaking_time > 0 else 0
-
-        # Task-specific prompts
-        if task_num == 2:
-            task_description = "Campus Announcement (Task 2)"
-            task_context = "In this task, you read a campus announcement and listened to students discussing it. You needed to explain the students' opinion and their reasons."
-        elif task_num == 3:
-            task_description = "Academic Concept (Task 3)"
-            task_context = "In this task, you read an academic article and listened to a lecture. You needed to explain how the lecture examples illustrate the concept from the reading."
-        elif task_num == 4:
-            task_description = "Lecture Summary (Task 4)"
-            task_context = "In this task, you listened to an academic lecture. You needed to summarize the main points presented."
-        elif task_num == 5:
-            task_description = "Integrated Writing (Task 5)"
-            task_context = "In this task, you read an academic passage and listened to a lecture that challenges it. You needed to write an essay (150-225 words) summarizing how the lecture counters the reading's points."
-        else:  # task_num == 6
-            task_description = "Academic Discussion (Task 6)"
-            task_context = f"In this task, you read a professor's question and two student responses. You needed to write your own contribution (at least 100 words) to the academic discussion."
-
-        audio_note = ""
-        if not is_writing_task and not has_audio:
-            audio_note = "\n\n**NOTE:** The student did not have access to the audio portion. Focus evaluation on language quality (vocabulary, grammar, phrasing) rather than content accuracy."
-
-        reading_context = ""
-        if reading_text:
-            reading_context = f"\n\n**Reading Passage:**\n{reading_text}"
-
-        discussion_context = ""
-        if task_num == 6 and discussion_data:
-            discussion_context = f"\n\n**Discussion Context:**\n"
-            discussion_context += f"Professor ({discussion_data.get('professor_name', 'Professor')}): {discussion_data.get('professor_question', '')}\n"
-            discussion_context += f"Student 1 ({discussion_data.get('student1_name', 'Student 1')}): {discussion_data.get('student1_response', '')}\n"
-            discussion_context += f"Student 2 ({discussion_data.get('student2_name', 'Student 2')}): {discussion_data.get('student2_response', '')}"
-
-        task_type = "writing" if is_writing_task else "speaking"
-        prompt = f"""You are an experienced TOEFL {task_type} evaluator. Your MISSION: Help this student achieve the HIGHEST possible TOEFL score by teaching them HIGH-IMPACT vocabulary and expressions that IMPRESS graders.
+    # Task-specific prompts
+    if task_num == 2:
+        task_description = "Campus Announcement (Task 2)"
+        task_context = "In this task, you read a campus announcement and listened to students discussing it. You needed to explain the students' opinion and their reasons."
+    elif task_num == 3:
+        task_description = "Academic Concept (Task 3)"
+        task_context = "In this task, you read an academic article and listened to a lecture. You needed to explain how the lecture examples illustrate the concept from the reading."
+    elif task_num == 4:
+        task_description = "Lecture Summary (Task 4)"
+        task_context = "In this task, you listened to an academic lecture. You needed to summarize the main points presented."
+    elif task_num == 5:
+        task_description = "Integrated Writing (Task 5)"
+        task_context = "In this task, you read an academic passage and listened to a lecture that challenges it. You needed to write an essay (150-225 words) summarizing how the lecture counters the reading's points."
+    else:  # task_num == 6
+        task_description = "Academic Discussion (Task 6)"
+        task_context = f"In this task, you read a professor's question and two student responses. You needed to write your own contribution (at least 100 words) to the academic discussion."
+
+    audio_note = ""
+    if not is_writing_task and not has_audio:
+        audio_note = "\n\n**NOTE:** The student did not have access to the audio portion. Focus evaluation on language quality (vocabulary, grammar, phrasing) rather than content accuracy."
+
+    reading_context = ""
+    if reading_text:
+        reading_context = f"\n\n**Reading Passage:**\n{reading_text}"
+
+    discussion_context = ""
+    if task_num == 6 and discussion_data:
+        discussion_context = f"\n\n**Discussion Context:**\n"
+        discussion_context += f"Professor ({discussion_data.get('professor_name', 'Professor')}): {discussion_data.get('professor_question', '')}\n"
+        discussion_context += f"Student 1 ({discussion_data.get('student1_name', 'Student 1')}): {discussion_data.get('student1_response', '')}\n"
+        discussion_context += f"Student 2 ({discussion_data.get('student2_name', 'Student 2')}): {discussion_data.get('student2_response', '')}"
+
+    task_type = "writing" if is_writing_task else "speaking"
+    prompt = f"""You are an experienced TOEFL {task_type} evaluator. Your MISSION: Help this student achieve the HIGHEST possible TOEFL score by teaching them HIGH-IMPACT vocabulary and expressions that IMPRESS graders.
 
 **CRITICAL FOCUS:** "Low-frequency words" - sophisticated, academic vocabulary that demonstrates advanced proficiency. These are the words that distinguish a score of 3 from a score of 5.{vocab_context}
 
@@ -1164,7 +1559,7 @@ Evaluate this TOEFL {task_description} response.
 
 **Statistics:**
 - Total words: {word_count}
-{f"- Words per minute: {wpm:.1f}" if not is_writing_task else ""}
+{f"- Words per minute: {wpm:.1f}{fluency_stats}" if not is_writing_task else ""}
 
 **Your task:**
 Provide a detailed evaluation following this structure:
@@ -1199,7 +1594,7 @@ Provide a detailed evaluation following this structure:
 6. **Grammar & Fluency**:
    - Note any grammatical errors (with corrections)
    - Comment on sentence variety and complexity
-   - Suggest ONE advanced grammatical structure they could incorporate next time
+   - Suggest ONE advanced grammatical structure they could incorporate next time{fluency_instruction}
 
 7. **Recommendations for Score Improvement**:
    - Give 2-3 SPECIFIC, ACTIONABLE tactics to boost their score
@@ -1221,32 +1616,185 @@ IMPORTANT:
 - MUST use <h4> for section titles
 - Return only pure HTML content"""
 
-        # Call OpenAI API
-        system_message = f"You are an expert TOEFL {task_type} evaluator. Provide detailed, constructive feedback. Do not use any emojis. Return only HTML content without markdown code blocks."
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
+    system_message = f"You are an expert TOEFL {task_type} evaluator. Provide detailed, constructive feedback. Do not use any emojis. Return only HTML content without markdown code blocks."
+    return evaluation.messages(system_message, prompt)
+
+@app.route('/api/task/<int:task_num>/evaluate', methods=['POST'])
+def evaluate_task(task_num):
+    """Evaluate a task response using OpenAI"""
+    if task_num not in [2, 3, 4, 5, 6]:
+        return jsonify({'error': 'Invalid task number'}), 400
+
+    try:
+        data = request.get_json()
+        api_key = data.get('api_key')
 
-        feedback = response.choices[0].message.content
+        if not api_key:
+            return jsonify({'error': 'API key is required'}), 400
+
+        feedback, cached = evaluate_response(task_num, data, api_key)
+        return feedback_response(feedback, cached)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/task/<int:task_num>/evaluate/stream', methods=['POST'])
+def evaluate_task_stream(task_num):
+    """Same as /api/task/<n>/evaluate, relaying the feedback as Server-Sent Events"""
+    if task_num not in [2, 3, 4, 5, 6]:
+        return jsonify({'error': 'Invalid task number'}), 400
+
+    try:
+        data = request.get_json()
+        api_key = data.get('api_key')
+
+        if not api_key:
+            return jsonify({'error': 'API key is required'}), 400
 
-        # Clean up the feedback
-        import re
-        feedback = re.sub(r'^```html\s*', '', feedback, flags=re.MULTILINE)
-        feedback = re.sub(r'```\s*$', '', feedback, flags=re.MULTILINE)
-        feedback = re.sub(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+', '', feedback)
+        key = task_feedback_key(task_num, data)
+        feedback = cached_feedback(data, key)
+        if feedback is not None:
+            return feedback_event_stream([feedback], cached=True)
 
-        return jsonify({'feedback': feedback})
+        client = openai_clients.get(api_key)
+        with metrics.stage('prompt'):
+            chat_messages = task_evaluation_messages(task_num, data)
+        pieces = evaluation.stream(client, chat_messages)
+        return feedback_event_stream(storing_feedback(key, pieces))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def evaluate_response(task_num, data, api_key):
+    """Feedback on one Task 1-6 response, from the cache when possible: (feedback, cached)"""
+    if task_num == 1:
+        key = speaking_feedback_key(data)
+    else:
+        key = task_feedback_key(task_num, data)
+    feedback = cached_feedback(data, key)
+    if feedback is not None:
+        return feedback, True
+
+    with metrics.stage('prompt'):
+        if task_num == 1:
+            chat_messages = speaking_evaluation_messages(data)
+        else:
+            chat_messages = task_evaluation_messages(task_num, data)
+    with metrics.stage('openai'):
+        feedback = evaluation.complete(openai_clients.get(api_key), chat_messages)
+    store_feedback(key, feedback)
+    return feedback, False
+
+def evaluate_batch(responses, api_key, no_cache=False):
+    """
+    Evaluate the responses of a sitting concurrently. Yields one result per
+    response as soon as it is ready (in completion order), then a summary.
+    """
+    started = time.perf_counter()
+    futures = {}
+    for index, response in enumerate(responses):
+        data = {**response, 'no_cache': True} if no_cache else response
+        futures[evaluation_executor.submit(evaluate_response, response['task_num'], data, api_key)] = index
+
+    scores = [None] * len(responses)
+    failed = 0
+    for future in as_completed(futures):
+        index = futures[future]
+        result = {'index': index, 'task_num': responses[index]['task_num']}
+        try:
+            feedback, cached = future.result()
+        except Exception as e:
+            failed += 1
+            result['error'] = str(e)
+        else:
+            scores[index] = evaluation.parse_score(feedback)
+            result.update(feedback=feedback, cached=cached, score=scores[index])
+        yield 'result', result
+
+    yield 'summary', {
+        'tasks': len(responses),
+        'failed': failed,
+        **evaluation.summarize_scores(scores),
+        'elapsed': round(time.perf_counter() - started, 2),
+    }
+
+def batch_request():
+    """(responses, api_key, no_cache) of a batch evaluation request, or an error response"""
+    data = request.get_json() or {}
+    api_key = data.get('api_key')
+    responses = data.get('responses')
+
+    if not api_key:
+        return None, (jsonify({'error': 'API key is required'}), 400)
+    if not isinstance(responses, list) or not responses:
+        return None, (jsonify({'error': 'No responses to evaluate'}), 400)
+    if len(responses) > EVALUATION_BATCH_MAX:
+        return None, (jsonify({'error': f'At most {EVALUATION_BATCH_MAX} responses per batch'}), 400)
+    for response in responses:
+        if not isinstance(response, dict) or response.get('task_num') not in [1, 2, 3, 4, 5, 6]:
+            return None, (jsonify({'error': 'Invalid task number'}), 400)
+    return (responses, api_key, bool(data.get('no_cache'))), None
+
+@app.route('/api/evaluate/batch', methods=['POST'])
+def evaluate_batch_route():
+    """
+    Evaluate all the responses of a complete test at once:
+    {"api_key", "responses": [{"task_num", ...same fields as the per-task endpoints}]}
+    """
+    try:
+        args, error = batch_request()
+        if error:
+            return error
+
+        results = [None] * len(args[0])
+        summary = None
+        for event, payload in evaluate_batch(*args):
+            if event == 'result':
+                results[payload['index']] = payload
+            else:
+                summary = payload
+        return jsonify({'results': results, 'summary': summary})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/evaluate/batch/stream', methods=['POST'])
+def evaluate_batch_stream():
+    """Same as /api/evaluate/batch, sending a 'result' event per task as it completes, then 'summary'"""
+    try:
+        args, error = batch_request()
+        if error:
+            return error
+
+        def events():
+            for event, payload in evaluate_batch(*args):
+                yield evaluation.sse_event(event, payload)
+
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def create_app():
+    """
+    Start warming up Whisper (and optionally the TTS cache) and return the app.
+    Called once by the process that serves requests: `python app.py`, serve.py,
+    or a WSGI server (`waitress-serve --call app:create_app`). Importing this
+    module starts nothing, so spawned Whisper workers and benchmarks can.
+    """
+    whisper_service.boot(WHISPER_STARTUP, workers=WHISPER_WORKERS, max_queue=WHISPER_QUEUE_SIZE,
+                         preload=WHISPER_PRELOAD, threads=WHISPER_THREADS)
+    if TTS_PRERENDER:
+        tts.prerender_in_background(tts_prompt_texts(), settings=tts_settings())
+    return app
+
 if __name__ == '__main__':
+    # The debug reloader runs this file twice; only the child process
+    # (WERKZEUG_RUN_MAIN) serves requests and loads the model
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        create_app()
+
     Path('templates').mkdir(exist_ok=True)
     Path('static').mkdir(exist_ok=True)
     print("\n" + "="*60)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Fingerprinted, precompressed static assets.
+
+The pages load about 300 KB of JavaScript and CSS from static/. StaticAssets
+copies each file of static/ to data/cache/assets/ under a name carrying a hash
+of its content (task2.js -> task2.1a2b3c4d5e.js), next to .gz and .br copies
+compressed once at the highest level (Brotli is in requirements.txt; without
+it, only the gzip copies are built and served). Templates link to
+asset_url('task2.js'); /assets/ serves the variant the browser accepts with a
+one-year immutable Cache-Control. A name never changes content, so repeat
+page loads fetch no static bytes at all, and an edited file simply gets a new
+name.
+
+Sources are checked (mtime and size) each time a page links to them, so edits
+are picked up without restarting the server. Subdirectories of static/ (the
+task audio library) are not fingerprinted and stay on Flask's static route.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import threading
+from pathlib import Path
+
+from flask import abort, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text formats worth compressing (images and audio already are)
+COMPRESSIBLE = {'.js', '.css', '.html', '.svg', '.json', '.txt'}
+# Content-Encoding and file suffix of the precompressed variants, preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+MAX_AGE = 365 * 24 * 3600
+
+
+def compress(data):
+    """Precompressed variants of `data` ({suffix: bytes}), only those smaller than the original"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data)}
+
+
+class StaticAssets:
+    """Content-hashed copies of a static directory and their compressed variants"""
+
+    def __init__(self, source_dir, build_dir):
+        self.source_dir = Path(source_dir)
+        self.build_dir = Path(build_dir)
+        self._assets = {}      # source name -> {'signature', 'name', 'etag', 'mimetype', 'variants'}
+        self._names = {}       # fingerprinted name -> source name
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Build the assets, serve them from /assets/ and give the templates asset_url()"""
+        self.build()
+        app.add_url_rule('/assets/<name>', 'assets', self.send)
+        app.context_processor(lambda: {'asset_url': self.url})
+
+    def build(self):
+        """Fingerprint and precompress every file of the source directory (unchanged ones are reused)"""
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.source_dir.iterdir()):
+            if path.is_file() and not path.name.startswith('.'):
+                self._refresh(path.name)
+        # Leftovers of sources that changed or disappeared while the server was down
+        current = {name + suffix for name in self._names for suffix in ('', '.gz', '.br')}
+        for path in self.build_dir.iterdir():
+            if path.name not in current:
+                path.unlink(missing_ok=True)
+        return len(self._assets)
+
+    def _refresh(self, source):
+        """Entry of `source`, rebuilt if the file changed since (None if there is no such file)"""
+        try:
+            stat = (self.source_dir / source).stat()
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        asset = self._assets.get(source)
+        if asset is not None and asset['signature'] == signature:
+            return asset
+
+        with self._lock:
+            path = self.source_dir / source
+            data = path.read_bytes()
+            etag = hashlib.sha256(data).hexdigest()
+            name = f'{path.stem}.{etag[:10]}{path.suffix}'
+            target = self.build_dir / name
+            # Also rebuilt when Brotli was installed after a gzip-only build
+            missing_br = (brotli is not None and path.suffix in COMPRESSIBLE
+                          and not target.with_name(name + '.br').exists())
+            if not target.exists() or missing_br:
+                variants = compress(data) if path.suffix in COMPRESSIBLE else {}
+                # The uncompressed file goes last: once it exists, the asset is complete
+                for suffix, body in [*variants.items(), ('', data)]:
+                    partial = target.with_name(f'{name}{suffix}.tmp')
+                    partial.write_bytes(body)
+                    partial.replace(target.with_name(name + suffix))
+
+            previous = self._assets.get(source)
+            if previous is not None and previous['name'] != name:
+                self._names.pop(previous['name'], None)
+                for suffix in ('', '.gz', '.br'):
+                    (self.build_dir / (previous['name'] + suffix)).unlink(missing_ok=True)
+            asset = {
+                'signature': signature,
+                'name': name,
+                'etag': etag,
+                'mimetype': mimetypes.guess_type(source)[0] or 'application/octet-stream',
+                'variants': [suffix for _, suffix in ENCODINGS if (self.build_dir / (name + suffix)).exists()],
+            }
+            self._assets[source] = asset
+            self._names[name] = source
+        return asset
+
+    def url(self, source):
+        """URL of the current fingerprinted copy of `source` (Flask's static route for other files)"""
+        asset = self._refresh(source)
+        if asset is None:
+            return url_for('static', filename=source)
+        return url_for('assets', name=asset['name'])
+
+    def send(self, name):
+        """Serve a fingerprinted asset in the best encoding the client accepts"""
+        source = self._names.get(name)
+        if source is None:
+            abort(404)
+        asset = self._assets[source]
+
+        encoding, suffix = None, ''
+        for candidate, candidate_suffix in ENCODINGS:
+            if candidate_suffix in asset['variants'] and request.accept_encodings[candidate]:
+                encoding, suffix = candidate, candidate_suffix
+                break
+
+        # download_name: the name of the asset, not of the .gz/.br file it is read from
+        response = send_file(self.build_dir / (name + suffix), mimetype=asset['mimetype'], conditional=True,
+                             etag=asset['etag'] + suffix, max_age=MAX_AGE, download_name=name)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def stats(self):
+        """Number of assets and their total size as served to each kind of client"""
+        sizes = {'files': len(self._assets), 'bytes': 0, 'gzip_bytes': 0,
+                 'brotli_bytes': 0 if brotli is not None else None}
+        for asset in self._assets.values():
+            path = self.build_dir / asset['name']
+            plain = path.stat().st_size
+            sizes['bytes'] += plain
+            for key, suffix in (('gzip_bytes', '.gz'), ('brotli_bytes', '.br')):
+                if sizes[key] is not None:
+                    sizes[key] += (path.with_name(path.name + suffix).stat().st_size
+                                   if suffix in asset['variants'] else plain)
+        return sizes
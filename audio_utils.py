@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Audio decoding helpers built on ffmpeg.
+"""
+
+import os
+import subprocess
+import threading
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def _pcm_to_float(raw):
+    return np.frombuffer(raw, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def decode_to_pcm(data, ffmpeg_path, sample_rate=SAMPLE_RATE):
+    """
+    Decode an encoded recording (WebM, MP3, WAV...) held in memory into mono
+    float32 PCM, the format Whisper expects. The bytes are piped through
+    ffmpeg's stdin/stdout so no temporary file is written.
+
+    Truncated input (e.g. a recording that is still in progress) decodes as far
+    as ffmpeg can read it.
+    """
+    cmd = [
+        ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+        'pipe:1'
+    ]
+    process = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0 and not process.stdout:
+        raise RuntimeError(f"Failed to decode audio: {process.stderr.decode(errors='ignore').strip()}")
+    return _pcm_to_float(process.stdout)
+
+
+def encode_mp3(data, ffmpeg_path, quality=2):
+    """Transcode an encoded recording held in memory to MP3 bytes via ffmpeg pipes"""
+    cmd = [
+        ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-codec:a', 'libmp3lame', '-qscale:a', str(quality),
+        '-f', 'mp3', 'pipe:1'
+    ]
+    process = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to convert audio: {process.stderr.decode(errors='ignore').strip()}")
+    return process.stdout
+
+
+def decode_pcm_and_mp3(data, ffmpeg_path, sample_rate=SAMPLE_RATE, quality=2):
+    """
+    Decode a recording once and produce both the PCM for Whisper and an MP3,
+    from a single ffmpeg process with two outputs: PCM on stdout and MP3 on an
+    extra pipe. Falls back to two ffmpeg runs where fd passing is unavailable.
+
+    The MP3 is only a download: when it cannot be produced (no libmp3lame in
+    this ffmpeg build, encoder error), the recording is decoded again without
+    it and mp3_bytes is None, so the transcription still goes through.
+    Returns (pcm, mp3_bytes or None).
+    """
+    if os.name != 'posix':
+        pcm = decode_to_pcm(data, ffmpeg_path, sample_rate)
+        try:
+            return pcm, encode_mp3(data, ffmpeg_path, quality)
+        except RuntimeError as e:
+            print(f"MP3 conversion failed, transcribing without it: {e}")
+            return pcm, None
+
+    mp3_read, mp3_write = os.pipe()
+    cmd = [
+        ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-map', '0:a', '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), 'pipe:1',
+        '-map', '0:a', '-codec:a', 'libmp3lame', '-qscale:a', str(quality), '-f', 'mp3', f'pipe:{mp3_write}'
+    ]
+    try:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, pass_fds=(mp3_write,))
+    finally:
+        os.close(mp3_write)
+
+    # Drain the MP3 pipe concurrently so neither output blocks ffmpeg
+    mp3_chunks = []
+
+    def drain():
+        with os.fdopen(mp3_read, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                mp3_chunks.append(chunk)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    stdout, stderr = process.communicate(data)
+    reader.join()
+
+    mp3 = b''.join(mp3_chunks)
+    if process.returncode != 0 and not (stdout and mp3):
+        # Either output may be the one that failed: decode the PCM alone (raises if the input is bad)
+        print(f"Combined PCM/MP3 decode failed, retrying without MP3: {stderr.decode(errors='ignore').strip()}")
+        return decode_to_pcm(data, ffmpeg_path, sample_rate), None
+    return _pcm_to_float(stdout), mp3 or None
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark: RSS per Whisper worker and total memory for N workers,
+when each worker loads its own copy of the model (spawned, WHISPER_WORKERS=N
+python app.py) and when the model is loaded once and shared copy-on-write by
+forked workers (python serve.py --workers N).
+
+Each configuration runs in a fresh process, which starts the pool, sends one
+transcription per worker (a few seconds of noise) so the figures include
+inference, then reads /proc/<pid>/smaps_rollup of itself and of the workers.
+RSS counts a shared page in every process that maps it; PSS divides it among
+them, so the PSS total is the memory the configuration really uses. Linux only.
+
+Usage:
+    python benchmarks/memory_benchmark.py [--workers 1,2,4] [--model base] [--int8]
+        [--seconds 5] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import whisper_service  # noqa: E402
+from audio_utils import SAMPLE_RATE  # noqa: E402
+from inference_pool import process_memory  # noqa: E402
+
+MODES = {
+    'spawn': 'one model per worker',
+    'preload': 'shared (fork)',
+}
+
+
+def measure(mode, workers, model_name, quantize, seconds):
+    """Start a pool in `mode`, transcribe once per worker and return the memory figures (in MB)"""
+    whisper_service.configure(model_name, quantize=quantize)
+    whisper_service.boot('eager', workers=workers, preload=mode == 'preload')
+    if not whisper_service.is_ready():
+        sys.exit(f"Whisper pool failed to start: {whisper_service.status()['error']}")
+
+    audio = (np.random.default_rng(0).standard_normal(SAMPLE_RATE * seconds) * 0.01).astype(np.float32)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: whisper_service.transcribe(audio, language='en', fp16=False), range(workers)))
+
+    def megabytes(memory):
+        return {k: round(v / 2**20, 1) for k, v in memory.items()}
+
+    pids = [worker['pid'] for worker in whisper_service.status()['pool']['workers']]
+    parent = megabytes(process_memory(os.getpid()))
+    per_worker = [megabytes(process_memory(pid)) for pid in pids]
+    return {
+        'mode': mode,
+        'workers': workers,
+        'parent': parent,
+        'per_worker': per_worker,
+        'total_rss': round(parent['rss'] + sum(w['rss'] for w in per_worker), 1),
+        'total_pss': round(parent['pss'] + sum(w['pss'] for w in per_worker), 1),
+    }
+
+
+def run_isolated(mode, workers, args):
+    """measure() in a new interpreter, so each configuration starts from an empty process"""
+    command = [sys.executable, __file__, '--measure', mode, '--workers', str(workers),
+               '--model', args.model, '--seconds', str(args.seconds)] + (['--int8'] if args.int8 else [])
+    proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"{mode} with {workers} worker(s) failed:\n{proc.stderr or proc.stdout}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts')
+    parser.add_argument('--model', default=whisper_service.WHISPER_MODEL_NAME)
+    parser.add_argument('--int8', action='store_true', help='quantize the model to int8')
+    parser.add_argument('--seconds', type=int, default=5, help='length of the audio transcribed by each worker')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--measure', choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if process_memory(os.getpid()) is None:
+        sys.exit("This benchmark reads /proc/<pid>/smaps_rollup (Linux only)")
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, int(args.workers), args.model, args.int8, args.seconds)))
+        return
+
+    label = f"{args.model}{' (int8)' if args.int8 else ''}"
+    print(f"Whisper '{label}', {platform.processor() or platform.machine()}, {os.cpu_count()} cores\n")
+    print(f"{'workers':>7}  {'model':<22} {'RSS/worker':>11} {'private/worker':>15} "
+          f"{'parent RSS':>11} {'sum of RSS':>11} {'total (PSS)':>12}")
+    results = []
+    for workers in [int(n) for n in args.workers.split(',')]:
+        for mode, description in MODES.items():
+            result = run_isolated(mode, workers, args)
+            results.append(result)
+            per_worker = result['per_worker']
+            print(f"{workers:>7}  {description:<22} "
+                  f"{sum(w['rss'] for w in per_worker) / workers:>8.0f} MB "
+                  f"{sum(w['uss'] for w in per_worker) / workers:>12.0f} MB "
+                  f"{result['parent']['rss']:>8.0f} MB {result['total_rss']:>8.0f} MB "
+                  f"{result['total_pss']:>9.0f} MB")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'model': label, 'results': results}, indent=2, sort_keys=True))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
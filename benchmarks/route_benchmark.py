@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Route benchmark: latency percentiles, throughput and peak RSS of the app's
+routes (transcription, evaluation, prompt and vocabulary CRUD, TTS, pages),
+driven in-process through Flask's test client.
+
+Whisper, the OpenAI client and gTTS are replaced by fakes, so the benchmark
+needs no model, API key or network and measures the app's own overhead; their
+cost can be simulated with --whisper-rtf, --openai-latency and --tts-latency.
+With --whisper real, the configured Whisper model is loaded and used instead
+(CPU runs). Recordings are generated WAV files (speech-like bursts and pauses)
+of several lengths, and each one is unique so the transcript cache does not
+answer for Whisper; without ffmpeg they are decoded with the wave module.
+
+Prompts, vocabulary cards and caches live in a temporary directory, never the
+real data directory. Results are written as JSON (one entry per route, sorted
+keys) so runs on two commits can be diffed, or compared with --compare. The
+run fails when any route answers with an error status.
+
+Usage:
+    python benchmarks/route_benchmark.py [--requests 50] [--concurrency 1]
+        [--whisper fake|real] [--whisper-rtf 0] [--openai-latency 0] [--tts-latency 0]
+        [--bank-size 100] [--only transcribe,evaluate] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('WHISPER_STARTUP', 'lazy')
+
+import app  # noqa: E402
+import tts  # noqa: E402
+import whisper_service  # noqa: E402
+from audio_utils import SAMPLE_RATE  # noqa: E402
+from cache import TieredCache  # noqa: E402
+from storage import JSONStorage  # noqa: E402
+
+RESULTS_DIR = ROOT / 'data' / 'cache' / 'benchmarks'
+
+SENTENCE = ("I believe that studying abroad is one of the most valuable experiences a student can have "
+            "because it teaches independence and exposes them to um different cultures and ways of thinking").split()
+READING = ("The university plans to close the main library on weekends in order to reduce its operating costs. "
+           "According to the announcement, the savings will be used to extend the opening hours during the week. ") * 8
+FEEDBACK = ("<h4>Overall Score</h4><p>Score: 4/5 (80/100) - clear and well organised answer.</p>"
+            "<h4>Strengths</h4><ul><li>Direct answer to the question</li><li>Relevant example</li></ul>"
+            "<h4>Language & Vocabulary</h4><p>You said: 'very important' &rarr; Better: 'pivotal'.</p>") * 3
+# Recording lengths (seconds): a short answer, a full Task 1 answer, a Task 2-4 answer
+RECORDING_SECONDS = {'15s': 15, '45s': 45, '60s': 60}
+
+
+# ----------------------------------------------------------------------
+# Fakes
+# ----------------------------------------------------------------------
+
+class FakeWhisperModel:
+    """Whisper's transcribe(): ~2.5 words per second of audio, in 8-word segments with word timestamps"""
+
+    def __init__(self, rtf=0.0):
+        self.rtf = rtf
+
+    def transcribe(self, audio, **options):
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep(duration * self.rtf)
+        segments, words = [], []
+        for index in range(int(duration * 2.5)):
+            start = index / 2.5
+            words.append({'word': ' ' + SENTENCE[index % len(SENTENCE)], 'start': start, 'end': start + 0.3})
+            if len(words) == 8:
+                segments.append(self._segment(words))
+                words = []
+        if words:
+            segments.append(self._segment(words))
+        return {'text': ''.join(segment['text'] for segment in segments), 'segments': segments, 'language': 'en'}
+
+    @staticmethod
+    def _segment(words):
+        return {'start': words[0]['start'], 'end': words[-1]['end'],
+                'text': ''.join(word['word'] for word in words), 'words': list(words)}
+
+
+class FakeCompletions:
+    """chat.completions.create() answering FEEDBACK after `latency` seconds (streamed in small chunks)"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, model, messages, stream=False, **options):
+        time.sleep(self.latency)
+        if not stream:
+            message = SimpleNamespace(content=FEEDBACK)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return (
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=FEEDBACK[i:i + 16]))])
+            for i in range(0, len(FEEDBACK), 16)
+        )
+
+
+class FakeOpenAI:
+    def __init__(self, latency):
+        self.chat = SimpleNamespace(completions=FakeCompletions(latency))
+
+    def close(self):
+        pass
+
+
+class FakeGTTSBackend(tts.TTSBackend):
+    """Stands in for Google TTS: about 1.6 kB of 'MP3' per word"""
+    name = 'gtts'
+    latency = 0.0
+
+    def render(self, text, lang):
+        time.sleep(self.latency)
+        return b'\xff\xf3' * (800 * len(text.split()))
+
+
+def decode_wav(data, ffmpeg_path=None, sample_rate=SAMPLE_RATE):
+    """decode_to_pcm() for the generated WAV files, when ffmpeg is not installed"""
+    with wave.open(io.BytesIO(data)) as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), np.int16).astype(np.float32) / 32768.0
+
+
+def install_fakes(args, directory):
+    """Point the app at temporary data and at the fakes; returns a description of the setup"""
+    directory = Path(directory)
+    for task_num in [2, 3, 4, 5, 6]:
+        (directory / f'task{task_num}').mkdir()
+    app.storage = JSONStorage(
+        {task_num: directory / f'task{task_num}' / 'prompts.json' for task_num in [2, 3, 4, 5, 6]},
+        directory / 'prompts.txt', directory / 'vocabulary_cards.json', directory / 'config.json'
+    )
+    app.suggestion_index.reset()
+    app.transcript_cache = TieredCache(memory_bytes=16 * 1024 * 1024, directory=directory / 'transcripts',
+                                       disk_bytes=64 * 1024 * 1024, suffix='.json')
+    tts.configure(directory / 'tts', 64 * 1024 * 1024)
+
+    FakeGTTSBackend.latency = args.tts_latency
+    tts.BACKENDS['gtts'] = FakeGTTSBackend
+    tts._backends.clear()
+    app.openai_clients.clear()
+    app.openai_clients._create = lambda api_key: FakeOpenAI(args.openai_latency)
+
+    if args.whisper == 'real':
+        whisper_service.start_loading(background=False)
+        if not whisper_service.is_ready():
+            sys.exit(f"Whisper model failed to load: {whisper_service.status()['error']}")
+    else:
+        whisper_service.use_model(FakeWhisperModel(args.whisper_rtf), name='fake')
+
+    if not app.FFMPEG_PATH:
+        app.decode_to_pcm = decode_wav
+    return {
+        'whisper': whisper_service.settings(),
+        'ffmpeg': bool(app.FFMPEG_PATH),
+        'vad': app.WHISPER_VAD,
+    }
+
+
+def fill(bank_size):
+    """Prompt banks and a vocabulary deck of `bank_size` entries each"""
+    app.storage.save_task1_prompts('\n'.join(f'Question {i}: {" ".join(SENTENCE[:12])}?' for i in range(bank_size)))
+    for task_num in [2, 3, 4]:
+        app.storage.save_task_prompts(task_num, {'prompts': [
+            {'id': i, 'reading': READING, 'question': f'Question {i}?', 'audio_file': None,
+             'notes': READING[:400], 'topic': f'Topic {i}'}
+            for i in range(1, bank_size + 1)
+        ]})
+    app.save_vocabulary_cards([
+        {'date': '2024-01-01', 'question': f'Question {i}', 'title': f'Card {i}',
+         'content': f'Instead of "good{i}", say "beneficial", "advantageous", "favourable".'}
+        for i in range(bank_size)
+    ])
+
+
+# ----------------------------------------------------------------------
+# Payloads
+# ----------------------------------------------------------------------
+
+def recording(seconds, seed):
+    """WAV bytes: noise bursts shaped like words and phrases, with pauses in between"""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = int(0.5 * SAMPLE_RATE)
+    while position < len(audio):
+        phrase = int(rng.uniform(1.0, 4.0) * SAMPLE_RATE)
+        end = min(position + phrase, len(audio))
+        envelope = np.abs(np.sin(np.linspace(0, np.pi * phrase / SAMPLE_RATE * 4, end - position)))
+        audio[position:end] = rng.normal(0, 0.2, end - position) * envelope
+        position = end + int(rng.uniform(0.2, 1.5) * SAMPLE_RATE)
+    audio += rng.normal(0, 0.002, len(audio))
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def transcript_text(words):
+    return ' '.join(SENTENCE[i % len(SENTENCE)] for i in range(words))
+
+
+def speaking_payload(words, cached):
+    return {'api_key': 'sk-benchmark', 'question': 'Do you agree that students should study abroad?',
+            'transcript': transcript_text(words), 'word_count': words, 'speaking_time': 45,
+            'no_cache': not cached}
+
+
+def task_payload(task_num, words, cached):
+    return {'api_key': 'sk-benchmark', 'transcript': transcript_text(words), 'word_count': words,
+            'speaking_time': 60, 'reading_text': READING if task_num in (2, 3) else '', 'has_audio': True,
+            'no_cache': not cached}
+
+
+def scenarios(bank_size, transcribe_with_mp3):
+    """[(name, fn(client, i) -> response)], in the order they run (CRUD scenarios depend on each other)"""
+    created = {'prompts': [], 'cards': 0}
+    audio_seed = iter(range(10 ** 9))
+
+    def upload(path, seconds):
+        def request(client, i):
+            data = {'audio': (io.BytesIO(recording(seconds, next(audio_seed))), 'recording.wav')}
+            return client.post(path, data=data, content_type='multipart/form-data')
+        return request
+
+    def post_json(path, payload):
+        return lambda client, i: client.post(path, json=payload)
+
+    def create_prompt(client, i):
+        response = client.post('/api/task/3/prompts', json={'reading': READING, 'question': f'New question {i}?',
+                                                            'notes': READING[:400]})
+        created['prompts'].append(response.get_json()['prompt']['id'])
+        return response
+
+    def delete_prompt(client, i):
+        return client.delete(f"/api/task/3/prompts/{created['prompts'].pop()}")
+
+    def add_card(client, i):
+        created['cards'] += 1
+        return client.post('/api/vocabulary_cards', json={
+            'date': '2024-01-01', 'question': f'Question {i}', 'title': f'New card {i}',
+            'content': f'Instead of "nice{i}", say "delightful", "agreeable".'})
+
+    def delete_card(client, i):
+        created['cards'] -= 1
+        return client.delete(f'/api/vocabulary_cards/{bank_size}')
+
+    def stream(path, payload):
+        def request(client, i):
+            response = client.post(path, json=payload)
+            response.get_data()     # consume the event stream
+            return response
+        return request
+
+    routes = [
+        ('GET /', lambda client, i: client.get('/')),
+        ('GET /task1', lambda client, i: client.get('/task1')),
+        ('GET /task2', lambda client, i: client.get('/task2')),
+        ('GET /task3', lambda client, i: client.get('/task3')),
+        ('GET /task4', lambda client, i: client.get('/task4')),
+        ('GET /vocabulary', lambda client, i: client.get('/vocabulary')),
+    ]
+    for label, seconds in RECORDING_SECONDS.items():
+        routes.append((f'POST /transcribe [{label}]', upload('/transcribe', seconds)))
+    if transcribe_with_mp3:
+        routes.append(('POST /transcribe_with_mp3 [45s]', upload('/transcribe_with_mp3', 45)))
+    for label, words in [('short', 60), ('long', 160)]:
+        routes.append((f'POST /evaluate [{label}]', post_json('/evaluate', speaking_payload(words, False))))
+    routes += [
+        ('POST /evaluate [cached]', post_json('/evaluate', speaking_payload(110, True))),
+        ('POST /evaluate/stream', stream('/evaluate/stream', speaking_payload(110, False))),
+    ]
+    for task_num in [2, 3, 4]:
+        routes.append((f'POST /api/task/{task_num}/evaluate',
+                       post_json(f'/api/task/{task_num}/evaluate', task_payload(task_num, 150, False))))
+    routes += [
+        ('POST /api/task/3/evaluate [cached]', post_json('/api/task/3/evaluate', task_payload(3, 150, True))),
+        ('POST /api/evaluate/batch [4 tasks]', post_json('/api/evaluate/batch', {
+            'api_key': 'sk-benchmark', 'no_cache': True,
+            'responses': [dict(speaking_payload(110, False), task_num=1)] +
+                         [dict(task_payload(task_num, 150, False), task_num=task_num) for task_num in [2, 3, 4]]})),
+        ('GET /api/task/3/prompts/list', lambda client, i: client.get('/api/task/3/prompts/list')),
+        ('GET /api/task/3/prompts/<id>', lambda client, i: client.get(f'/api/task/3/prompts/{i % bank_size + 1}')),
+        ('POST /api/task/3/prompts', create_prompt),
+        ('PUT /api/task/3/prompts/<id>', lambda client, i: client.put(
+            f'/api/task/3/prompts/{i % bank_size + 1}', json={'question': f'Edited question {i}?'})),
+        ('DELETE /api/task/3/prompts/<id>', delete_prompt),
+        ('POST /save_prompts', lambda client, i: client.post('/save_prompts', json={
+            'prompts': '\n'.join(f'Question {n}: {" ".join(SENTENCE[:12])}?' for n in range(bank_size))})),
+        ('GET /api/vocabulary_cards', lambda client, i: client.get('/api/vocabulary_cards')),
+        ('POST /api/vocabulary_cards', add_card),
+        ('DELETE /api/vocabulary_cards/<index>', delete_card),
+        ('POST /create_audio [miss]', lambda client, i: client.post('/create_audio', json={
+            'text': f'{i} {random.random()} ' + ' '.join(SENTENCE[:20])})),
+        ('POST /create_audio [hit]', post_json('/create_audio', {'text': ' '.join(SENTENCE[:20])})),
+    ]
+    return routes
+
+
+# ----------------------------------------------------------------------
+# Measurements
+# ----------------------------------------------------------------------
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux), so each route gets its own peak"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (MB), since the last reset_peak_rss() where supported"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run(fn, count, concurrency):
+    """Send `count` requests with `concurrency` threads; returns (latencies in ms, errors, wall time)"""
+    latencies, errors = [], []
+    counter = iter(range(count))
+    lock = threading.Lock()
+
+    def worker():
+        client = app.app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                response = fn(client, i)
+                status = response.status_code
+            except Exception as e:
+                status = repr(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if status != 200:
+                    errors.append(status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies, errors, wall, peak):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_statuses': sorted({str(status) for status in errors}),
+        'mean_ms': round(float(np.mean(latencies)), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(np.max(latencies)), 3),
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'peak_rss_mb': peak,
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, False
+
+
+def compare(results, previous_path):
+    """Print the p50/p95 change of each route against an earlier results file"""
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\nAgainst {previous_path} ({(previous.get('commit') or 'unknown')[:10]}):")
+    print(f"{'route':<42}{'p50 (ms)':>12}{'change':>9}{'p95 (ms)':>12}{'change':>9}")
+    for name, route in results['routes'].items():
+        before = previous['routes'].get(name)
+        if before is None:
+            print(f"{name:<42}{route['p50_ms']:>12.2f}{'new':>9}{route['p95_ms']:>12.2f}{'new':>9}")
+            continue
+        changes = [f"{(route[k] - before[k]) / before[k]:+.0%}" if before[k] else 'n/a' for k in ('p50_ms', 'p95_ms')]
+        print(f"{name:<42}{route['p50_ms']:>12.2f}{changes[0]:>9}{route['p95_ms']:>12.2f}{changes[1]:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads per route')
+    parser.add_argument('--whisper', choices=['fake', 'real'], default='fake')
+    parser.add_argument('--whisper-rtf', type=float, default=0.0, help='fake Whisper: seconds per second of audio')
+    parser.add_argument('--openai-latency', type=float, default=0.0, help='fake OpenAI: seconds per completion')
+    parser.add_argument('--tts-latency', type=float, default=0.0, help='fake gTTS: seconds per rendering')
+    parser.add_argument('--bank-size', type=int, default=100, help='prompts per task and vocabulary cards')
+    parser.add_argument('--only', default='', help='comma-separated substrings of the routes to run')
+    parser.add_argument('--output', help=f'results file (default: {RESULTS_DIR.relative_to(ROOT)}/routes-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare with')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='route-benchmark-')
+    try:
+        setup = install_fakes(args, directory)
+        fill(args.bank_size)
+        routes = scenarios(args.bank_size, transcribe_with_mp3=bool(app.FFMPEG_PATH))
+        only = [pattern for pattern in args.only.split(',') if pattern]
+        if only:
+            routes = [(name, fn) for name, fn in routes if any(pattern in name for pattern in only)]
+
+        commit, dirty = git_revision()
+        results = {
+            'benchmark': 'routes',
+            'commit': commit,
+            'dirty': dirty,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {
+                'requests': args.requests, 'concurrency': args.concurrency, 'bank_size': args.bank_size,
+                'whisper_mode': args.whisper, 'whisper_rtf': args.whisper_rtf,
+                'openai_latency': args.openai_latency, 'tts_latency': args.tts_latency, **setup,
+            },
+            'routes': {},
+        }
+
+        per_route_peak = reset_peak_rss()
+        print(f"{args.requests} requests per route, concurrency {args.concurrency}, Whisper: {args.whisper}"
+              f"{'' if per_route_peak else ' (peak RSS is cumulative on this platform)'}")
+        print(f"{'route':<42}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'req/s':>9}{'RSS (MB)':>10}{'errors':>8}")
+        for name, fn in routes:
+            fn(app.app.test_client(), args.requests)    # warm-up, not measured
+            reset_peak_rss()
+            latencies, errors, wall = run(fn, args.requests, args.concurrency)
+            route = results['routes'][name] = summarize(latencies, errors, wall, peak_rss_mb())
+            print(f"{name:<42}{route['p50_ms']:>10.2f}{route['p95_ms']:>10.2f}{route['p99_ms']:>10.2f}"
+                  f"{route['throughput_rps']:>9.1f}{route['peak_rss_mb'] or 0:>10.1f}{route['errors']:>8}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"routes-{(commit or 'nogit')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+    failed = [name for name, route in results['routes'].items() if route['errors']]
+    if failed:
+        # Timings of error responses say nothing about the route
+        sys.exit(f"{len(failed)} route(s) answered with errors: {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup benchmark: time from process launch to the first successful response
+of the page routes, for each Whisper startup mode.
+
+'eager' reproduces the old behaviour (whisper imported and model loaded at
+import time), 'background' is the new default.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 3] [--modes eager,background]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGE_ROUTES = ['/', '/vocabulary', '/task1']
+
+SERVER_CODE = (
+    "import app; "
+    "app.create_app().run(host='127.0.0.1', port={port}, debug=False, use_reloader=False)"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get_status(url, timeout=2):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def measure(mode, deadline=600):
+    """Launch the app in `mode` and return time-to-first-response per route"""
+    port = free_port()
+    env = dict(os.environ, WHISPER_STARTUP=mode)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-c', SERVER_CODE.format(port=port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    timings = {}
+    try:
+        for route in PAGE_ROUTES:
+            while time.perf_counter() - start < deadline:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server exited with code {proc.returncode}")
+                if get_status(f"http://127.0.0.1:{port}{route}") == 200:
+                    timings[route] = time.perf_counter() - start
+                    break
+                time.sleep(0.05)
+        # Time until the model is ready, for reference
+        while time.perf_counter() - start < deadline:
+            if get_status(f"http://127.0.0.1:{port}/readyz") == 200:
+                timings['/readyz'] = time.perf_counter() - start
+                break
+            if mode == 'eager':
+                # eager mode has the model loaded before the first page response
+                timings['/readyz'] = timings[PAGE_ROUTES[0]]
+                break
+            time.sleep(0.1)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', default='eager,background')
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'route':<14}{'median (s)':>12}{'min (s)':>10}{'max (s)':>10}")
+    for mode in args.modes.split(','):
+        runs = [measure(mode) for _ in range(args.runs)]
+        for route in PAGE_ROUTES + ['/readyz']:
+            values = [run[route] for run in runs if route in run]
+            if not values:
+                print(f"{mode:<12}{route:<14}{'n/a':>12}")
+                continue
+            print(f"{mode:<12}{route:<14}{statistics.median(values):>12.2f}"
+                  f"{min(values):>10.2f}{max(values):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Storage benchmark: latency of one mutation (add a vocabulary card, edit a
+prompt, add a prompt) against bank size, for the JSON and SQLite backends.
+
+Runs against temporary copies, never the real data directory.
+
+Usage:
+    python benchmarks/storage_benchmark.py [--sizes 100,1000,10000] [--ops 50]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from storage import JSONStorage, SQLiteStorage  # noqa: E402
+
+TASK = 3
+
+
+def make_backends(directory):
+    directory = Path(directory)
+    json_storage = JSONStorage({TASK: directory / 'prompts.json'}, directory / 'prompts.txt',
+                               directory / 'vocabulary_cards.json', directory / 'config.json')
+    return {'json': json_storage, 'sqlite': SQLiteStorage(directory / 'app.db')}
+
+
+def fill(storage, size):
+    storage.save_task_prompts(TASK, {'prompts': [
+        {'id': i, 'reading': f'Reading passage {i}. ' * 40, 'question': f'Question {i}?',
+         'audio_file': None, 'notes': ''}
+        for i in range(1, size + 1)
+    ]})
+    storage.save_vocabulary_cards([
+        {'date': '2024-01-01', 'question': f'Question {i}', 'title': f'Card {i}',
+         'content': 'Instead of "good", say "beneficial". ' * 10}
+        for i in range(size)
+    ])
+
+
+def timed(fn, ops):
+    samples = []
+    for i in range(ops):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--ops', type=int, default=50)
+    args = parser.parse_args()
+
+    operations = {
+        'add card': lambda storage, size: lambda i: storage.add_vocabulary_card(
+            {'date': '2024-01-02', 'question': 'Q', 'title': f'New {i}', 'content': 'Instead of "big", say "substantial".'}),
+        'edit prompt': lambda storage, size: lambda i: storage.update_prompt(
+            TASK, 1 + i % size, {'notes': f'edited {i}'}),
+        'add prompt': lambda storage, size: lambda i: storage.add_prompt(
+            TASK, {'reading': 'New reading', 'question': 'New question?', 'audio_file': None, 'notes': ''}),
+    }
+
+    print(f"median latency per mutation (ms), {args.ops} operations")
+    print(f"{'size':>8}  {'operation':<12}{'json':>10}{'sqlite':>10}")
+    for size in [int(size) for size in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as directory:
+            backends = make_backends(directory)
+            for storage in backends.values():
+                fill(storage, size)
+            for name, operation in operations.items():
+                results = [timed(operation(storage, size), args.ops) for storage in backends.values()]
+                print(f"{size:>8}  {name:<12}" + ''.join(f"{result:>10.2f}" for result in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS latency benchmark: render the same prompts with every available engine,
+bypassing the cache, and compare latency and output size.
+
+Engine settings (voices, piper model...) are read from the "tts" section of
+data/config.json.
+
+Usage:
+    python benchmarks/tts_benchmark.py [--runs 3] [--engines gtts,espeak,piper] [--prompts 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('WHISPER_STARTUP', 'lazy')
+
+import app  # noqa: E402
+import tts  # noqa: E402
+
+FALLBACK_PROMPTS = [
+    'Describe a place in your city that you like to visit.',
+    'What do you usually do on weekends?',
+    'Tell me about a skill you would like to learn and why.',
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--engines', default=','.join(tts.BACKENDS))
+    parser.add_argument('--prompts', type=int, default=5, help='number of prompts from the bank')
+    args = parser.parse_args()
+
+    texts = app.tts_prompt_texts()[:args.prompts] or FALLBACK_PROMPTS
+    settings = app.tts_settings()
+
+    print(f"{len(texts)} prompts x {args.runs} runs")
+    print(f"{'engine':<10}{'mean (s)':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'kB/prompt':>11}{'failures':>10}")
+    for name in args.engines.split(','):
+        backend = tts.get_backend(name, settings)
+        if not backend.available():
+            print(f"{name:<10}{'not available':>30}")
+            continue
+        latencies, sizes, failures = [], [], 0
+        for _ in range(args.runs):
+            for text in texts:
+                start = time.perf_counter()
+                try:
+                    data = backend.render(text, 'en')
+                except Exception as e:
+                    failures += 1
+                    print(f"  {name}: {e}", file=sys.stderr)
+                    continue
+                latencies.append(time.perf_counter() - start)
+                sizes.append(len(data))
+        if not latencies:
+            print(f"{name:<10}{'n/a':>10}{'':>31}{failures:>10}")
+            continue
+        print(f"{name:<10}{statistics.mean(latencies):>10.3f}{percentile(latencies, 0.5):>10.3f}"
+              f"{percentile(latencies, 0.95):>10.3f}{statistics.mean(sizes) / 1024:>11.1f}{failures:>10}")
+
+
+if __name__ == '__main__':
+    main()
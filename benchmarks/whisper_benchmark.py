@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whisper benchmark: real-time factor (processing time / audio duration) and
+word error rate of each decode profile, for the given model sizes, with and
+without int8 quantization.
+
+The clips are synthetic, but no audio is shipped with the repository: the
+reference sentences below are rendered with a TTS engine on the first run and
+kept under data/cache/whisper_benchmark/. Results therefore depend on the
+engine (and gtts needs the network), so only compare runs made with the same
+--engine, or point --clips at a fixed directory of <name>.wav files with their
+reference text in <name>.txt. Synthetic speech is cleaner than a student's
+recording, so compare the profiles with each other rather than reading the WER
+as an absolute figure.
+
+Usage:
+    python benchmarks/whisper_benchmark.py [--models tiny,base] [--quantize both]
+        [--profiles fast,balanced,accurate] [--engine espeak | --clips DIR] [--runs 1]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('WHISPER_STARTUP', 'lazy')
+
+import app  # noqa: E402
+import tts  # noqa: E402
+import whisper_service  # noqa: E402
+from audio_utils import SAMPLE_RATE, decode_to_pcm  # noqa: E402
+from cache import make_key  # noqa: E402
+
+CLIPS_DIR = ROOT / 'data' / 'cache' / 'whisper_benchmark'
+
+# Sentences in the style of TOEFL speaking answers
+REFERENCES = [
+    "I believe that studying abroad is one of the most valuable experiences a student can have.",
+    "The university plans to close the library on weekends in order to reduce its operating costs.",
+    "In the lecture, the professor explains that animals use camouflage to avoid their predators.",
+    "First of all, working in groups helps students develop communication skills they will need later.",
+    "The woman disagrees with the proposal because the new parking fees are too expensive for students.",
+    "For example, when I was in high school, I volunteered at a local hospital every summer.",
+    "According to the reading, the concept of social loafing describes people who work less in a team.",
+    "To sum up, I prefer living in a big city because of the opportunities and the cultural activities.",
+]
+
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]+", ' ', text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + insertions + deletions)"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_fixed_clips(directory):
+    """<name>.wav clips with their reference text in <name>.txt; returns [(reference, pcm)]"""
+    clips = []
+    for path in sorted(Path(directory).glob('*.wav')):
+        reference = path.with_suffix('.txt')
+        if not reference.exists():
+            sys.exit(f"{path.name} has no reference text ({reference.name})")
+        clips.append((reference.read_text(encoding='utf-8').strip(),
+                      decode_to_pcm(path.read_bytes(), app.FFMPEG_PATH or 'ffmpeg')))
+    if not clips:
+        sys.exit(f"No .wav clips in {directory}")
+    return clips
+
+
+def load_clips(engine):
+    """Render (or reuse) one clip per reference sentence; returns [(reference, pcm)]"""
+    backend = tts.get_backend(engine, app.tts_settings())
+    if not backend.available():
+        sys.exit(f"TTS engine '{engine}' is not available (try --engine gtts, espeak or piper)")
+    CLIPS_DIR.mkdir(parents=True, exist_ok=True)
+    clips = []
+    for reference in REFERENCES:
+        path = CLIPS_DIR / f'{make_key(reference, engine)[:16]}.mp3'
+        if not path.exists():
+            path.write_bytes(backend.render(reference, 'en'))
+        clips.append((reference, decode_to_pcm(path.read_bytes(), app.FFMPEG_PATH or 'ffmpeg')))
+    return clips
+
+
+def run_profile(model, clips, profile, runs):
+    elapsed, errors, words = 0.0, 0, 0
+    options = {**app.TRANSCRIBE_OPTIONS, **whisper_service.decode_options(profile)}
+    for _ in range(runs):
+        for reference, pcm in clips:
+            start = time.perf_counter()
+            result = model.transcribe(pcm, verbose=False, fp16=False, **options)
+            elapsed += time.perf_counter() - start
+            clip_errors, clip_words = word_errors(reference, result['text'])
+            errors += clip_errors
+            words += clip_words
+    audio_seconds = runs * sum(len(pcm) for _, pcm in clips) / SAMPLE_RATE
+    return elapsed / audio_seconds, errors / words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', default=whisper_service.WHISPER_MODEL_NAME)
+    parser.add_argument('--quantize', choices=['no', 'yes', 'both'], default='both')
+    parser.add_argument('--profiles', default=','.join(whisper_service.DECODE_PROFILES))
+    parser.add_argument('--engine', default='espeak', help='TTS engine used to render the clips')
+    parser.add_argument('--clips', help='directory of fixed .wav clips (+ .txt references) instead of TTS')
+    parser.add_argument('--runs', type=int, default=1)
+    args = parser.parse_args()
+
+    clips = load_fixed_clips(args.clips) if args.clips else load_clips(args.engine)
+    audio_seconds = sum(len(pcm) for _, pcm in clips) / SAMPLE_RATE
+    quantize = {'no': [False], 'yes': [True], 'both': [False, True]}[args.quantize]
+
+    print(f"{len(clips)} clips ({audio_seconds:.1f}s of audio) x {args.runs} runs, RTF < 1 is faster than real time")
+    print(f"{'model':<12}{'int8':<6}{'profile':<10}{'load (s)':>10}{'RTF':>8}{'WER':>8}")
+    for model_name in args.models.split(','):
+        for int8 in quantize:
+            start = time.perf_counter()
+            try:
+                model = whisper_service.load_model(model_name, quantize=int8)
+            except Exception as e:
+                print(f"{model_name:<12}{'yes' if int8 else 'no':<6}{'failed to load: ' + str(e)}")
+                continue
+            load_time = time.perf_counter() - start
+            # Warm-up pass, not measured
+            model.transcribe(clips[0][1], verbose=False, fp16=False, **app.TRANSCRIBE_OPTIONS)
+            for profile in args.profiles.split(','):
+                rtf, wer = run_profile(model, clips, profile, args.runs)
+                print(f"{model_name:<12}{'yes' if int8 else 'no':<6}{profile:<10}{load_time:>10.1f}"
+                      f"{rtf:>8.3f}{wer:>8.1%}")
+            del model
+
+
+if __name__ == '__main__':
+    main()
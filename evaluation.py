@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+GPT evaluation calls: one-shot completions and token streaming.
+
+Clients are kept in a small registry keyed by API key, so back-to-back
+evaluations reuse the same HTTP connection pool (and TLS sessions) instead of
+building a new OpenAI client per request. Idle clients are closed after a
+while and the registry is bounded in size.
+
+The evaluator is asked for plain HTML, but sometimes wraps it in a ```html
+fence or adds emojis; clean_feedback() strips both. FeedbackCleaner does the
+same on a token stream, holding back only the few characters that may belong
+to a fence, so the cleaned text can be relayed to the browser as it arrives.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from cache import make_key
+
+EVALUATION_MODEL = "gpt-4o-mini"  # More affordable than gpt-4
+COMPLETION_OPTIONS = {'temperature': 0.7, 'max_tokens': 1500}
+# Bump when the evaluation prompts change, so that cached feedback is not reused
+RUBRIC_VERSION = 3
+
+# HTTP settings of the pooled clients (seconds)
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+MAX_RETRIES = 2
+KEEPALIVE_SECONDS = 120
+
+FENCE_OPEN = re.compile(r'^```html\s*', re.MULTILINE)
+FENCE_CLOSE = re.compile(r'```\s*$', re.MULTILINE)
+# "Score: X/5 (Y/100)", as the evaluation prompts ask for
+SCORE = re.compile(r'Score:\s*(\d+(?:\.\d+)?)\s*/\s*5\s*\(\s*(\d+(?:\.\d+)?)\s*/\s*100', re.IGNORECASE)
+HTML_TAG = re.compile(r'<[^>]+>')
+# Basic emoji removal
+EMOJI = re.compile('[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF'
+                   '\U00002702-\U000027B0\U000024C2-\U0001F251]+')
+
+
+def clean_feedback(feedback):
+    """Remove markdown code fences and emojis from the evaluator's HTML"""
+    feedback = FENCE_OPEN.sub('', feedback)
+    feedback = FENCE_CLOSE.sub('', feedback)
+    return EMOJI.sub('', feedback)
+
+
+class FeedbackCleaner:
+    """Incremental clean_feedback(): feed() tokens, get back the text safe to display"""
+
+    def __init__(self):
+        self._pending = ''
+
+    @staticmethod
+    def _plain(char):
+        # Characters that can never be part of a fence match (```html + whitespace)
+        return not char.isspace() and char not in '`html'
+
+    def feed(self, text):
+        """
+        Release the pending text up to the last point where a fence match
+        cannot start, end or span (two plain characters in a row), so that the
+        concatenated output is exactly clean_feedback() of the whole text.
+        """
+        self._pending += text
+        pending = self._pending
+        for cut in range(len(pending) - 1, 0, -1):
+            if self._plain(pending[cut]) and self._plain(pending[cut - 1]):
+                self._pending = pending[cut:]
+                return clean_feedback(pending[:cut])
+        return ''
+
+    def finish(self):
+        out, self._pending = self._pending, ''
+        return clean_feedback(out)
+
+
+class ClientPool:
+    """OpenAI clients keyed by API key, least recently used evicted first"""
+
+    def __init__(self, max_clients=32, idle_seconds=600, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES):
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self._clients = OrderedDict()   # sha256(api_key) -> {'client', 'created', 'last_used', 'requests'}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.evictions = 0
+
+    def _create(self, api_key):
+        # Limits come from the HTTP library the pinned openai release is built on
+        from httpx2 import Limits
+        from openai import DefaultHttpxClient, OpenAI, Timeout
+
+        timeout = Timeout(self.read_timeout, connect=self.connect_timeout)
+        http_client = DefaultHttpxClient(
+            timeout=timeout,
+            limits=Limits(max_connections=100, max_keepalive_connections=8, keepalive_expiry=KEEPALIVE_SECONDS),
+        )
+        return OpenAI(api_key=api_key, timeout=timeout, max_retries=self.max_retries, http_client=http_client)
+
+    def get(self, api_key):
+        key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                self.reused += 1
+            else:
+                entry = {'client': self._create(api_key), 'created': now, 'requests': 0}
+                self._clients[key] = entry
+                self.created += 1
+                while len(self._clients) > self.max_clients:
+                    _, oldest = self._clients.popitem(last=False)
+                    self._close(oldest)
+            entry['last_used'] = now
+            entry['requests'] += 1
+            return entry['client']
+
+    def _evict_idle(self, now):
+        for key, entry in list(self._clients.items()):
+            if now - entry['last_used'] > self.idle_seconds:
+                del self._clients[key]
+                self._close(entry)
+
+    def _close(self, entry):
+        self.evictions += 1
+        try:
+            entry['client'].close()
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            while self._clients:
+                _, entry = self._clients.popitem()
+                self._close(entry)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'max_clients': self.max_clients,
+                'idle_seconds': self.idle_seconds,
+                'created': self.created,
+                'reused': self.reused,
+                'evictions': self.evictions,
+                'timeouts': {'connect': self.connect_timeout, 'read': self.read_timeout},
+                'per_client': [
+                    {
+                        'key': key[:8],
+                        'requests': entry['requests'],
+                        'age': round(now - entry['created'], 1),
+                        'idle': round(now - entry['last_used'], 1),
+                    }
+                    for key, entry in self._clients.items()
+                ],
+            }
+
+
+def parse_score(feedback):
+    """(score out of 5, score out of 100) announced in the feedback, or None"""
+    match = SCORE.search(HTML_TAG.sub('', feedback or ''))
+    if match is None:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def summarize_scores(scores):
+    """Aggregate of the per-task (x/5, y/100) scores of a sitting (None for unscored tasks)"""
+    scored = [score for score in scores if score is not None]
+    if not scored:
+        return {'scored_tasks': 0, 'total': None, 'max_total': 0, 'average': None, 'percentage': None}
+    total = sum(score[0] for score in scored)
+    return {
+        'scored_tasks': len(scored),
+        'total': round(total, 1),
+        'max_total': 5 * len(scored),
+        'average': round(total / len(scored), 2),
+        'percentage': round(sum(score[1] for score in scored) / len(scored), 1),
+    }
+
+
+def cache_key(task_num, context, transcript, word_count):
+    """Key of the feedback for a response: same task, context and transcript give the same feedback"""
+    return make_key('feedback', task_num, EVALUATION_MODEL, RUBRIC_VERSION, COMPLETION_OPTIONS,
+                    context, transcript, word_count)
+
+
+def messages(system_message, prompt):
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def complete(client, chat_messages):
+    """Run the evaluation and return the cleaned feedback"""
+    response = client.chat.completions.create(
+        model=EVALUATION_MODEL,
+        messages=chat_messages,
+        **COMPLETION_OPTIONS
+    )
+    return clean_feedback(response.choices[0].message.content or '')
+
+
+def stream(client, chat_messages):
+    """Generator of cleaned feedback pieces, as the completion streams in"""
+    response = client.chat.completions.create(
+        model=EVALUATION_MODEL,
+        messages=chat_messages,
+        stream=True,
+        **COMPLETION_OPTIONS
+    )
+    cleaner = FeedbackCleaner()
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content
+        if text:
+            piece = cleaner.feed(text)
+            if piece:
+                yield piece
+    piece = cleaner.finish()
+    if piece:
+        yield piece
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_feedback(pieces, cached=False):
+    """
+    Server-Sent Events for a feedback stream: 'delta' events with the new text,
+    then 'done' with the whole feedback, or 'error'.
+    """
+    parts = []
+    try:
+        for piece in pieces:
+            parts.append(piece)
+            yield sse_event('delta', {'text': piece})
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+        return
+    yield sse_event('done', {'feedback': ''.join(parts), 'cached': cached})
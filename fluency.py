@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Fluency metrics computed from Whisper's word timestamps.
+
+Transcriptions request word_timestamps=True, so every segment carries its
+words with start/end times. From those, metrics() derives the usual fluency
+measures in one vectorised pass over the word arrays:
+
+- speech rate: words per minute from the first to the last word
+- articulation rate: words per minute excluding silent pauses
+- pauses: silences between words of at least PAUSE_SECONDS, with their
+  length distribution
+- fillers: hesitation words (um, uh...) in the transcript. Whisper normally
+  leaves them out; transcriptions are started with FILLER_PROMPT, a disfluent
+  prompt that makes it write them down, and even then it may miss some
+- runs: stretches of speech without a pause (mean and longest)
+
+They are returned with the transcript so students get numbers right away, and
+passed to the evaluator as compact structured data.
+"""
+
+import re
+
+import numpy as np
+
+# A silence between two words counts as a pause from this length (seconds)
+PAUSE_SECONDS = 0.25
+# Upper bounds of the short and medium pause buckets; longer ones are long pauses
+PAUSE_BUCKETS = (0.5, 1.0)
+FILLERS = {'um', 'umm', 'uh', 'uhm', 'uhh', 'er', 'erm', 'ah', 'hmm', 'mm', 'mhm'}
+# initial_prompt for Whisper, so that it transcribes hesitations instead of dropping them
+FILLER_PROMPT = "Umm, let me think, uh... like, hmm. Okay, so, um, here's what I think."
+
+WORD_PATTERN = re.compile(r"[^a-z']+")
+
+
+def words_of(segments):
+    """(texts, starts, ends) of all the words of the segments"""
+    words = [word for segment in segments for word in segment.get('words') or []]
+    texts = [WORD_PATTERN.sub('', word['word'].lower()) for word in words]
+    starts = np.array([word['start'] for word in words], dtype=np.float64)
+    ends = np.array([word['end'] for word in words], dtype=np.float64)
+    return texts, starts, ends
+
+
+def metrics(segments):
+    """Fluency measures of a transcription, or None without word timestamps"""
+    texts, starts, ends = words_of(segments)
+    count = len(texts)
+    if count == 0:
+        return None
+
+    span = float(max(ends[-1] - starts[0], 1e-6))
+    gaps = np.maximum(starts[1:] - ends[:-1], 0.0)
+    is_pause = gaps >= PAUSE_SECONDS
+    pauses = gaps[is_pause]
+    phonation = float(max(span - pauses.sum(), 1e-6))
+    filler_count = int(np.count_nonzero(np.isin(np.array(texts), list(FILLERS))))
+
+    # Runs of words between pauses: boundaries at every pause
+    breaks = np.flatnonzero(is_pause)
+    run_starts = np.concatenate(([0], breaks + 1))
+    run_ends = np.concatenate((breaks, [count - 1]))
+    run_words = run_ends - run_starts + 1
+    run_seconds = ends[run_ends] - starts[run_starts]
+    longest = int(np.argmax(run_words))
+
+    short, medium = PAUSE_BUCKETS
+    return {
+        'words': count,
+        'speaking_span': round(span, 2),
+        'speech_rate': round(count / span * 60, 1),
+        'articulation_rate': round(count / phonation * 60, 1),
+        'pauses': {
+            'count': int(len(pauses)),
+            'per_minute': round(len(pauses) / span * 60, 1),
+            'total': round(float(pauses.sum()), 2),
+            'mean': round(float(pauses.mean()), 2) if len(pauses) else 0.0,
+            'longest': round(float(pauses.max()), 2) if len(pauses) else 0.0,
+            'short': int(np.count_nonzero(pauses < short)),
+            'medium': int(np.count_nonzero((pauses >= short) & (pauses < medium))),
+            'long': int(np.count_nonzero(pauses >= medium)),
+        },
+        'fillers': {
+            'count': filler_count,
+            'per_minute': round(filler_count / span * 60, 1),
+        },
+        'runs': {
+            'mean_words': round(float(run_words.mean()), 1),
+            'longest_words': int(run_words[longest]),
+            'longest_seconds': round(float(run_seconds[longest]), 2),
+        },
+    }
+
+
+def summary(fluency):
+    """Short text version of metrics() for the evaluation prompt"""
+    pauses = fluency['pauses']
+    return (
+        f"- Speech rate: {fluency['speech_rate']} wpm, articulation rate (pauses excluded): "
+        f"{fluency['articulation_rate']} wpm\n"
+        f"- Pauses >= {PAUSE_SECONDS}s: {pauses['count']} ({pauses['per_minute']}/min, mean {pauses['mean']}s, "
+        f"longest {pauses['longest']}s; {pauses['long']} over {PAUSE_BUCKETS[1]}s)\n"
+        f"- Fillers (um, uh...): {fluency['fillers']['count']} as transcribed (a lower bound, some may be missed)\n"
+        f"- Fluent runs: {fluency['runs']['mean_words']} words on average, longest "
+        f"{fluency['runs']['longest_words']} words ({fluency['runs']['longest_seconds']}s)"
+    )
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-process Whisper inference pool.
+
+Whisper inference is CPU-bound and holds the GIL for long stretches, so
+running it on Flask request threads serializes concurrent students. The pool
+starts N worker processes and feeds them from a bounded queue so throughput
+scales with the number of cores.
+
+Spawned workers each load their own copy of the model. When the model is
+loaded once in the parent and handed to the pool, the workers are forked
+instead and share its weights copy-on-write: inference never writes to them,
+so N workers cost one model plus their activations. Forking is only safe
+before the server starts its threads, so a worker that crashes later is
+replaced by a spawned one, which loads its own copy.
+"""
+
+import multiprocessing as mp
+import queue
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import Future
+from pathlib import Path
+
+
+class PoolBusy(Exception):
+    """Raised when the request queue is full"""
+
+
+def process_memory(pid):
+    """
+    Memory of a process in bytes: resident (rss), proportional (pss: each shared
+    page divided among the processes mapping it) and private (uss).
+    None where /proc/<pid>/smaps_rollup is not available (Linux only).
+    """
+    try:
+        text = Path(f'/proc/{pid}/smaps_rollup').read_text()
+    except OSError:
+        return None
+    fields = {}
+    for line in text.splitlines()[1:]:
+        name, _, value = line.partition(':')
+        fields[name] = int(value.split()[0]) * 1024
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def _worker_main(worker_id, model_name, quantize, tasks, results, model=None, threads=0):
+    """Worker process: load the model once (unless inherited from the parent), then transcribe jobs until told to stop"""
+    try:
+        if model is None:
+            from whisper_service import load_model
+            model = load_model(model_name, quantize)
+        torch = sys.modules.get('torch')
+        if threads and torch is not None:
+            torch.set_num_threads(threads)
+    except Exception as e:
+        results.put(('failed', worker_id, None, str(e)))
+        return
+    results.put(('ready', worker_id, None, None))
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        job_id, audio, options = item
+        results.put(('started', worker_id, job_id, None))
+        try:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
+                result = model.transcribe(audio, **options)
+            results.put(('done', worker_id, job_id, result))
+        except Exception as e:
+            results.put(('error', worker_id, job_id, str(e)))
+
+
+class InferencePool:
+    """Pool of Whisper worker processes with a bounded request queue"""
+
+    def __init__(self, size, model_name, max_queue=8, start_method=None, quantize=False, model=None, threads=0):
+        self.size = size
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_queue = max_queue
+        # A preloaded model only reaches the workers through fork (spawn would pickle it)
+        self.model = model
+        self.threads = threads
+        self._ctx = mp.get_context(start_method or ('fork' if model is not None else 'spawn'))
+        # Replacements for crashed workers are spawned: by then this process runs
+        # server threads whose locks a forked child could inherit held
+        self._respawn_ctx = mp.get_context('spawn')
+        # Spawn-context queues, which spawned replacements can receive
+        self._tasks = self._respawn_ctx.Queue()
+        self._results = self._respawn_ctx.Queue()
+        self._lock = threading.Lock()
+        # At most `size` jobs running plus `max_queue` waiting
+        self._slots = threading.BoundedSemaphore(size + max_queue)
+        self._futures = {}
+        self._next_job_id = 0
+        self._ready = threading.Event()
+        self._workers = {}
+        self._collector = None
+        self._closed = False
+        self.failures = []
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect, name='whisper-pool-collector', daemon=True)
+        self._collector.start()
+
+    def _spawn(self, worker_id, replacement=False):
+        ctx, model = (self._respawn_ctx, None) if replacement else (self._ctx, self.model)
+        process = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.model_name, self.quantize, self._tasks, self._results, model, self.threads),
+            name=f'whisper-worker-{worker_id}',
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = {
+            'process': process,
+            'shared_model': model is not None,
+            'state': 'loading',      # loading -> idle <-> busy | failed
+            'job_id': None,
+            'spawned_at': time.time(),
+            'ready_at': None,
+            'busy_since': None,
+            'busy_time': 0.0,
+            'jobs': 0,
+            'errors': 0,
+        }
+
+    def shutdown(self):
+        self._closed = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers.values():
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+
+    def wait_ready(self, timeout=None):
+        """Wait until at least one worker has loaded its model"""
+        return self._ready.wait(timeout)
+
+    @property
+    def failed(self):
+        return bool(self._workers) and all(w['state'] == 'failed' for w in self._workers.values())
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def submit(self, audio, **options):
+        """Queue a transcription job and return a Future with Whisper's result dict"""
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusy(f"Transcription queue is full ({self.max_queue} waiting)")
+        future = Future()
+        with self._lock:
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._futures[job_id] = future
+        self._tasks.put((job_id, audio, options))
+        return future
+
+    def _finish(self, job_id, result=None, error=None):
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+        if future is None:
+            return
+        self._slots.release()
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(result)
+
+    def _collect(self):
+        """Route worker messages to futures and keep per-worker statistics"""
+        while not self._closed:
+            try:
+                kind, worker_id, job_id, payload = self._results.get(timeout=1)
+            except queue.Empty:
+                self._check_workers()
+                continue
+
+            worker = self._workers[worker_id]
+            now = time.time()
+            if kind == 'ready':
+                worker['state'] = 'idle'
+                worker['ready_at'] = now
+                self._ready.set()
+            elif kind == 'failed':
+                worker['state'] = 'failed'
+                self.failures.append(payload)
+                print(f"Whisper worker {worker_id} failed to load: {payload}")
+                if self.failed:
+                    # Nobody will ever become ready; wake up waiters
+                    self._ready.set()
+            elif kind == 'started':
+                worker['state'] = 'busy'
+                worker['job_id'] = job_id
+                worker['busy_since'] = now
+            else:
+                if worker['busy_since'] is not None:
+                    worker['busy_time'] += now - worker['busy_since']
+                worker['state'] = 'idle'
+                worker['job_id'] = None
+                worker['busy_since'] = None
+                worker['jobs'] += 1
+                if kind == 'done':
+                    self._finish(job_id, result=payload)
+                else:
+                    worker['errors'] += 1
+                    self._finish(job_id, error=payload)
+
+    def _check_workers(self):
+        """Fail the job of a crashed worker and replace the process"""
+        for worker_id, worker in list(self._workers.items()):
+            if worker['state'] == 'failed' or worker['process'].is_alive():
+                continue
+            if worker['ready_at'] is None:
+                # Died while starting up: a new process would most likely die the same way
+                worker['state'] = 'failed'
+                error = f"worker {worker_id} exited with code {worker['process'].exitcode} before loading the model"
+                self.failures.append(error)
+                print(f"Whisper {error}, not restarting it")
+                if self.failed:
+                    self._ready.set()
+                continue
+            print(f"Whisper worker {worker_id} died (exit code {worker['process'].exitcode}), restarting")
+            if worker['job_id'] is not None:
+                self._finish(worker['job_id'], error='Whisper worker crashed during transcription')
+            self._spawn(worker_id, replacement=True)
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def stats(self):
+        now = time.time()
+        workers = []
+        busy = 0
+        for worker_id, worker in sorted(self._workers.items()):
+            busy_time = worker['busy_time']
+            if worker['busy_since'] is not None:
+                busy_time += now - worker['busy_since']
+                busy += 1
+            uptime = now - worker['ready_at'] if worker['ready_at'] else 0
+            memory = process_memory(worker['process'].pid) if worker['process'].is_alive() else None
+            workers.append({
+                'id': worker_id,
+                'pid': worker['process'].pid,
+                'state': worker['state'],
+                'shared_model': worker['shared_model'],
+                'jobs': worker['jobs'],
+                'errors': worker['errors'],
+                'busy_time': round(busy_time, 2),
+                'utilisation': round(busy_time / uptime, 3) if uptime > 0 else 0.0,
+                'memory_mb': {k: round(v / 2**20, 1) for k, v in memory.items()} if memory else None,
+            })
+        with self._lock:
+            outstanding = len(self._futures)
+        return {
+            'size': self.size,
+            'max_queue': self.max_queue,
+            'preloaded': self.model is not None,
+            'queue_depth': max(outstanding - busy, 0),
+            'in_flight': busy,
+            'workers': workers,
+        }
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Background jobs for work the student does not have to wait for.
+
+During a complete test, a finished recording is handed over as a job and the
+next task starts right away: submit() returns the job at once, a small pool of
+worker threads runs it (transcription, then optionally the evaluation), and
+the client polls the job or subscribes to its Server-Sent Events to collect
+the result on the final page.
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Finished jobs are kept this long for the client to collect them
+JOB_TTL_SECONDS = 60 * 60
+
+
+class QueueFull(Exception):
+    """Too many jobs are already waiting for a worker"""
+
+
+class Job:
+    """One unit of background work, with its progress as a list of events"""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'      # queued -> running -> done | failed
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._cond = threading.Condition()
+
+    def set_stage(self, stage):
+        """Called by the job function to report progress ('transcribing', ...)"""
+        with self._cond:
+            self.stage = stage
+        self._publish('status', {'status': self.status, 'stage': stage})
+
+    def _publish(self, event, data):
+        with self._cond:
+            self.events.append((event, data))
+            self._cond.notify_all()
+
+    def _run(self, fn, args):
+        with self._cond:
+            self.status = 'running'
+            self.started_at = time.time()
+        self._publish('status', {'status': 'running', 'stage': self.stage})
+        try:
+            result = fn(self, *args)
+        except Exception as e:
+            with self._cond:
+                self.status = 'failed'
+                self.error = str(e)
+                self.finished_at = time.time()
+            self._publish('failed', self.to_dict())
+            return
+        with self._cond:
+            self.status = 'done'
+            self.result = result
+            self.finished_at = time.time()
+        self._publish('done', self.to_dict())
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def wait(self, timeout=None):
+        """Block until the job is finished (or `timeout`); returns whether it is"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.done, timeout)
+            return self.done
+
+    def wait_events(self, index, timeout):
+        """Return the events after `index`, blocking up to `timeout` for new ones"""
+        with self._cond:
+            if len(self.events) <= index and not self.done:
+                self._cond.wait(timeout)
+            return self.events[index:]
+
+    def to_dict(self):
+        with self._cond:
+            data = {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'stage': self.stage,
+                'queued': round((self.started_at or time.time()) - self.created_at, 2),
+            }
+            if self.started_at is not None:
+                data['elapsed'] = round((self.finished_at or time.time()) - self.started_at, 2)
+            if self.status == 'done':
+                data['result'] = self.result
+            elif self.status == 'failed':
+                data['error'] = self.error
+            return data
+
+
+class JobQueue:
+    """Worker pool running jobs, with a registry to look them up by id"""
+
+    def __init__(self, workers=2, max_pending=32, ttl=JOB_TTL_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+
+    def submit(self, kind, fn, *args):
+        """Queue `fn(job, *args)`; its return value becomes the job's result"""
+        self._expire()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.status == 'queued')
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f'{pending} jobs are already waiting, please retry later')
+            job = Job(kind)
+            self._jobs[job.id] = job
+            self.submitted += 1
+        self._executor.submit(job._run, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.done and now - job.finished_at > self.ttl:
+                    del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                **counts,
+            }
+
+
+def sse_events(job, heartbeat=15):
+    """Generator of Server-Sent Events for a job, ending once it is done or failed"""
+    index = 0
+    while True:
+        events = job.wait_events(index, heartbeat)
+        if not events:
+            if job.done:
+                return
+            yield ': keep-alive\n\n'
+            continue
+        for event, data in events:
+            index += 1
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if event in ('done', 'failed'):
+                return
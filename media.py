@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Binary media delivery.
+
+Generated audio (text-to-speech, converted recordings) is kept for a while in
+an ArtifactStore under a random ID and downloaded from a dedicated route
+instead of being base64-encoded into JSON. Both artifacts and the per-task
+audio files are served with Content-Length, HTTP Range support, strong ETags
+and Cache-Control, so browsers can start playback before the whole file has
+arrived and revalidate with a 304.
+"""
+
+import hashlib
+import threading
+import uuid
+
+from flask import Response, request, send_file
+
+from cache import MemoryCache
+
+
+class ArtifactStore:
+    """Short-lived generated media addressed by random IDs"""
+
+    def __init__(self, max_bytes, ttl):
+        self.ttl = ttl
+        self._cache = MemoryCache(max_bytes, ttl=ttl)
+
+    def put(self, data, mimetype='audio/mpeg', filename=None):
+        artifact_id = uuid.uuid4().hex
+        artifact = {
+            'data': data,
+            'mimetype': mimetype,
+            'filename': filename,
+            'etag': hashlib.sha256(data).hexdigest(),
+        }
+        self._cache.set(artifact_id, artifact, size=len(data))
+        return artifact_id
+
+    def get(self, artifact_id):
+        return self._cache.get(artifact_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def send_bytes(data, mimetype, etag, max_age=3600, immutable=False, download_name=None):
+    """Response for in-memory bytes honouring Range and If-None-Match"""
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    if download_name:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+
+
+_file_etags = {}
+_file_etags_lock = threading.Lock()
+
+
+def file_etag(path):
+    """Strong ETag from the file content, recomputed only when mtime/size change"""
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _file_etags_lock:
+        cached = _file_etags.get(str(path))
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    etag = digest.hexdigest()
+    with _file_etags_lock:
+        _file_etags[str(path)] = (signature, etag)
+    return etag
+
+
+def send_media_file(path, max_age=86400):
+    """Serve a file from disk with Range, a strong ETag and Cache-Control"""
+    response = send_file(path, conditional=True, etag=file_etag(path), max_age=max_age)
+    response.cache_control.public = True
+    return response
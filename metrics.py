@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Request and stage timings, exported in the Prometheus text format.
+
+Every request is timed per route (the URL rule, e.g. /api/task/<int:task_num>/
+evaluate, so the number of series stays small) and counted by status. Inside
+the slow routes, the steps a student waits for are wrapped in stage() blocks:
+
+    with metrics.stage('whisper'):
+        result = whisper_service.transcribe(...)
+
+Each stage goes to a histogram labelled with the route and stage name, and to
+the request's Server-Timing header, so the browser devtools show where the
+time went (upload, decode, whisper, prompt, openai...). Work done outside a
+request (background jobs) is recorded under the route 'background'.
+
+Cache lookups are counted with cache_result(). /metrics serves render().
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# Upper bounds (seconds) of the histogram buckets, from a cache hit to a long Whisper run
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}      # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    samples.append((f'{self.name}_bucket', _labels(self.labels + ('le',), key + (bound,)), count))
+                samples.append((f'{self.name}_bucket', _labels(self.labels + ('le',), key + ('+Inf',)), series[-1]))
+                samples.append((f'{self.name}_sum', _labels(self.labels, key), round(series[-2], 6)))
+                samples.append((f'{self.name}_count', _labels(self.labels, key), series[-1]))
+        return samples
+
+
+REQUEST_SECONDS = Histogram('toefl_request_duration_seconds', 'Time spent handling a request',
+                            ['route', 'method'])
+REQUESTS = Counter('toefl_requests_total', 'Requests handled, by status code', ['route', 'method', 'status'])
+ERRORS = Counter('toefl_request_errors_total', 'Requests answered with a 5xx status', ['route', 'status'])
+STAGE_SECONDS = Histogram('toefl_stage_duration_seconds', 'Time spent in one step of a request',
+                          ['route', 'stage'])
+CACHE_LOOKUPS = Counter('toefl_cache_lookups_total', 'Cache lookups, by outcome', ['cache', 'result'])
+METRICS = [REQUEST_SECONDS, REQUESTS, ERRORS, STAGE_SECONDS, CACHE_LOOKUPS]
+
+
+def current_route():
+    """Label of the route being served ('background' outside a request)"""
+    if not has_request_context():
+        return 'background'
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@contextmanager
+def stage(name):
+    """Time a step of the current request (or background job)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, route=current_route(), stage=name)
+        if has_request_context() and 'stage_timings' in g:
+            g.stage_timings.append((name, elapsed))
+
+
+def cache_result(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def server_timing(timings, total):
+    """Server-Timing header value: one entry per stage (repeated stages summed), then the total"""
+    durations = {}
+    for name, elapsed in timings:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    entries = [f'{name};dur={elapsed * 1000:.1f}' for name, elapsed in durations.items()]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def init_app(app):
+    """Time and count every request of `app`, and add the Server-Timing header"""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.stage_timings = []
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        route = current_route()
+        REQUEST_SECONDS.observe(elapsed, route=route, method=request.method)
+        REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        if response.status_code >= 500:
+            ERRORS.inc(route=route, status=response.status_code)
+        # Streamed responses (SSE) only show the time to the first byte
+        response.headers['Server-Timing'] = server_timing(g.stage_timings, elapsed)
+        return response
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(f'{name}{labels} {value}' for name, labels, value in metric.samples())
+    return '\n'.join(lines) + '\n'
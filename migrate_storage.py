@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Move the user data between the JSON files and the SQLite database.
+
+Usage:
+    python migrate_storage.py to-sqlite    # JSON files -> data/app.db
+    python migrate_storage.py to-json      # data/app.db -> JSON files (export)
+
+Then start the app with STORAGE_BACKEND=sqlite (or json) accordingly.
+Migrating replaces the content of the target.
+"""
+
+import argparse
+import os
+
+# Moving data does not need Whisper
+os.environ.setdefault('WHISPER_STARTUP', 'lazy')
+
+import app
+from storage import JSONStorage, SQLiteStorage, copy_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('direction', choices=['to-sqlite', 'to-json'])
+    parser.add_argument('--db', default=str(app.SQLITE_DB), help='SQLite database path')
+    args = parser.parse_args()
+
+    json_storage = JSONStorage(
+        {2: app.TASK2_PROMPTS, 3: app.TASK3_PROMPTS, 4: app.TASK4_PROMPTS, 5: app.TASK5_PROMPTS, 6: app.TASK6_PROMPTS},
+        app.PROMPTS_FILE, app.VOCABULARY_FILE, app.CONFIG_FILE
+    )
+    sqlite_storage = SQLiteStorage(args.db)
+
+    if args.direction == 'to-sqlite':
+        counts = copy_all(json_storage, sqlite_storage)
+        print(f"Imported into {args.db}:")
+    else:
+        counts = copy_all(sqlite_storage, json_storage)
+        print(f"Exported from {args.db} to {app.DATA_DIR}:")
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pre-render text-to-speech audio for every prompt (prompts.txt and the task
+JSON files) so that question playback is a local file read.
+
+Usage:
+    python prerender_tts.py            # render what is not cached yet
+    python prerender_tts.py --force    # re-render everything
+    python prerender_tts.py --clear    # empty the TTS cache first
+"""
+
+import argparse
+import os
+import time
+
+# Rendering audio does not need Whisper
+os.environ.setdefault('WHISPER_STARTUP', 'lazy')
+
+import app
+import tts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--force', action='store_true', help='re-render prompts that are already cached')
+    parser.add_argument('--clear', action='store_true', help='drop the whole TTS cache before rendering')
+    args = parser.parse_args()
+
+    if args.clear:
+        print(f"Dropped {tts.clear()} cached renderings")
+
+    texts = app.tts_prompt_texts()
+    print(f"Pre-rendering {len(texts)} prompts into {app.TTS_CACHE_DIR}")
+    start = time.perf_counter()
+    counts = tts.prerender(texts, settings=app.tts_settings(), force=args.force)
+    print(f"Done in {time.perf_counter() - start:.1f}s: "
+          f"{counts['rendered']} rendered, {counts['cached']} already cached, {counts['failed']} failed")
+    print(f"Cache: {tts.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand profiling of single requests.
+
+When one prompt bank or one recording makes a route slow, aggregate metrics
+do not say why. RequestProfiler runs the request under cProfile and keeps the
+result in data/profiles/ as <timestamp>-<method>-<route>.prof, to be opened
+with pstats or snakeviz, or listed and downloaded through /api/profiles.
+
+Two opt-in switches, both read at startup:
+  PROFILE_REQUESTS=1      profile every request (local debugging)
+  PROFILE_TOKEN=<secret>  profile only the requests sent with "X-Profile: <secret>"
+
+With neither set, no hook is installed, so requests pay nothing. cProfile can
+only follow one request at a time; concurrent requests are served unprofiled.
+/api/profiles needs PROFILE_TOKEN even when every request is profiled.
+"""
+
+import cProfile
+import hmac
+import io
+import pstats
+import re
+import threading
+import time
+from pathlib import Path
+
+from flask import g, request
+
+# Only the most recent profiles are kept
+MAX_PROFILES = 50
+PROFILE_ID = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{3}-[A-Z]+-[A-Za-z0-9_.-]+$')
+
+
+def route_slug(rule):
+    """'/api/task/<int:task_num>/evaluate' -> 'api_task_task_num_evaluate'"""
+    slug = re.sub(r'<(?:[^:>]+:)?([^>]+)>', r'\1', rule or 'unmatched')
+    return re.sub(r'[^A-Za-z0-9]+', '_', slug).strip('_') or 'index'
+
+
+class RequestProfiler:
+    """Profiles the requests selected by the switches and manages the saved profiles"""
+
+    def __init__(self, directory, every_request=False, token=None, keep=MAX_PROFILES):
+        self.directory = Path(directory)
+        self.every_request = every_request
+        self.token = token or None
+        self.keep = keep
+        self._busy = threading.Lock()
+        self.profiled = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self):
+        return self.every_request or self.token is not None
+
+    def authorized(self, value):
+        """Whether `value` (header or query parameter) is the token (never true without one)"""
+        return self.token is not None and value is not None and hmac.compare_digest(value, self.token)
+
+    def wanted(self):
+        if request.path.startswith('/api/profiles'):
+            return False
+        if self.every_request:
+            return True
+        return self.authorized(request.headers.get('X-Profile'))
+
+    def init_app(self, app):
+        """Install the profiling hooks on `app`, only if a switch is on"""
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        @app.before_request
+        def start_profile():
+            if not self.wanted():
+                return
+            # One cProfile at a time; the other requests are served normally
+            if not self._busy.acquire(blocking=False):
+                self.skipped += 1
+                return
+            g.profile_started = time.perf_counter()
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+        @app.after_request
+        def save_profile(response):
+            if 'profiler' in g:
+                response.headers['X-Profile-Id'] = self._finish()
+            return response
+
+        @app.teardown_request
+        def release_profiler(error=None):
+            # Also runs when the request raised and after_request was skipped
+            if 'profiler' not in g:
+                return
+            try:
+                self._finish()
+            except Exception as e:
+                print(f"Could not save the request profile: {e}")
+            finally:
+                self._busy.release()
+
+    def _finish(self):
+        """Stop the request's profiler and save it once; returns the profile id"""
+        if 'profile_id' not in g:
+            g.profiler.disable()
+            elapsed = time.perf_counter() - g.profile_started
+            rule = request.url_rule.rule if request.url_rule is not None else None
+            g.profile_id = self.save(g.profiler, request.method, rule, elapsed)
+        return g.profile_id
+
+    def save(self, profiler, method, rule, elapsed):
+        now = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f'-{int(now * 1000) % 1000:03d}'
+        profile_id = f'{stamp}-{method}-{route_slug(rule)}'
+        profiler.dump_stats(self.directory / f'{profile_id}.prof')
+        (self.directory / f'{profile_id}.txt').write_text(f'{rule}\n{elapsed:.6f}\n', encoding='utf-8')
+        self.profiled += 1
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        for path in sorted(self.directory.glob('*.prof'))[:-self.keep]:
+            path.unlink(missing_ok=True)
+            path.with_suffix('.txt').unlink(missing_ok=True)
+
+    def path(self, profile_id):
+        """File of a saved profile, or None (ids are validated, never joined as given)"""
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f'{profile_id}.prof'
+        return path if path.exists() else None
+
+    def list(self):
+        """Saved profiles, most recent first"""
+        profiles = []
+        for path in sorted(self.directory.glob('*.prof'), reverse=True):
+            rule, elapsed = None, None
+            info = path.with_suffix('.txt')
+            if info.exists():
+                rule, elapsed = (info.read_text(encoding='utf-8').splitlines() + [None, None])[:2]
+            profiles.append({
+                'id': path.stem,
+                'method': path.stem.split('-')[3],
+                'route': rule,
+                'elapsed': round(float(elapsed), 4) if elapsed else None,
+                'size': path.stat().st_size,
+                'url': f'/api/profiles/{path.stem}',
+            })
+        return profiles
+
+    def summary(self, profile_id, sort='cumulative', limit=40):
+        """pstats text report of a saved profile"""
+        out = io.StringIO()
+        stats = pstats.Stats(str(self.path(profile_id)), stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'mode': 'every_request' if self.every_request else ('header' if self.token else 'off'),
+            'profiled': self.profiled,
+            'skipped': self.skipped,
+        }
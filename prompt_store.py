@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide store for the task prompt banks (data/task*/prompts.json).
+
+Each file is parsed once and kept in memory together with an index by prompt
+id. Before serving, the store compares the file's mtime and size with the
+ones it loaded, so edits made by hand (or by another process) are picked up;
+writes made through the store update the cache directly.
+
+The structures returned by the store are shared: callers that modify them
+must persist the change with save(), add() or delete().
+"""
+
+import json
+import os
+import shutil
+import threading
+
+
+def write_atomic(path, text):
+    """Replace `path` with `text` without leaving a half-written file behind"""
+    tmp_path = path.with_name(f'{path.name}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    if path.exists():
+        shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class PromptStore:
+    """In-memory, id-indexed view of the prompt files, keyed by task number"""
+
+    def __init__(self, files):
+        self.files = dict(files)    # task_num -> Path
+        self._entries = {}          # task_num -> {'stamp', 'data', 'index', 'next_id'}
+        self._lock = threading.RLock()
+        self.loads = 0
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _entry(self, task_num):
+        """Cached entry for a task, reloaded if the file changed on disk"""
+        path = self.files.get(task_num)
+        if path is None:
+            return None
+        stamp = self._stamp(path)
+        entry = self._entries.get(task_num)
+        if entry is not None and entry['stamp'] == stamp:
+            return entry
+
+        data = {"prompts": []}
+        if stamp is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"Error loading Task {task_num} prompts: {e}")
+                data = {"prompts": []}
+        data.setdefault('prompts', [])
+        entry = {'stamp': stamp, 'data': data}
+        self._reindex(entry)
+        self._entries[task_num] = entry
+        self.loads += 1
+        return entry
+
+    @staticmethod
+    def _reindex(entry):
+        prompts = entry['data']['prompts']
+        entry['index'] = {prompt['id']: prompt for prompt in prompts if 'id' in prompt}
+        entry['next_id'] = max(entry['index'], default=0) + 1
+
+    def load(self, task_num):
+        """The task's {"prompts": [...]} structure ({"prompts": []} if unknown)"""
+        with self._lock:
+            entry = self._entry(task_num)
+            return entry['data'] if entry is not None else {"prompts": []}
+
+    def get(self, task_num, prompt_id):
+        with self._lock:
+            entry = self._entry(task_num)
+            return entry['index'].get(prompt_id) if entry is not None else None
+
+    def first(self, task_num):
+        """First prompt of the bank (what the practice pages show), or None"""
+        prompts = self.load(task_num)['prompts']
+        return prompts[0] if prompts else None
+
+    def next_id(self, task_num):
+        with self._lock:
+            entry = self._entry(task_num)
+            return entry['next_id'] if entry is not None else 1
+
+    def save(self, task_num, data=None):
+        """Write the task's prompts (the cached structure, or `data`) to disk"""
+        with self._lock:
+            path = self.files.get(task_num)
+            if path is None:
+                return False
+            if data is None:
+                data = self._entry(task_num)['data']
+            try:
+                write_atomic(path, json.dumps(data, indent=2, ensure_ascii=False))
+            except Exception as e:
+                print(f"Error saving Task {task_num} prompts: {e}")
+                # The cached copy may have been modified: reload it from disk next time
+                self._entries.pop(task_num, None)
+                return False
+            data.setdefault('prompts', [])
+            entry = {'stamp': self._stamp(path), 'data': data}
+            self._reindex(entry)
+            self._entries[task_num] = entry
+            return True
+
+    def add(self, task_num, fields):
+        """Append a prompt with the next free id and persist; returns it, or None if the write failed"""
+        with self._lock:
+            entry = self._entry(task_num)
+            if entry is None:
+                return None
+            prompt = {'id': entry['next_id'], **fields}
+            entry['data']['prompts'].append(prompt)
+            return prompt if self.save(task_num) else None
+
+    def delete(self, task_num, prompt_id):
+        """Remove a prompt and persist; returns False if the write failed"""
+        with self._lock:
+            entry = self._entry(task_num)
+            if entry is None:
+                return False
+            prompts = entry['data']['prompts']
+            prompts[:] = [p for p in prompts if p.get('id') != prompt_id]
+            return self.save(task_num)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loads': self.loads,
+                'tasks': {task_num: len(entry['index']) for task_num, entry in self._entries.items()},
+            }
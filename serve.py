@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Production launcher: no debug reloader, the Whisper model loaded once, and
+several transcription workers sharing it.
+
+`python app.py` runs Flask's debug server, whose reloader imports the app
+twice, and every WHISPER_WORKERS process loads its own copy of the model
+(~1 GB each for "base"). Here the model is loaded once in this process before
+it starts serving; the Whisper workers are forked from it and share the
+weights copy-on-write, so N workers cost about one model plus what each
+transcription needs.
+
+Requests are served by one web process with a pool of threads (waitress when
+it is installed, otherwise Werkzeug's threaded server): streaming sessions,
+background jobs and caches live in its memory, so they must not be split
+across several web processes.
+
+Usage:
+    python serve.py [--workers 2] [--threads 8] [--torch-threads N] [--host 0.0.0.0] [--port 5001]
+"""
+
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '5001')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WHISPER_WORKERS', '2')),
+                        help='Whisper worker processes (0: transcribe in the web process)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', '8')),
+                        help='request threads (waitress only; Werkzeug starts one per request)')
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help="torch threads per worker (default: the cores divided among the workers)")
+    args = parser.parse_args()
+
+    torch_threads = args.torch_threads
+    if torch_threads is None:
+        torch_threads = max((os.cpu_count() or 1) // max(args.workers, 1), 1)
+
+    # app.py reads its settings at import time
+    os.environ['WHISPER_WORKERS'] = str(args.workers)
+    os.environ['WHISPER_THREADS'] = str(torch_threads)
+    os.environ['WHISPER_PRELOAD'] = '1'
+    os.environ.setdefault('WHISPER_STARTUP', 'eager')
+
+    import app
+    import whisper_service
+    from inference_pool import process_memory
+
+    application = app.create_app()
+
+    status = whisper_service.status()
+    if status['pool'] is not None and status['status'] == 'ready':
+        master = process_memory(os.getpid())
+        print(f"Web process (model owner) {os.getpid()}: "
+              + (f"RSS {master['rss'] / 2**20:.0f} MB" if master else "memory not available"))
+        total = master['pss'] if master else 0
+        for worker in status['pool']['workers']:
+            memory = worker['memory_mb']
+            if memory:
+                total += memory['pss'] * 2**20
+                print(f"  worker {worker['id']} ({worker['pid']}): RSS {memory['rss']:.0f} MB, "
+                      f"private {memory['uss']:.0f} MB")
+        if master:
+            print(f"Total (PSS) for {len(status['pool']['workers'])} worker(s): {total / 2**20:.0f} MB")
+
+    try:
+        import waitress
+    except ImportError:
+        from werkzeug.serving import run_simple
+        print(f"Serving on http://{args.host}:{args.port} (Werkzeug; `pip install waitress` to cap the threads)")
+        run_simple(args.host, args.port, application, threaded=True, use_reloader=False, use_debugger=False)
+    else:
+        print(f"Serving on http://{args.host}:{args.port} with {args.threads} threads")
+        waitress.serve(application, host=args.host, port=args.port, threads=args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -529,8 +529,7 @@ class CompleteTestManager {
 
             const data = await response.json();
 
-            const audioData = data.audio;
-            const audio = new Audio('data:audio/mp3;base64,' + audioData);
+            const audio = new Audio(data.audio_url);
 
             document.getElementById('task1Status').textContent = 'Listen to the question...';
 
@@ -581,17 +580,19 @@ class CompleteTestManager {
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
             const mediaRecorder = new MediaRecorder(stream);
             const audioChunks = [];
+            const streamTranscriber = new StreamingTranscriber();
 
             mediaRecorder.ondataavailable = (event) => {
                 audioChunks.push(event.data);
+                streamTranscriber.push(event.data);
             };
 
             mediaRecorder.onstop = async () => {
                 const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
-                await this.processTaskRecording(audioBlob, questionText, taskNum, speakTime);
+                await this.processTaskRecording(audioBlob, questionText, taskNum, speakTime, streamTranscriber);
             };
 
-            mediaRecorder.start();
+            mediaRecorder.start(StreamingTranscriber.TIMESLICE_MS);
 
             let timeLeft = speakTime;
             const recordInterval = setInterval(() => {
@@ -612,56 +613,91 @@ class CompleteTestManager {
         }
     }
 
-    async processTaskRecording(audioBlob, questionText, taskNum, totalTime) {
+    processTaskRecording(audioBlob, questionText, taskNum, totalTime, streamTranscriber = null) {
         const container = document.getElementById('taskContainer');
-        container.innerHTML = `
-            <h3>Task ${taskNum} - Processing...</h3>
-            <div class="ai-loading">
-                <div class="ai-loading-content">
-                    <div class="ai-loading-text">Transcribing and evaluating...</div>
-                    <div class="loading-dots">
-                        <div class="loading-dot"></div>
-                        <div class="loading-dot"></div>
-                        <div class="loading-dot"></div>
-                    </div>
-                </div>
-            </div>
-        `;
 
-        try {
-            // Transcribe
-            const formData = new FormData();
-            formData.append('audio', audioBlob);
+        // Transcription (and evaluation) go on in the background while the next task runs
+        const result = {
+            taskNum: taskNum,
+            question: questionText,
+            transcript: '',
+            wordCount: 0,
+            speakingTime: totalTime,
+            speechDuration: null,
+            fluency: null,
+            error: null
+        };
+        result.job = this.submitRecordingJob(result, audioBlob, streamTranscriber);
+        this.results.push(result);
 
-            const transcribeResponse = await fetch('/transcribe', {
-                method: 'POST',
-                body: formData
-            });
+        // Move to next task
+        this.currentTaskIndex++;
 
-            const transcribeData = await transcribeResponse.json();
-            const transcript = transcribeData.text;
-            const wordCount = transcript.split(/\s+/).filter(w => w.length > 0).length;
-
-            // Store result
-            this.results.push({
-                taskNum: taskNum,
-                question: questionText,
-                transcript: transcript,
-                wordCount: wordCount,
-                speakingTime: totalTime
-            });
+        container.innerHTML = `<h3>Task ${taskNum} completed! Moving to next task...</h3>`;
 
-            // Move to next task
-            this.currentTaskIndex++;
+        setTimeout(() => {
+            this.runNextTask();
+        }, 2000);
+    }
 
-            container.innerHTML = `<h3>Task ${taskNum} completed! Moving to next task...</h3>`;
+    async submitRecordingJob(result, audioBlob, streamTranscriber) {
+        // Most of the recording was already uploaded while speaking
+        const sessionId = streamTranscriber ? await streamTranscriber.handOff() : null;
 
-            setTimeout(() => {
-                this.runNextTask();
-            }, 2000);
+        const formData = new FormData();
+        if (sessionId) {
+            formData.append('session_id', sessionId);
+        } else {
+            formData.append('audio', audioBlob);
+        }
+        if (this.apiKey) {
+            formData.append('evaluate', JSON.stringify({ api_key: this.apiKey, ...this.evaluationFields(result) }));
+        }
 
-        } catch (error) {
-            container.innerHTML = `<div class="alert alert-error">Error processing Task ${taskNum}: ${error.message}</div>`;
+        const response = await fetch('/api/jobs/transcribe', {
+            method: 'POST',
+            body: formData
+        });
+        const data = await response.json();
+        if (data.error) {
+            throw new Error(data.error);
+        }
+
+        const job = await this.waitForJob(data.job_id);
+        if (job.status === 'failed') {
+            throw new Error(job.error);
+        }
+        result.transcript = job.result.transcription.transcript;
+        result.wordCount = job.result.transcription.word_count;
+        result.speechDuration = job.result.transcription.speech_duration || null;
+        result.fluency = job.result.transcription.fluency || null;
+        return job.result;
+    }
+
+    // Resolves with the finished job; follows its events, or polls if they are unavailable
+    waitForJob(jobId) {
+        return new Promise((resolve, reject) => {
+            const events = new EventSource(`/api/jobs/${jobId}/events`);
+            const finish = (event) => {
+                events.close();
+                resolve(JSON.parse(event.data));
+            };
+            events.addEventListener('done', finish);
+            events.addEventListener('failed', finish);
+            events.addEventListener('error', () => {
+                events.close();
+                this.pollJob(jobId).then(resolve, reject);
+            });
+        });
+    }
+
+    async pollJob(jobId) {
+        while (true) {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            const job = await response.json();
+            if (job.error && !job.status) throw new Error(job.error);
+            if (job.status === 'done' || job.status === 'failed') return job;
+            await new Promise(resolve => setTimeout(resolve, 2000));
         }
     }
 
@@ -773,6 +809,25 @@ class CompleteTestManager {
 
         const resultsDiv = document.getElementById('allResults');
 
+        // Collect the recordings still being processed in the background
+        resultsDiv.innerHTML = `
+            <div class="ai-loading">
+                <div class="ai-loading-content">
+                    <div class="ai-loading-text">Finishing transcriptions...</div>
+                    <div class="loading-dots">
+                        <div class="loading-dot"></div>
+                        <div class="loading-dot"></div>
+                        <div class="loading-dot"></div>
+                    </div>
+                </div>
+            </div>
+        `;
+        const outcomes = await Promise.allSettled(this.results.map(result => result.job));
+        outcomes.forEach((outcome, index) => {
+            if (outcome.status === 'rejected') this.results[index].error = outcome.reason.message;
+        });
+        resultsDiv.innerHTML = '';
+
         if (!this.apiKey) {
             resultsDiv.innerHTML = `
                 <div class="alert alert-error">
@@ -790,18 +845,20 @@ class CompleteTestManager {
                     <h3>Task ${result.taskNum}</h3>
                     <p><strong>Question:</strong> ${result.question.substring(0, 100)}...</p>
                     <p><strong>Word count:</strong> ${result.wordCount} words</p>
+                    ${FluencyStats.html(result.fluency)}
                     <div style="background: white; padding: 15px; border: 1px solid #ddd; margin-top: 10px;">
-                        ${result.transcript}
+                        ${result.error ? `<span style="color: red;">Error processing Task ${result.taskNum}: ${result.error}</span>` : result.transcript}
                     </div>
+                    <div class="ai-feedback" id="taskEvaluation${index}" style="display: none;"></div>
                 </div>
             `;
         });
 
         resultsDiv.innerHTML = resultsHtml;
 
-        // If API key is available, get combined evaluation
-        if (this.apiKey) {
-            resultsDiv.innerHTML += `
+        // If API key is available, evaluate all the tasks at once
+        if (this.apiKey && this.results.some(result => !result.error)) {
+            resultsDiv.insertAdjacentHTML('afterbegin', `
                 <div class="ai-loading">
                     <div class="ai-loading-content">
                         <div class="ai-loading-text">Getting comprehensive evaluation...</div>
@@ -812,21 +869,86 @@ class CompleteTestManager {
                         </div>
                     </div>
                 </div>
-            `;
-
-            // Here you could implement a combined evaluation call
-            // For now, we'll just remove the loading indicator
-            setTimeout(() => {
+            `);
+
+            try {
+                await this.evaluateAllTasks(resultsDiv);
+            } catch (error) {
+                resultsDiv.insertAdjacentHTML('afterbegin', `
+                    <div class="alert alert-error">Error getting AI evaluation: ${error.message}</div>
+                `);
+            } finally {
                 const loadingIndicator = resultsDiv.querySelector('.ai-loading');
                 if (loadingIndicator) loadingIndicator.remove();
+            }
+        }
+    }
 
-                resultsDiv.innerHTML += `
-                    <div class="alert alert-error">
-                        Combined AI evaluation is coming soon. Individual task evaluations are available in the single task mode.
-                    </div>
-                `;
-            }, 1000);
+    // Fields the evaluation endpoints expect besides the transcript
+    evaluationFields(result) {
+        const hasAudio = { 2: this.task2HasAudio, 3: this.task3HasAudio, 4: this.task4HasAudio };
+        const fields = {
+            task_num: result.taskNum,
+            speaking_time: result.speakingTime,
+            speech_duration: result.speechDuration,
+            fluency: result.fluency
+        };
+        if (result.taskNum === 1) {
+            fields.question = result.question;
+        } else {
+            fields.has_audio = hasAudio[result.taskNum] || false;
+            if (result.taskNum === 2 || result.taskNum === 3) fields.reading_text = result.question;
         }
+        return fields;
+    }
+
+    // Tasks are evaluated concurrently on the server; each one is shown as soon as it is ready
+    // (the background jobs usually evaluated them already, so these are cache hits)
+    async evaluateAllTasks(resultsDiv) {
+        const indices = [];
+        const responses = [];
+        this.results.forEach((result, index) => {
+            if (result.error) return;
+            indices.push(index);
+            responses.push({
+                ...this.evaluationFields(result),
+                transcript: result.transcript,
+                word_count: result.wordCount
+            });
+        });
+
+        const response = await fetch('/api/evaluate/batch/stream', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ api_key: this.apiKey, responses: responses })
+        });
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.startsWith('text/event-stream')) {
+            const data = await response.json();
+            throw new Error(data.error);
+        }
+
+        await FeedbackStream.forEachEvent(response, (event, payload) => {
+            if (event === 'result') {
+                const container = document.getElementById(`taskEvaluation${indices[payload.index]}`);
+                if (!container) return;
+                container.style.display = 'block';
+                container.innerHTML = payload.error
+                    ? `<div class="alert alert-error">Evaluation failed: ${payload.error}</div>`
+                    : `<h3>AI Evaluation</h3><div class="feedback-card">${payload.feedback}</div>`;
+            } else if (event === 'summary') {
+                const summary = payload.scored_tasks > 0
+                    ? `Total: ${payload.total}/${payload.max_total} (average ${payload.average}/5, ${payload.percentage}/100)`
+                    : 'No score could be read from the evaluations.';
+                resultsDiv.insertAdjacentHTML('afterbegin', `
+                    <div class="transcription-container" style="margin-bottom: 30px;">
+                        <h2>Overall Result</h2>
+                        <p><strong>${summary}</strong></p>
+                        ${payload.failed > 0 ? `<p>${payload.failed} task(s) could not be evaluated.</p>` : ''}
+                    </div>
+                `);
+            }
+        });
     }
 
     restart() {
@@ -0,0 +1,109 @@
+// Streams AI feedback from the .../evaluate/stream endpoints (Server-Sent
+// Events over a POST request) so that feedback sections appear while the
+// evaluator is still writing. Falls back to the one-shot endpoint.
+class FeedbackStream {
+    // POST `body` to `${url}/stream`; `onUpdate(feedbackSoFar)` is called at
+    // most once per animation frame. Resolves with the complete feedback.
+    static async evaluate(url, body, onUpdate = null) {
+        let response;
+        try {
+            response = await fetch(`${url}/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+        } catch (error) {
+            response = null;
+        }
+        const contentType = response ? response.headers.get('Content-Type') || '' : '';
+        if (!response || !response.body || !contentType.startsWith('text/event-stream')) {
+            if (response && response.status === 400) {
+                const data = await response.json();
+                throw new Error(data.error);
+            }
+            return FeedbackStream.evaluateOnce(url, body);
+        }
+        const update = FeedbackStream.throttle(onUpdate);
+        try {
+            return await FeedbackStream.readEvents(response, update);
+        } finally {
+            // Don't let a pending partial render overwrite the final one
+            if (update) update.cancel();
+        }
+    }
+
+    static async evaluateOnce(url, body) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        const data = await response.json();
+        if (data.error) throw new Error(data.error);
+        return data.feedback;
+    }
+
+    static async readEvents(response, onUpdate) {
+        let feedback = '';
+        let result = null;
+        await FeedbackStream.forEachEvent(response, (event, payload) => {
+            if (event === 'delta') {
+                feedback += payload.text;
+                if (onUpdate) onUpdate(feedback);
+            } else if (event === 'done') {
+                result = payload.feedback;
+            } else if (event === 'error') {
+                throw new Error(payload.error);
+            }
+        });
+        return result !== null ? result : feedback;
+    }
+
+    // Call `onEvent(event, payload)` for each event of a text/event-stream response
+    static async forEachEvent(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of raw.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                if (!data) continue;
+
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
+    static throttle(callback) {
+        if (!callback) return null;
+        let latest = null;
+        let frame = null;
+        const update = (value) => {
+            latest = value;
+            if (frame !== null) return;
+            frame = requestAnimationFrame(() => {
+                frame = null;
+                callback(latest);
+            });
+        };
+        update.cancel = () => {
+            if (frame !== null) cancelAnimationFrame(frame);
+            frame = null;
+        };
+        return update;
+    }
+}
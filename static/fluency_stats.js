@@ -0,0 +1,16 @@
+// Fluency numbers measured by the server from Whisper's word timestamps,
+// shown under the transcript without waiting for the AI evaluation.
+class FluencyStats {
+    static html(fluency) {
+        if (!fluency) return '';
+        const pauses = fluency.pauses;
+        return `
+            <div class="fluency-stats">
+                <p><strong>Articulation rate:</strong> ${fluency.articulation_rate} words/min (${fluency.speech_rate} with pauses)</p>
+                <p><strong>Pauses:</strong> ${pauses.count} (${pauses.long} longer than 1s, longest ${pauses.longest}s)</p>
+                <p><strong>Fillers (um, uh...):</strong> ${fluency.fillers.count} (some may not be transcribed)</p>
+                <p><strong>Longest fluent run:</strong> ${fluency.runs.longest_words} words (${fluency.runs.longest_seconds}s)</p>
+            </div>
+        `;
+    }
+}
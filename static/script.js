@@ -12,6 +12,7 @@ class TOEFLPracticeTool {
         this.apiKey = '';
         this.currentTranscript = '';
         this.currentPromptText = '';
+        this.streamTranscriber = null;
 
         // Beep sound (base64 encoded WAV)
         this.beepSound = 'UklGRnoGAABXQVZFZm10IBAAAAABAAEAQB8AAEAfAAABAAgAZGF0YWoGAACBhYqFho2RkYiJio2Qj4WIjY+UkYqJi4yNlJKQkZKYl5KQj4yLjIqKiouKiYyNjZKVlZmYl46KiYiFhYSGjIyRlpiZk5CNioiFg4GDgoGHjI+WmpyalI+Ih4GAfXt9goaLlJyjopuWhYF9eXVzcXR3foaRm6GknpKGfHNtaGVrbXJ5gIeOlJqem4+DdmxkYmBnanF6go2WnJ+bl4p7b2NYVVVZYmt2gI+Zn6CblId5aWBWTk5QV2JveIaRm6ChnJeNfnBdT0dDRk1WZnWDkJqioZ+YjX1sV0c8ODxBSVlqfYuXn6KinpOCcl1IOS8uMztIWnB/j5mhpKKckH5rUj8vKCgvPU9hc4STnKWmo5mMdmFKNyssLzU8SmN2iJWepqajl4lyWkEvLzI2PEJTaXqMmqSnpZ+ThHFaQzQ0NztCSlxxgpGdpaiin5GBakU5Njg9Q0lcb4CQm6SlpaCTg2tOPDk5PUVNYnSCkZulpaWdkH9oTjs4OT5GTmV3hJObpaWkmY58ZUs5Njk/R1BneYaUnaWmo5eMeGJJOjY4P0hTan2Kl5+mpqGViXReTz04O0FKWGyAjpiipaSdkYBsVEQ8PD5GUmF0hJOdpaWimI56Z1BBOzxBSlVsfo2Zn6WkoZaJeGROQTs8QktYboGQmqKlpJ2RgW5XRz89P0dRYXKCkpuipKGYjnxrUkQ+PUBIVGl8i5iepKSgl4t6aVJCPT5CSFZrfY6YoKWkoJWIeGZPQT0/Q0tZboCPmqKkpJ6SgW1WRT4+QEhTZXWFk56kpKGZjnxoUkI+PkFKV2x+jJigpKSglol4Z1FCPj9CS1htgI+aoqSknpKBbVZFPj5ASFNldoWTnqSkoZmNfGhRQj4+QUpXbH6MmKCkpKCWiXhmUEI+P0JLWGyAj5qipKSekoBtVkU+PkBIU2V2hZOepKShmY18aFFCPj5BSldsfoyYoKSkoJaJeGZQQj4/QktYbICPmqKkpJ6SgG1WRT4+QEhTZXaFk56kpKGZjXxoUUI+PkFKV2x+jJigpKSglol4ZlBCPj9CS1hsgI+aoqSknpKAbVZFPj5ASFNldoWTnqSkoZmNfGhRQj4+QUpXbH6MmKCkpKCWiXhmUEI+P0JLWGyAj5qipKSekoBtVkU+PkBIU2V2hZOepKShmY18aFFCPj5BSldsfoyYoKSkoJaJeGZQQj4/QktYbICPmqKkpJ6SgG1WRT4+QEhTZXaFk56kpKGZjXxoUUI+PkFKV2x+jJigpKSglol4ZlBCPj9CS1hsgI+aoqSknpKAbVZFPj5ASFNldoWTnqSkoZmNfGhRQj4+QUpXbH6MmKCkpKCWiXhmUEI+P0JLWGyAj5qipKSekoBtVkU+PkBIU2V2hZOepKShmY18aFFCPj5BSldsfoyYoKSkoJaJeGZQQj4/QktYbICPmqKkpJ6SgG1WRT4+QEhTZXaFk56kpKGZjXxoUUI+PkFKV2x+jJigpKSglol4ZlBCPj9CS1hsgI+aoqSknpKAbVZFPj5ASFNldoWTnqSkoZmNfGhRQj4+QUpXbH6MmKCkpKCWiXhmUEI+P0JLWGyAj5qipKSekoA=';
@@ -159,7 +160,7 @@ class TOEFLPracticeTool {
                 return null;
             }
 
-            return 'data:audio/mp3;base64,' + data.audio;
+            return data.audio_url;
         } catch (error) {
             console.error('Error creating audio:', error);
             return null;
@@ -289,16 +290,19 @@ class TOEFLPracticeTool {
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
             this.mediaRecorder = new MediaRecorder(stream);
             this.audioChunks = [];
+            this.streamTranscriber = new StreamingTranscriber(
+                StreamingTranscriber.liveTranscriptCallback(document.getElementById('timerContainer')));
 
             this.mediaRecorder.ondataavailable = (event) => {
                 this.audioChunks.push(event.data);
+                this.streamTranscriber.push(event.data);
             };
 
             this.mediaRecorder.onstop = () => {
                 this.handleRecordingStopped();
             };
 
-            this.mediaRecorder.start();
+            this.mediaRecorder.start(StreamingTranscriber.TIMESLICE_MS);
             this.recording = true;
             document.getElementById('recordingIndicator').classList.add('active');
 
@@ -352,49 +356,35 @@ class TOEFLPracticeTool {
         transcriptionDiv.className = 'progress-container';
         transcriptionDiv.innerHTML = '<div class="progress-status processing">Preparing audio for transcription...</div>';
 
-        // Convert to MP3 and transcribe
-        await this.convertToMP3(audioBlob);
+        // Transcribe and convert to MP3 from a single upload
         await this.transcribeAudio(audioBlob);
     }
 
-    async convertToMP3(audioBlob) {
-        try {
-            const formData = new FormData();
-            formData.append('audio', audioBlob);
-
-            const response = await fetch('/convert_to_mp3', {
-                method: 'POST',
-                body: formData
-            });
-
-            const data = await response.json();
-            if (data.error) {
-                document.getElementById('downloadSection').innerHTML =
-                    `<div style="color: red;">Error converting audio: ${data.error}</div>`;
-                return;
-            }
-
-            // Create download button
-            const downloadBtn = document.createElement('button');
-            downloadBtn.className = 'download-btn';
-            downloadBtn.textContent = 'Download MP3';
-            downloadBtn.onclick = () => {
-                const link = document.createElement('a');
-                link.href = 'data:audio/mp3;base64,' + data.mp3;
-                link.download = 'recording.mp3';
-                document.body.appendChild(link);
-                link.click();
-                document.body.removeChild(link);
-            };
-
-            document.getElementById('downloadSection').innerHTML = '';
-            document.getElementById('downloadSection').appendChild(downloadBtn);
+    showDownloadButton(data) {
+        const downloadSection = document.getElementById('downloadSection');
+        if (!downloadSection) return;
 
-        } catch (error) {
-            console.error('Error converting to MP3:', error);
-            document.getElementById('downloadSection').innerHTML =
-                `<div style="color: red;">Error converting audio: ${error}</div>`;
+        if (data.error || !data.mp3_url) {
+            downloadSection.innerHTML =
+                `<div style="color: red;">Error converting audio: ${data.error || data.mp3_error || 'MP3 not available'}</div>`;
+            return;
         }
+
+        // Create download button
+        const downloadBtn = document.createElement('button');
+        downloadBtn.className = 'download-btn';
+        downloadBtn.textContent = 'Download MP3';
+        downloadBtn.onclick = () => {
+            const link = document.createElement('a');
+            link.href = data.mp3_url;
+            link.download = 'recording.mp3';
+            document.body.appendChild(link);
+            link.click();
+            document.body.removeChild(link);
+        };
+
+        downloadSection.innerHTML = '';
+        downloadSection.appendChild(downloadBtn);
     }
 
     async transcribeAudio(audioBlob) {
@@ -402,22 +392,32 @@ class TOEFLPracticeTool {
             const transcriptionDiv = document.getElementById('transcriptionResults');
             transcriptionDiv.innerHTML = '<div class="progress-status processing">Performing transcription in English...</div>';
 
-            const formData = new FormData();
-            formData.append('audio', audioBlob);
+            // Most of the recording was already transcribed while speaking, and the
+            // server already holds it, so the MP3 comes from the same final decode
+            let data = this.streamTranscriber ? await this.streamTranscriber.finish({ mp3: true }) : null;
+            this.streamTranscriber = null;
 
-            const response = await fetch('/transcribe', {
-                method: 'POST',
-                body: formData
-            });
+            if (!data) {
+                const formData = new FormData();
+                formData.append('audio', audioBlob);
+
+                const response = await fetch('/transcribe_with_mp3', {
+                    method: 'POST',
+                    body: formData
+                });
+
+                data = await response.json();
+            }
+            this.showDownloadButton(data);
 
-            const data = await response.json();
             if (data.error) {
                 transcriptionDiv.innerHTML =
                     `<div class="transcription-container"><p style="color: red;">Error during transcription: ${data.error}</p></div>`;
                 return;
             }
 
-            const wpm = (data.word_count / this.speakingTime * 60).toFixed(1);
+            // Measured speech time (silence excluded) when the server reports it
+            const wpm = (data.word_count / (data.speech_duration || this.speakingTime) * 60).toFixed(1);
 
             // Store transcript for LLM evaluation
             this.currentTranscript = data.transcript;
@@ -431,12 +431,13 @@ class TOEFLPracticeTool {
                         Total words: ${data.word_count}<br>
                         Average words per minute: ${wpm}
                     </div>
+                    ${FluencyStats.html(data.fluency)}
                 </div>
             `;
 
             // If API key is provided, request AI feedback
             if (this.apiKey) {
-                await this.getAIFeedback(this.currentPromptText, data.transcript, data.word_count);
+                await this.getAIFeedback(this.currentPromptText, data.transcript, data.word_count, data.speech_duration, data.fluency);
             }
 
         } catch (error) {
@@ -546,7 +547,7 @@ class TOEFLPracticeTool {
         }
     }
 
-    async getAIFeedback(question, transcript, wordCount) {
+    async getAIFeedback(question, transcript, wordCount, speechDuration = null, fluency = null) {
         try {
             const transcriptionDiv = document.getElementById('transcriptionResults');
 
@@ -564,40 +565,43 @@ class TOEFLPracticeTool {
                 </div>
             `;
 
-            const response = await fetch('/evaluate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
+            // Feedback sections are rendered as they stream in
+            let feedbackContent = null;
+            const renderFeedback = (feedbackHtml) => {
+                if (!feedbackContent) {
+                    // Remove loading indicator and display AI feedback
+                    const loadingIndicator = transcriptionDiv.querySelector('.ai-loading');
+                    if (loadingIndicator) loadingIndicator.remove();
+                    transcriptionDiv.insertAdjacentHTML('beforeend', `
+                        <div class="ai-feedback">
+                            <h3>AI Feedback & Evaluation</h3>
+                            <div class="ai-feedback-content"></div>
+                        </div>
+                    `);
+                    feedbackContent = transcriptionDiv.querySelector('.ai-feedback:last-child .ai-feedback-content');
+                }
+                // Parse the feedback and wrap sections in cards
+                feedbackContent.innerHTML = this.formatFeedbackIntoCards(feedbackHtml);
+            };
+
+            let feedback;
+            try {
+                feedback = await FeedbackStream.evaluate('/evaluate', {
                     api_key: this.apiKey,
                     question: question,
                     transcript: transcript,
                     word_count: wordCount,
-                    speaking_time: this.speakingTime
-                })
-            });
-
-            const data = await response.json();
-
-            if (data.error) {
-                transcriptionDiv.innerHTML += `<div class="ai-feedback"><p style="color: red;">AI Feedback Error: ${data.error}</p></div>`;
+                    speaking_time: this.speakingTime,
+                    speech_duration: speechDuration,
+                    fluency: fluency
+                }, renderFeedback);
+            } catch (error) {
+                const loadingIndicator = transcriptionDiv.querySelector('.ai-loading');
+                if (loadingIndicator) loadingIndicator.remove();
+                transcriptionDiv.insertAdjacentHTML('beforeend', `<div class="ai-feedback"><p style="color: red;">AI Feedback Error: ${error.message}</p></div>`);
                 return;
             }
-
-            // Remove loading indicator and display AI feedback
-            const loadingIndicator = transcriptionDiv.querySelector('.ai-loading');
-            if (loadingIndicator) loadingIndicator.remove();
-
-            // Parse the feedback and wrap sections in cards
-            const formattedFeedback = this.formatFeedbackIntoCards(data.feedback);
-
-            transcriptionDiv.innerHTML += `
-                <div class="ai-feedback">
-                    <h3>AI Feedback & Evaluation</h3>
-                    <div class="ai-feedback-content">
-                        ${formattedFeedback}
-                    </div>
-                </div>
-            `;
+            renderFeedback(feedback);
 
             // Add event listeners to save vocabulary buttons
             const saveButtons = transcriptionDiv.querySelectorAll('.save-vocab-btn');
@@ -0,0 +1,113 @@
+// Incremental transcription: uploads MediaRecorder slices while the student
+// is speaking so that only the last few seconds remain to transcribe when
+// the recording stops. Partial transcripts arrive over Server-Sent Events.
+class StreamingTranscriber {
+    // MediaRecorder timeslice (ms) between uploaded slices
+    static TIMESLICE_MS = 4000;
+
+    constructor(onPartial = null) {
+        this.onPartial = onPartial;
+        this.sessionId = null;
+        this.eventSource = null;
+        this.failed = false;
+        this.uploads = Promise.resolve();
+        this.ready = this.open();
+    }
+
+    async open() {
+        try {
+            const response = await fetch('/api/stream/start', { method: 'POST' });
+            const data = await response.json();
+            if (data.error) {
+                console.warn('Incremental transcription unavailable:', data.error);
+                this.failed = true;
+                return;
+            }
+            this.sessionId = data.session_id;
+
+            this.eventSource = new EventSource(`/api/stream/${this.sessionId}/events`);
+            this.eventSource.addEventListener('partial', (event) => {
+                if (this.onPartial) this.onPartial(JSON.parse(event.data));
+            });
+            this.eventSource.addEventListener('final', () => this.closeEvents());
+            this.eventSource.addEventListener('error', () => this.closeEvents());
+        } catch (error) {
+            console.warn('Incremental transcription unavailable:', error);
+            this.failed = true;
+        }
+    }
+
+    // Queue a slice; uploads stay in recording order
+    push(blob) {
+        if (!blob || blob.size === 0) return;
+        this.uploads = this.uploads.then(async () => {
+            await this.ready;
+            if (this.failed) return;
+            try {
+                const formData = new FormData();
+                formData.append('audio', blob);
+                const response = await fetch(`/api/stream/${this.sessionId}/chunk`, {
+                    method: 'POST',
+                    body: formData
+                });
+                const data = await response.json();
+                if (data.error) throw new Error(data.error);
+            } catch (error) {
+                console.warn('Incremental upload failed, falling back to full upload:', error);
+                this.failed = true;
+            }
+        });
+    }
+
+    // Returns { transcript, word_count } (plus mp3_url with { mp3: true }),
+    // or null if the caller should fall back to uploading the whole recording
+    async finish(options = {}) {
+        await this.uploads;
+        if (this.failed || !this.sessionId) {
+            this.closeEvents();
+            return null;
+        }
+        try {
+            const url = `/api/stream/${this.sessionId}/finish` + (options.mp3 ? '?mp3=1' : '');
+            const response = await fetch(url, { method: 'POST' });
+            const data = await response.json();
+            return data.error ? null : data;
+        } catch (error) {
+            console.warn('Incremental transcription failed:', error);
+            return null;
+        } finally {
+            this.closeEvents();
+        }
+    }
+
+    // Hand the session over to a background job (/api/jobs/transcribe):
+    // returns the session id once every slice is uploaded, or null if the
+    // caller should upload the whole recording instead
+    async handOff() {
+        await this.uploads;
+        this.closeEvents();
+        return this.failed ? null : this.sessionId;
+    }
+
+    closeEvents() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
+    // Render partial transcripts into a small box under `container`
+    static liveTranscriptCallback(container) {
+        if (!container) return null;
+        let box = container.querySelector('.live-transcript');
+        if (!box) {
+            box = document.createElement('div');
+            box.className = 'live-transcript';
+            container.appendChild(box);
+        }
+        box.textContent = '';
+        return (data) => {
+            box.textContent = data.transcript;
+        };
+    }
+}
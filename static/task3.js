@@ -8,6 +8,7 @@ class Task3Manager {
         this.hasAudio = false;
         this.mediaRecorder = null;
         this.audioChunks = [];
+        this.streamTranscriber = null;
         this.recordedBlob = null;
         this.currentPhase = 'setup';
         this.readingTimeLeft = 50;
@@ -569,9 +570,12 @@ class Task3Manager {
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
             this.mediaRecorder = new MediaRecorder(stream);
             this.audioChunks = [];
+            this.streamTranscriber = new StreamingTranscriber(
+                StreamingTranscriber.liveTranscriptCallback(recordingPhase));
 
             this.mediaRecorder.ondataavailable = (event) => {
                 this.audioChunks.push(event.data);
+                this.streamTranscriber.push(event.data);
             };
 
             this.mediaRecorder.onstop = () => {
@@ -579,7 +583,7 @@ class Task3Manager {
                 this.processRecording();
             };
 
-            this.mediaRecorder.start();
+            this.mediaRecorder.start(StreamingTranscriber.TIMESLICE_MS);
 
             // Start speaking timer
             const speakingTimerSpan = document.getElementById('speakingTimer');
@@ -638,23 +642,29 @@ class Task3Manager {
         resultsDiv.innerHTML = '<h3>Transcribing your response...</h3>';
 
         try {
-            const formData = new FormData();
-            formData.append('audio', this.recordedBlob);
+            // Most of the recording was already transcribed while speaking
+            let data = this.streamTranscriber ? await this.streamTranscriber.finish() : null;
+            this.streamTranscriber = null;
 
-            const response = await fetch('/transcribe', {
-                method: 'POST',
-                body: formData
-            });
+            if (!data) {
+                const formData = new FormData();
+                formData.append('audio', this.recordedBlob);
 
-            const data = await response.json();
+                const response = await fetch('/transcribe', {
+                    method: 'POST',
+                    body: formData
+                });
+
+                data = await response.json();
+            }
 
             if (data.error) {
                 resultsDiv.innerHTML = `<div class="alert alert-error">Transcription error: ${data.error}</div>`;
                 return;
             }
 
-            const transcript = data.text;
-            const wordCount = transcript.split(/\s+/).filter(w => w.length > 0).length;
+            const transcript = data.transcript;
+            const wordCount = data.word_count;
             const speakingTime = 60 - this.speakingTimeLeft;
 
             // Display transcript
@@ -666,12 +676,13 @@ class Task3Manager {
                         <p><strong>Word count:</strong> ${wordCount} words</p>
                         <p><strong>Speaking time:</strong> ${speakingTime} seconds</p>
                     </div>
+                    ${FluencyStats.html(data.fluency)}
                 </div>
             `;
 
             // Get AI evaluation if API key is provided
             if (this.apiKey) {
-                await this.getAIEvaluation(transcript, wordCount, speakingTime);
+                await this.getAIEvaluation(transcript, wordCount, speakingTime, data.speech_duration, data.fluency);
             } else {
                 resultsDiv.innerHTML += `
                     <div class="alert alert-error">
@@ -685,7 +696,7 @@ class Task3Manager {
         }
     }
 
-    async getAIEvaluation(transcript, wordCount, speakingTime) {
+    async getAIEvaluation(transcript, wordCount, speakingTime, speechDuration = null, fluency = null) {
         const resultsDiv = document.getElementById('transcriptionResults');
 
         // Add loading indicator
@@ -703,40 +714,42 @@ class Task3Manager {
         `;
 
         try {
-            const response = await fetch(`/api/task/${this.taskNumber}/evaluate`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
+            // Feedback sections are rendered as they stream in
+            let feedbackContent = null;
+            const renderFeedback = (feedbackHtml) => {
+                if (!feedbackContent) {
+                    const loadingIndicator = resultsDiv.querySelector('.ai-loading');
+                    if (loadingIndicator) loadingIndicator.remove();
+                    resultsDiv.insertAdjacentHTML('beforeend', `
+                        <div class="ai-feedback">
+                            <h3>AI Feedback & Evaluation</h3>
+                            <div class="ai-feedback-content"></div>
+                        </div>
+                    `);
+                    feedbackContent = resultsDiv.querySelector('.ai-feedback:last-child .ai-feedback-content');
+                }
+                feedbackContent.innerHTML = this.formatFeedbackIntoCards(feedbackHtml);
+            };
+
+            let feedback;
+            try {
+                feedback = await FeedbackStream.evaluate(`/api/task/${this.taskNumber}/evaluate`, {
                     api_key: this.apiKey,
                     transcript: transcript,
                     word_count: wordCount,
                     speaking_time: speakingTime,
+                    speech_duration: speechDuration,
+                    fluency: fluency,
                     reading_text: this.readingText,
                     has_audio: this.hasAudio
-                })
-            });
-
-            const data = await response.json();
-
-            // Remove loading indicator
-            const loadingIndicator = resultsDiv.querySelector('.ai-loading');
-            if (loadingIndicator) loadingIndicator.remove();
-
-            if (data.error) {
-                resultsDiv.innerHTML += `<div class="alert alert-error">AI evaluation error: ${data.error}</div>`;
+                }, renderFeedback);
+            } catch (error) {
+                const loadingIndicator = resultsDiv.querySelector('.ai-loading');
+                if (loadingIndicator) loadingIndicator.remove();
+                resultsDiv.insertAdjacentHTML('beforeend', `<div class="alert alert-error">AI evaluation error: ${error.message}</div>`);
                 return;
             }
-
-            // Format and display feedback in cards
-            const formattedFeedback = this.formatFeedbackIntoCards(data.feedback);
-            resultsDiv.innerHTML += `
-                <div class="ai-feedback">
-                    <h3>AI Feedback & Evaluation</h3>
-                    <div class="ai-feedback-content">
-                        ${formattedFeedback}
-                    </div>
-                </div>
-            `;
+            renderFeedback(feedback);
 
             // Add event listeners to save vocabulary buttons
             const saveButtons = resultsDiv.querySelectorAll('.save-vocab-btn');
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+Storage backends for the user data: task prompt banks, the Task 1 prompts,
+vocabulary cards and the app configuration.
+
+JSONStorage is the historical layout (data/task*/prompts.json, prompts.txt,
+data/vocabulary_cards.json, data/config.json). SQLiteStorage keeps the same
+data in a single SQLite database in WAL mode, so that adding a card or editing
+a prompt is a single-row write instead of rewriting a whole file, and
+concurrent writers cannot overwrite each other's changes.
+
+Both expose the same methods; app.py selects one with STORAGE_BACKEND
+(json, the default, or sqlite). See migrate_storage.py to move data between
+them.
+"""
+
+import json
+import sqlite3
+import threading
+
+from prompt_store import PromptStore, write_atomic
+
+TASK_NUMBERS = [2, 3, 4, 5, 6]
+
+
+class JSONStorage:
+    """One JSON/text file per kind of data"""
+
+    name = 'json'
+
+    def __init__(self, task_files, task1_file, vocabulary_file, config_file):
+        self.prompts = PromptStore(task_files)
+        self.task1_file = task1_file
+        self.vocabulary_file = vocabulary_file
+        self.config_file = config_file
+
+    # Task 2-6 prompts
+
+    def load_task_prompts(self, task_num):
+        return self.prompts.load(task_num)
+
+    def save_task_prompts(self, task_num, data):
+        return self.prompts.save(task_num, data)
+
+    def get_prompt(self, task_num, prompt_id):
+        return self.prompts.get(task_num, prompt_id)
+
+    def first_prompt(self, task_num):
+        return self.prompts.first(task_num)
+
+    def add_prompt(self, task_num, fields):
+        """Store a new prompt; returns it with its id, or None if the write failed"""
+        return self.prompts.add(task_num, fields)
+
+    def update_prompt(self, task_num, prompt_id, changes):
+        prompt = self.prompts.get(task_num, prompt_id)
+        if prompt is None:
+            return False
+        prompt.update(changes)
+        return self.prompts.save(task_num)
+
+    def delete_prompt(self, task_num, prompt_id):
+        return self.prompts.delete(task_num, prompt_id)
+
+    # Task 1 prompts
+
+    def load_task1_prompts(self):
+        try:
+            if self.task1_file.exists():
+                with open(self.task1_file, 'r', encoding='utf-8') as f:
+                    return f.read().strip()
+        except Exception as e:
+            print(f"Error loading prompts: {e}")
+        return ""
+
+    def save_task1_prompts(self, content):
+        with open(self.task1_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return True
+
+    # Vocabulary cards
+
+    def load_vocabulary_cards(self):
+        try:
+            if self.vocabulary_file.exists():
+                with open(self.vocabulary_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading vocabulary cards: {e}")
+        return []
+
+    def save_vocabulary_cards(self, cards):
+        try:
+            write_atomic(self.vocabulary_file, json.dumps(cards, indent=2, ensure_ascii=False))
+            return True
+        except Exception as e:
+            print(f"Error saving vocabulary cards: {e}")
+            return False
+
+    def add_vocabulary_card(self, card):
+        cards = self.load_vocabulary_cards()
+        cards.append(card)
+        return self.save_vocabulary_cards(cards)
+
+    def delete_vocabulary_card(self, index):
+        """Delete the card at `index`; returns the removed card, or None if there is none"""
+        cards = self.load_vocabulary_cards()
+        if not 0 <= index < len(cards):
+            return None
+        card = cards.pop(index)
+        if not self.save_vocabulary_cards(cards):
+            raise RuntimeError('Failed to save')
+        return card
+
+    # Configuration
+
+    def load_config(self):
+        try:
+            if self.config_file.exists():
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+        return {}
+
+    def save_config(self, config):
+        try:
+            write_atomic(self.config_file, json.dumps(config, indent=2, ensure_ascii=False))
+            return True
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            return False
+
+    def set_config_value(self, key, value):
+        config = self.load_config()
+        config[key] = value
+        return self.save_config(config)
+
+
+class SQLiteStorage:
+    """Everything in one SQLite database (WAL mode, one connection per thread)"""
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS prompts (
+            task_num INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (task_num, id)
+        );
+        CREATE TABLE IF NOT EXISTS vocabulary_cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            question TEXT,
+            title TEXT,
+            content TEXT
+        );
+        CREATE TABLE IF NOT EXISTS config (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS documents (
+            name TEXT PRIMARY KEY,
+            content TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._db().executescript(self.SCHEMA)
+
+    def _db(self):
+        """This thread's connection (autocommit mode: plain reads take no lock)"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._db())
+
+    @staticmethod
+    def _prompt(row):
+        return {'id': row['id'], **json.loads(row['data'])}
+
+    @staticmethod
+    def _prompt_data(prompt):
+        return json.dumps({k: v for k, v in prompt.items() if k != 'id'}, ensure_ascii=False)
+
+    # Task 2-6 prompts
+
+    def load_task_prompts(self, task_num):
+        rows = self._db().execute('SELECT id, data FROM prompts WHERE task_num = ? ORDER BY rowid',
+                                  (task_num,)).fetchall()
+        return {'prompts': [self._prompt(row) for row in rows]}
+
+    def save_task_prompts(self, task_num, data):
+        """Replace the whole bank (bulk edits and migration)"""
+        try:
+            with self._transaction() as db:
+                db.execute('DELETE FROM prompts WHERE task_num = ?', (task_num,))
+                db.executemany(
+                    'INSERT INTO prompts (task_num, id, data) VALUES (?, ?, ?)',
+                    [(task_num, prompt['id'], self._prompt_data(prompt)) for prompt in data.get('prompts', [])]
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving Task {task_num} prompts: {e}")
+            return False
+
+    def get_prompt(self, task_num, prompt_id):
+        row = self._db().execute('SELECT id, data FROM prompts WHERE task_num = ? AND id = ?',
+                                 (task_num, prompt_id)).fetchone()
+        return self._prompt(row) if row else None
+
+    def first_prompt(self, task_num):
+        row = self._db().execute('SELECT id, data FROM prompts WHERE task_num = ? ORDER BY rowid LIMIT 1',
+                                 (task_num,)).fetchone()
+        return self._prompt(row) if row else None
+
+    def add_prompt(self, task_num, fields):
+        try:
+            with self._transaction() as db:
+                new_id = db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM prompts WHERE task_num = ?',
+                                    (task_num,)).fetchone()[0]
+                prompt = {'id': new_id, **fields}
+                db.execute('INSERT INTO prompts (task_num, id, data) VALUES (?, ?, ?)',
+                           (task_num, new_id, self._prompt_data(prompt)))
+            return prompt
+        except sqlite3.Error as e:
+            print(f"Error saving Task {task_num} prompt: {e}")
+            return None
+
+    def update_prompt(self, task_num, prompt_id, changes):
+        with self._transaction() as db:
+            row = db.execute('SELECT id, data FROM prompts WHERE task_num = ? AND id = ?',
+                             (task_num, prompt_id)).fetchone()
+            if row is None:
+                return False
+            prompt = self._prompt(row)
+            prompt.update(changes)
+            db.execute('UPDATE prompts SET data = ? WHERE task_num = ? AND id = ?',
+                       (self._prompt_data(prompt), task_num, prompt_id))
+        return True
+
+    def delete_prompt(self, task_num, prompt_id):
+        with self._transaction() as db:
+            db.execute('DELETE FROM prompts WHERE task_num = ? AND id = ?', (task_num, prompt_id))
+        return True
+
+    # Task 1 prompts
+
+    def load_task1_prompts(self):
+        row = self._db().execute("SELECT content FROM documents WHERE name = 'task1_prompts'").fetchone()
+        return row['content'].strip() if row else ""
+
+    def save_task1_prompts(self, content):
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO documents (name, content) VALUES ('task1_prompts', ?)",
+                       (content,))
+        return True
+
+    # Vocabulary cards
+
+    def load_vocabulary_cards(self):
+        rows = self._db().execute('SELECT id, date, question, title, content FROM vocabulary_cards '
+                                  'ORDER BY id').fetchall()
+        return [dict(row) for row in rows]
+
+    def save_vocabulary_cards(self, cards):
+        try:
+            with self._transaction() as db:
+                db.execute('DELETE FROM vocabulary_cards')
+                db.executemany(
+                    'INSERT INTO vocabulary_cards (date, question, title, content) VALUES (?, ?, ?, ?)',
+                    [(card.get('date'), card.get('question'), card.get('title'), card.get('content'))
+                     for card in cards]
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving vocabulary cards: {e}")
+            return False
+
+    def add_vocabulary_card(self, card):
+        with self._transaction() as db:
+            db.execute('INSERT INTO vocabulary_cards (date, question, title, content) VALUES (?, ?, ?, ?)',
+                       (card.get('date'), card.get('question'), card.get('title'), card.get('content')))
+        return True
+
+    def delete_vocabulary_card(self, index):
+        if index < 0:
+            return None
+        with self._transaction() as db:
+            row = db.execute('SELECT id, date, question, title, content FROM vocabulary_cards '
+                             'ORDER BY id LIMIT 1 OFFSET ?', (index,)).fetchone()
+            if row is None:
+                return None
+            db.execute('DELETE FROM vocabulary_cards WHERE id = ?', (row['id'],))
+        return dict(row)
+
+    # Configuration
+
+    def load_config(self):
+        rows = self._db().execute('SELECT key, value FROM config').fetchall()
+        return {row['key']: json.loads(row['value']) for row in rows}
+
+    def save_config(self, config):
+        try:
+            with self._transaction() as db:
+                db.execute('DELETE FROM config')
+                db.executemany('INSERT INTO config (key, value) VALUES (?, ?)',
+                               [(key, json.dumps(value, ensure_ascii=False)) for key, value in config.items()])
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving config: {e}")
+            return False
+
+    def set_config_value(self, key, value):
+        with self._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)',
+                       (key, json.dumps(value, ensure_ascii=False)))
+        return True
+
+
+class _Transaction:
+    """`with` block running in an IMMEDIATE transaction (the connection is in autocommit mode)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def copy_all(source, target):
+    """Copy every kind of data from one backend to another (migration/export)"""
+    counts = {}
+    for task_num in TASK_NUMBERS:
+        data = source.load_task_prompts(task_num)
+        if data.get('prompts') or target.load_task_prompts(task_num).get('prompts'):
+            target.save_task_prompts(task_num, data)
+        counts[f'task{task_num}_prompts'] = len(data.get('prompts', []))
+    target.save_task1_prompts(source.load_task1_prompts())
+    cards = [{key: card.get(key) for key in ('date', 'question', 'title', 'content')}
+             for card in source.load_vocabulary_cards()]
+    target.save_vocabulary_cards(cards)
+    counts['vocabulary_cards'] = len(cards)
+    config = source.load_config()
+    target.save_config(config)
+    counts['config_keys'] = len(config)
+    return counts
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental transcription while the student is still speaking.
+
+The browser uploads MediaRecorder slices every few seconds. Each session keeps
+the recording received so far, and a background thread transcribes the part
+that has not been committed yet, window by window. Segments that may have been
+cut by the end of the window are kept pending and re-transcribed with the next
+slice; the committed text is passed as `initial_prompt` so Whisper keeps the
+context across windows. When recording stops, only the last few seconds are
+left to transcribe. Silence is cut from each window before inference (see
+vad.py), with the segment times mapped back to the recording.
+"""
+
+import json
+import threading
+import time
+import uuid
+
+from audio_utils import SAMPLE_RATE, decode_pcm_and_mp3, decode_to_pcm
+import fluency
+import vad
+import whisper_service
+
+# Minimum amount of new audio (seconds) before running an intermediate pass
+MIN_WINDOW_SECONDS = 8.0
+# Segments ending closer than this to the end of the window may be cut off
+COMMIT_GUARD_SECONDS = 1.0
+# Characters of committed text passed as context to the next window
+PROMPT_CONTEXT_CHARS = 200
+# Sessions without activity for this long are dropped
+SESSION_TTL_SECONDS = 15 * 60
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class StreamSession:
+    """One recording being transcribed incrementally"""
+
+    def __init__(self, ffmpeg_path, options=None, trim_silence=True):
+        self.id = uuid.uuid4().hex
+        self.ffmpeg_path = ffmpeg_path
+        self.options = options or {'language': 'en', 'task': 'transcribe', 'word_timestamps': True,
+                                   'initial_prompt': fluency.FILLER_PROMPT}
+        self.trim_silence = trim_silence
+        self.duration = 0.0
+        self.speech_duration = 0.0
+        self.audio = bytearray()
+        self.chunks = 0
+        self.committed_samples = 0
+        self.segments = []
+        self.events = []
+        self.error = None
+        self.result = None
+        self.mp3 = None
+        self._with_mp3 = False
+        self.last_activity = time.time()
+        self._dirty = False
+        self._finishing = False
+        self._closed = False
+        self._done = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f'stream-{self.id[:8]}', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Client-facing API
+    # ------------------------------------------------------------------
+
+    def add_chunk(self, data):
+        with self._cond:
+            if self._finishing:
+                raise RuntimeError('Recording already finished')
+            self.audio.extend(data)
+            self.chunks += 1
+            self.last_activity = time.time()
+            self._dirty = True
+            self._cond.notify_all()
+
+    def finish(self, timeout=None, with_mp3=False):
+        """
+        Transcribe whatever is left and return the full result. With `with_mp3`,
+        the final decode also produces an MP3 of the whole recording (self.mp3).
+        """
+        with self._cond:
+            self._with_mp3 = with_mp3
+            self._finishing = True
+            self.last_activity = time.time()
+            self._cond.notify_all()
+        if not self._done.wait(timeout):
+            raise TimeoutError('Transcription did not finish in time')
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.result
+
+    def wait_events(self, index, timeout):
+        """Return the events after `index`, blocking up to `timeout` for new ones"""
+        with self._cond:
+            if len(self.events) <= index and not self._done.is_set():
+                self._cond.wait(timeout)
+            return self.events[index:]
+
+    def close(self):
+        """Stop the background thread without transcribing the remaining audio"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    # ------------------------------------------------------------------
+    # Background transcription
+    # ------------------------------------------------------------------
+
+    def _publish(self, event, data):
+        with self._cond:
+            self.events.append((event, data))
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._finishing and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    self._done.set()
+                    self._cond.notify_all()
+                    return
+                final = self._finishing
+                self._dirty = False
+                audio = bytes(self.audio)
+            try:
+                self._transcribe_pending(audio, final)
+            except Exception as e:
+                self.error = str(e)
+                self._publish('error', {'error': self.error})
+                with self._cond:
+                    self._done.set()
+                    self._cond.notify_all()
+                return
+            if final:
+                self.result = whisper_service.format_transcript(self.segments)
+                self.result['duration'] = round(self.duration, 2)
+                self.result['speech_duration'] = round(self.speech_duration, 2)
+                self.result['fluency'] = fluency.metrics(self.segments)
+                if not self.segments:
+                    self.result['warning'] = 'No speech detected in the recording'
+                self._publish('final', self.result)
+                with self._cond:
+                    self._done.set()
+                    self._cond.notify_all()
+                return
+
+    def _transcribe_pending(self, audio_bytes, final):
+        if not audio_bytes:
+            return
+        if final and self._with_mp3:
+            pcm, self.mp3 = decode_pcm_and_mp3(audio_bytes, self.ffmpeg_path)
+        else:
+            pcm = decode_to_pcm(audio_bytes, self.ffmpeg_path)
+        if final:
+            self.duration = len(pcm) / SAMPLE_RATE
+            self.speech_duration = vad.trim(pcm).speech_duration
+        pending = pcm[self.committed_samples:]
+        if len(pending) == 0 or (not final and len(pending) < MIN_WINDOW_SECONDS * SAMPLE_RATE):
+            return
+
+        trimmed = vad.trim(pending) if self.trim_silence else None
+        if trimmed is not None and not trimmed.has_speech:
+            # Silent window (trim() keeps everything when it merely finds little speech);
+            # keep only the end of the window, a word may be starting there
+            keep = 0 if final else int(COMMIT_GUARD_SECONDS * SAMPLE_RATE)
+            self.committed_samples += max(len(pending) - keep, 0)
+            return
+
+        whisper_service.wait_until_ready()
+        # The committed text is the prompt; the first window gets the session's own (the filler prompt)
+        options = dict(self.options)
+        prompt = options.pop('initial_prompt', None)
+        context = ' '.join(segment['text'] for segment in self.segments)[-PROMPT_CONTEXT_CHARS:]
+        result = whisper_service.transcribe(
+            trimmed.audio if trimmed is not None else pending,
+            initial_prompt=context or prompt,
+            verbose=False,
+            **options
+        )
+        segments = trimmed.map_segments(result['segments']) if trimmed is not None else result['segments']
+
+        offset = self.committed_samples / SAMPLE_RATE
+        window_end = len(pending) / SAMPLE_RATE
+        committed_until = None
+        for segment in segments:
+            if not final and segment['end'] > window_end - COMMIT_GUARD_SECONDS:
+                break
+            self.segments.append({
+                'start': offset + segment['start'],
+                'end': offset + segment['end'],
+                'text': segment['text'],
+                'words': [
+                    {'word': word['word'], 'start': offset + word['start'], 'end': offset + word['end']}
+                    for word in segment.get('words') or []
+                ],
+            })
+            committed_until = segment['end']
+
+        if final:
+            self.committed_samples = len(pcm)
+        elif committed_until is not None:
+            self.committed_samples += int(committed_until * SAMPLE_RATE)
+        self._publish('partial', whisper_service.format_transcript(self.segments))
+
+
+def create_session(ffmpeg_path, options=None, trim_silence=True):
+    _expire_sessions()
+    session = StreamSession(ffmpeg_path, options, trim_silence)
+    with _sessions_lock:
+        _sessions[session.id] = session
+    return session
+
+
+def get_session(session_id):
+    with _sessions_lock:
+        return _sessions.get(session_id)
+
+
+def drop_session(session_id):
+    with _sessions_lock:
+        session = _sessions.pop(session_id, None)
+    if session is not None:
+        session.close()
+
+
+def _expire_sessions():
+    now = time.time()
+    with _sessions_lock:
+        for session_id, session in list(_sessions.items()):
+            if now - session.last_activity > SESSION_TTL_SECONDS:
+                del _sessions[session_id]
+                session.close()
+
+
+def sse_events(session, heartbeat=15):
+    """Generator of Server-Sent Events for a session, ending after the final result"""
+    index = 0
+    while True:
+        events = session.wait_events(index, heartbeat)
+        if not events:
+            if session.done:
+                return
+            yield ': keep-alive\n\n'
+            continue
+        for event, data in events:
+            index += 1
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if event in ('final', 'error'):
+                return
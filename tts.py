@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Text-to-speech with pluggable engines and a persistent cache.
+
+Engines:
+  'gtts'   - Google Translate TTS (network, default)
+  'espeak' - espeak-ng / espeak run locally on the CPU
+  'piper'  - piper neural voices run locally on the CPU (needs a .onnx model)
+The local engines produce WAV, which is served as MP3 like the rest of the
+cache, so they are only available when ffmpeg is there to convert it.
+
+The engine chain is read from the "tts" section of data/config.json, e.g.
+    {"tts": {"backend": "gtts", "fallback": ["piper", "espeak"], "latency_budget_ms": 2500}}
+Engines are tried in order until one succeeds. When an engine fails or takes
+longer than the latency budget, it is demoted for a while and local engines
+are tried first, which keeps air-gapped or slow-network machines responsive.
+
+Task 1 questions come from a fixed bank, so every rendering is kept on disk
+under a key derived from (text, lang, engine). Playback of a known question
+is then a local file read. The cache is bounded in size (least recently used
+files go first) and can be filled ahead of time with prerender().
+"""
+
+import io
+import subprocess
+import threading
+import time
+from shutil import which
+
+from cache import DiskCache, make_key
+
+DEFAULT_ENGINE = 'gtts'
+# How long a slow or failing engine stays behind the local ones
+DEMOTION_SECONDS = 300
+
+_cache = None
+_ffmpeg_path = None
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------
+# Engines
+# ----------------------------------------------------------------------
+
+class TTSBackend:
+    """Base class: render(text, lang) -> MP3 bytes"""
+    name = None
+    local = False
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.calls = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.last_latency = None
+        self.demoted_until = 0.0
+
+    def available(self):
+        return True
+
+    def render(self, text, lang):
+        raise NotImplementedError
+
+    def stats(self):
+        successes = self.calls - self.failures
+        return {
+            'local': self.local,
+            'available': self.available(),
+            'calls': self.calls,
+            'failures': self.failures,
+            'avg_latency': round(self.total_time / successes, 3) if successes else None,
+            'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None,
+            'demoted': time.time() < self.demoted_until,
+        }
+
+
+class GTTSBackend(TTSBackend):
+    name = 'gtts'
+
+    def render(self, text, lang):
+        from gtts import gTTS
+
+        mp3_fp = io.BytesIO()
+        gTTS(text=text, lang=lang, timeout=self.settings.get('timeout', 10)).write_to_fp(mp3_fp)
+        return mp3_fp.getvalue()
+
+
+def _wav_to_mp3(wav_data):
+    """Local engines produce WAV; convert it to MP3 (the format cached and served)"""
+    if not _ffmpeg_path:
+        raise RuntimeError('ffmpeg is needed to convert the local engines\' WAV output to MP3')
+    from audio_utils import encode_mp3
+    return encode_mp3(wav_data, _ffmpeg_path, quality=5)
+
+
+class EspeakBackend(TTSBackend):
+    name = 'espeak'
+    local = True
+
+    def executable(self):
+        return self.settings.get('espeak_path') or which('espeak-ng') or which('espeak')
+
+    def available(self):
+        return self.executable() is not None and bool(_ffmpeg_path)
+
+    def render(self, text, lang):
+        executable = self.executable()
+        if not executable:
+            raise RuntimeError('espeak-ng is not installed')
+        voice = self.settings.get('espeak_voice', lang)
+        speed = str(self.settings.get('espeak_speed', 160))
+        process = subprocess.run(
+            [executable, '-v', voice, '-s', speed, '--stdout'],
+            input=text.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            timeout=self.settings.get('timeout', 10)
+        )
+        if process.returncode != 0 or not process.stdout:
+            raise RuntimeError(f"espeak failed: {process.stderr.decode(errors='ignore').strip()}")
+        return _wav_to_mp3(process.stdout)
+
+
+class PiperBackend(TTSBackend):
+    name = 'piper'
+    local = True
+
+    def executable(self):
+        return self.settings.get('piper_path') or which('piper')
+
+    def available(self):
+        return self.executable() is not None and bool(self.settings.get('piper_model')) and bool(_ffmpeg_path)
+
+    def render(self, text, lang):
+        if not self.available():
+            raise RuntimeError('piper is not installed, "piper_model" is not set or ffmpeg is missing')
+        process = subprocess.run(
+            [self.executable(), '--model', self.settings['piper_model'], '--output_file', '-'],
+            input=text.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            timeout=self.settings.get('timeout', 20)
+        )
+        if process.returncode != 0 or not process.stdout:
+            raise RuntimeError(f"piper failed: {process.stderr.decode(errors='ignore').strip()}")
+        return _wav_to_mp3(process.stdout)
+
+
+BACKENDS = {
+    'gtts': GTTSBackend,
+    'espeak': EspeakBackend,
+    'piper': PiperBackend,
+}
+
+
+def get_backend(name, settings=None):
+    """Shared backend instance (keeps per-engine latency statistics)"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS engine: {name}")
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = _backends[name] = BACKENDS[name](settings or {})
+        elif settings is not None:
+            backend.settings = settings
+        return backend
+
+
+def backend_chain(settings=None):
+    """Engine names to try, in order, for the given "tts" config section"""
+    settings = settings or {}
+    primary = settings.get('backend', DEFAULT_ENGINE)
+    chain = [primary] + [name for name in settings.get('fallback', []) if name != primary]
+    now = time.time()
+    if any(get_backend(name, settings).demoted_until > now for name in chain):
+        # Local engines first, then the demoted ones last
+        chain.sort(key=lambda name: (get_backend(name, settings).demoted_until > now,
+                                     not get_backend(name, settings).local))
+    return chain
+
+
+def render(text, lang='en', settings=None):
+    """
+    Synthesize `text` with the first engine of the chain that succeeds.
+    Returns (engine_name, mp3_bytes).
+    """
+    settings = settings or {}
+    budget = settings.get('latency_budget_ms')
+    errors = []
+    for name in backend_chain(settings):
+        backend = get_backend(name, settings)
+        if not backend.available():
+            errors.append(f"{name}: not available")
+            continue
+        backend.calls += 1
+        start = time.perf_counter()
+        try:
+            data = backend.render(text, lang)
+        except Exception as e:
+            backend.failures += 1
+            backend.demoted_until = time.time() + DEMOTION_SECONDS
+            errors.append(f"{name}: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        backend.total_time += elapsed
+        backend.last_latency = elapsed
+        if budget and elapsed * 1000 > budget:
+            backend.demoted_until = time.time() + DEMOTION_SECONDS
+        return name, data
+    raise RuntimeError('No TTS engine could render the text' + (f" ({'; '.join(errors)})" if errors else ''))
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+
+def configure(directory, max_bytes, ffmpeg_path=None):
+    """Set up the on-disk cache (max_bytes = 0 disables it)"""
+    global _cache, _ffmpeg_path
+    _cache = DiskCache(directory, max_bytes, suffix='.mp3') if max_bytes > 0 else None
+    _ffmpeg_path = ffmpeg_path
+
+
+def cache_key(text, lang='en', engine=DEFAULT_ENGINE):
+    return make_key(text.strip(), lang, engine)
+
+
+def synthesize(text, lang='en', settings=None):
+    """
+    Return (key, mp3_bytes, cache_hit). A rendering cached by any engine of
+    the chain is reused; on a miss, the chain renders and the result is cached
+    under the engine that produced it.
+    """
+    text = text.strip()
+    if _cache is not None:
+        for name in backend_chain(settings):
+            key = cache_key(text, lang, name)
+            if _cache.contains(key):
+                data = _cache.get(key)
+                if data is not None:
+                    return key, data, True
+
+    engine, data = render(text, lang, settings)
+    key = cache_key(text, lang, engine)
+    if _cache is not None:
+        _cache.set(key, data)
+    return key, data, False
+
+
+def cached_path(key):
+    """Path of a cached rendering, or None if it is not (or no longer) cached"""
+    if _cache is None or not _cache.contains(key):
+        return None
+    path = _cache.path_for(key)
+    return path if path.exists() else None
+
+
+def invalidate(texts, lang='en'):
+    """Drop the cached audio of the given texts (all engines); returns how many were dropped"""
+    if _cache is None:
+        return 0
+    dropped = 0
+    for text in texts:
+        for engine in BACKENDS:
+            key = cache_key(text, lang, engine)
+            if _cache.contains(key):
+                _cache.delete(key)
+                dropped += 1
+    return dropped
+
+
+def clear():
+    """Drop every cached rendering; returns how many were dropped"""
+    if _cache is None:
+        return 0
+    keys = _cache.keys()
+    for key in keys:
+        _cache.delete(key)
+    return len(keys)
+
+
+def prerender(texts, lang='en', settings=None, force=False, log=print):
+    """Render every text that is not cached yet; returns counters"""
+    counts = {'rendered': 0, 'cached': 0, 'failed': 0}
+    if _cache is None:
+        return counts
+    texts = list(dict.fromkeys(text.strip() for text in texts if text and text.strip()))
+    for i, text in enumerate(texts, 1):
+        if force:
+            invalidate([text], lang)
+        try:
+            _, _, cache_hit = synthesize(text, lang, settings)
+        except Exception as e:
+            counts['failed'] += 1
+            log(f"[{i}/{len(texts)}] failed ({e}): {text[:60]}")
+            continue
+        if cache_hit:
+            counts['cached'] += 1
+        else:
+            counts['rendered'] += 1
+            log(f"[{i}/{len(texts)}] rendered: {text[:60]}")
+    return counts
+
+
+def prerender_in_background(texts, lang='en', settings=None):
+    """Run prerender() in a daemon thread"""
+    texts = list(texts)
+    if not texts or _cache is None:
+        return None
+    thread = threading.Thread(
+        target=prerender, args=(texts, lang, settings),
+        kwargs={'log': lambda message: None},
+        name='tts-prerender', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def stats():
+    with _backends_lock:
+        backends = {name: backend.stats() for name, backend in _backends.items()}
+    return {
+        'cache': _cache.stats() if _cache is not None else None,
+        'backends': backends,
+    }
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Energy-based voice activity detection for student recordings.
+
+Recordings start with the silence of the prep-to-speak transition and contain
+long pauses, which Whisper would otherwise decode 30 s window by 30 s window.
+trim() keeps the speech regions of a 16 kHz float PCM array (with a little
+padding), joins them with a short gap, and returns a TrimmedAudio that maps
+timestamps in the trimmed audio back to the original recording, so the
+'[12.3s]' markers of the transcript stay correct.
+
+The detector compares the energy of 30 ms frames with the recording's own
+noise floor, so it needs no model and adapts to the microphone's gain. The
+threshold never goes above the loudest frames minus PEAK_RANGE_DB: on a noisy
+recording, or one with hardly any pause, the floor is close to the speech
+itself. When less than FALLBACK_SPEECH_SECONDS of speech is found in audio
+that is not silent, trim() returns the recording untouched and Whisper decides.
+"""
+
+import numpy as np
+
+from audio_utils import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+# A frame is speech when it is this many dB above the noise floor...
+THRESHOLD_DB = 12.0
+# ...and above this absolute level (dBFS), so that digital silence stays silence
+MIN_SPEECH_DB = -55.0
+# The threshold stays at least this many dB below the loudest frames
+PEAK_RANGE_DB = 15.0
+# With less speech than this detected, the detector is not trusted
+FALLBACK_SPEECH_SECONDS = 1.0
+# Pauses shorter than this are kept as they are
+MIN_SILENCE_SECONDS = 0.8
+# Speech regions shorter than this are treated as clicks and dropped
+MIN_SPEECH_SECONDS = 0.15
+# Audio kept around each region so that word onsets and endings are not cut
+PAD_SECONDS = 0.2
+# Silence inserted between the regions joined together
+GAP_SECONDS = 0.3
+
+SETTINGS = {
+    'threshold_db': THRESHOLD_DB, 'min_speech_db': MIN_SPEECH_DB, 'min_silence': MIN_SILENCE_SECONDS,
+    'min_speech': MIN_SPEECH_SECONDS, 'pad': PAD_SECONDS, 'gap': GAP_SECONDS,
+    'peak_range_db': PEAK_RANGE_DB, 'fallback': FALLBACK_SPEECH_SECONDS,
+}
+
+
+def frame_energies(audio, frame=int(FRAME_SECONDS * SAMPLE_RATE)):
+    """Energy (dBFS) of consecutive `frame`-sample frames"""
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0)
+    frames = np.asarray(audio[:count * frame], dtype=np.float32).reshape(count, frame)
+    power = np.mean(frames.astype(np.float64) ** 2, axis=1)
+    return 10 * np.log10(power + 1e-12)
+
+
+def speech_regions(audio, sample_rate=SAMPLE_RATE):
+    """[(start_sample, end_sample)] of the speech in `audio`, padded and merged"""
+    frame = int(FRAME_SECONDS * sample_rate)
+    energies = frame_energies(audio, frame)
+    if len(energies) == 0:
+        return []
+    noise_floor = np.percentile(energies, 10)
+    peak = np.percentile(energies, 99)
+    threshold = max(min(noise_floor + THRESHOLD_DB, peak - PEAK_RANGE_DB), MIN_SPEECH_DB)
+    voiced = energies > threshold
+
+    regions = []
+    start = None
+    for index, is_voiced in enumerate(voiced):
+        if is_voiced and start is None:
+            start = index
+        elif not is_voiced and start is not None:
+            regions.append([start * frame, index * frame])
+            start = None
+    if start is not None:
+        regions.append([start * frame, len(voiced) * frame])
+
+    # Bridge short pauses, then drop clicks
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < MIN_SILENCE_SECONDS * sample_rate:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+    merged = [r for r in merged if r[1] - r[0] >= MIN_SPEECH_SECONDS * sample_rate]
+
+    pad = int(PAD_SECONDS * sample_rate)
+    padded = []
+    for start, end in merged:
+        start, end = max(0, start - pad), min(len(audio), end + pad)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    return padded
+
+
+class TrimmedAudio:
+    """Speech-only audio plus the mapping of its timestamps to the original"""
+
+    def __init__(self, audio, pieces, original_samples, sample_rate=SAMPLE_RATE, untrimmed=False):
+        self.audio = audio
+        self.pieces = pieces                # [(trimmed_start, original_start, length)] in samples
+        self.original_samples = original_samples
+        self.sample_rate = sample_rate
+        # True when the detector found too little speech and the whole audio was kept
+        self.untrimmed = untrimmed
+
+    @property
+    def has_speech(self):
+        return bool(self.pieces)
+
+    @property
+    def speech_duration(self):
+        """Seconds of speech (padding included, gaps between regions excluded)"""
+        return sum(length for _, _, length in self.pieces) / self.sample_rate
+
+    @property
+    def original_duration(self):
+        return self.original_samples / self.sample_rate
+
+    def to_original(self, seconds):
+        """Time in the trimmed audio -> time in the original recording"""
+        sample = seconds * self.sample_rate
+        for trimmed_start, original_start, length in reversed(self.pieces):
+            if sample >= trimmed_start:
+                # Times falling in the inserted gap are clamped to the end of the piece
+                return (original_start + min(sample - trimmed_start, length)) / self.sample_rate
+        return self.pieces[0][1] / self.sample_rate if self.pieces else seconds
+
+    def map_segments(self, segments):
+        """Copy of Whisper segments (and their words) moved back to the original timeline"""
+        mapped = []
+        for segment in segments:
+            segment = dict(segment)
+            segment['start'] = self.to_original(segment['start'])
+            segment['end'] = self.to_original(segment['end'])
+            if segment.get('words'):
+                segment['words'] = [
+                    {**word, 'start': self.to_original(word['start']), 'end': self.to_original(word['end'])}
+                    for word in segment['words']
+                ]
+            mapped.append(segment)
+        return mapped
+
+
+def trim(audio, sample_rate=SAMPLE_RATE):
+    """
+    Keep the speech of `audio`, joined by short gaps. If (almost) no speech is
+    found but the audio is not silent, all of it is kept (`untrimmed` is True).
+    """
+    regions = speech_regions(audio, sample_rate)
+    if sum(end - start for start, end in regions) < FALLBACK_SPEECH_SECONDS * sample_rate:
+        energies = frame_energies(audio, int(FRAME_SECONDS * sample_rate))
+        if len(energies) and energies.max() > MIN_SPEECH_DB:
+            audio = np.asarray(audio, dtype=np.float32)
+            return TrimmedAudio(audio, [(0, 0, len(audio))], len(audio), sample_rate, untrimmed=True)
+    gap = np.zeros(int(GAP_SECONDS * sample_rate), dtype=np.float32)
+    parts = []
+    pieces = []
+    position = 0
+    for start, end in regions:
+        if parts:
+            parts.append(gap)
+            position += len(gap)
+        parts.append(np.asarray(audio[start:end], dtype=np.float32))
+        pieces.append((position, start, end - start))
+        position += end - start
+    trimmed = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return TrimmedAudio(trimmed, pieces, len(audio), sample_rate)
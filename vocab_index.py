@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Index of the words the evaluator already suggested alternatives for.
+
+Vocabulary cards store GPT feedback containing lines such as
+    Instead of "good", say "beneficial"
+The evaluation prompts list those words so that the next feedback favours new
+vocabulary. Instead of re-reading and scanning every card on each evaluation,
+the index is built once from the cards and then updated as cards are added or
+deleted, so building a prompt no longer depends on the size of the deck.
+"""
+
+import re
+import threading
+
+SUGGESTION_PATTERN = re.compile(r'Instead of ["\']([^"\']+)["\']')
+
+
+def extract_suggestions(content):
+    return SUGGESTION_PATTERN.findall(content or '')
+
+
+class SuggestionIndex:
+    """Word -> (occurrences, last time seen), ranked by frequency then recency"""
+
+    def __init__(self, load_cards):
+        self._load_cards = load_cards
+        self._words = None      # word -> [count, last_seen]
+        self._seq = 0
+        self._ranked = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._words is None:
+            self._words = {}
+            for card in self._load_cards():
+                self._add(card)
+
+    def _add(self, card):
+        for word in extract_suggestions(card.get('content')):
+            self._seq += 1
+            entry = self._words.setdefault(word, [0, 0])
+            entry[0] += 1
+            entry[1] = self._seq
+        self._ranked = None
+
+    def add_card(self, card):
+        with self._lock:
+            if self._words is not None:
+                self._add(card)
+
+    def remove_card(self, card):
+        with self._lock:
+            if self._words is None:
+                return
+            for word in extract_suggestions(card.get('content')):
+                entry = self._words.get(word)
+                if entry is None:
+                    continue
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    del self._words[word]
+            self._ranked = None
+
+    def reset(self):
+        """Forget everything; the index is rebuilt from the cards on next use"""
+        with self._lock:
+            self._words = None
+            self._ranked = None
+
+    def top(self, limit=15):
+        """The `limit` most suggested words, most recent first among equals"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._ranked is None:
+                self._ranked = sorted(self._words, key=lambda word: (-self._words[word][0], -self._words[word][1]))
+            return self._ranked[:limit]
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._words)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Whisper model lifecycle for the TOEFL practice tool.
+
+Importing whisper pulls in torch, which alone takes several seconds, and
+loading the weights takes even longer. This module defers all of that so
+the Flask app can start serving pages immediately, and loads the model in
+a background thread right after boot.
+
+On CPU, speed is mostly a matter of model size and decoding settings: the
+model can be loaded with its linear layers dynamically quantized to int8, and
+each transcription picks one of the DECODE_PROFILES (benchmarked with
+benchmarks/whisper_benchmark.py).
+"""
+
+import gc
+import threading
+import time
+import warnings
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from inference_pool import InferencePool, PoolBusy
+
+# tiny, base, small, medium, large (or their English-only .en variants)
+WHISPER_MODEL_NAME = "base"
+
+# Whisper decoding options per profile:
+#   'fast'     - greedy, no temperature fallback, no previous-text conditioning
+#   'balanced' - Whisper's defaults (greedy, sampling fallback on bad segments)
+#   'accurate' - beam search, with the default temperature fallback
+DECODE_PROFILES = {
+    'fast': {'beam_size': None, 'best_of': None, 'temperature': 0.0, 'condition_on_previous_text': False},
+    'balanced': {},
+    'accurate': {'beam_size': 5, 'best_of': 5},
+}
+DEFAULT_PROFILE = 'balanced'
+
+# Startup modes:
+#   'background' - start loading in a daemon thread as soon as the app boots
+#   'lazy'       - load on the first transcription request
+#   'eager'      - load synchronously at import time (legacy behaviour)
+STARTUP_MODES = ('background', 'lazy', 'eager')
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_model = None
+_thread = None
+_pool = None
+_state = {
+    'status': 'pending',    # pending -> importing -> loading -> ready | failed
+    'model': WHISPER_MODEL_NAME,
+    'quantized': False,
+    'error': None,
+    'started_at': None,
+    'imported_at': None,
+    'ready_at': None,
+}
+
+
+def load_model(model_name, quantize=False):
+    """
+    whisper.load_model(); with `quantize`, the model is kept on the CPU and its
+    linear layers are replaced by dynamically quantized int8 ones.
+    """
+    import whisper
+
+    if not quantize:
+        return whisper.load_model(model_name)
+
+    import torch
+    from whisper.model import Linear
+
+    model = whisper.load_model(model_name, device='cpu')
+    # Whisper uses its own nn.Linear subclass, which the default mapping does not cover
+    return torch.ao.quantization.quantize_dynamic(
+        model,
+        {torch.nn.Linear: torch.ao.quantization.default_dynamic_qconfig,
+         Linear: torch.ao.quantization.default_dynamic_qconfig},
+        mapping={torch.nn.Linear: torch.ao.nn.quantized.dynamic.Linear,
+                 Linear: torch.ao.nn.quantized.dynamic.Linear},
+        dtype=torch.qint8,
+    )
+
+
+def _load():
+    """Import whisper and load the model, recording progress in _state"""
+    global _model
+    try:
+        _state['status'] = 'importing'
+        import whisper  # noqa: F401
+        _state['imported_at'] = time.time()
+
+        _state['status'] = 'loading'
+        label = f"{_state['model']}{' (int8)' if _state['quantized'] else ''}"
+        print(f"Loading Whisper model '{label}' (this may take a minute)...")
+        model = load_model(_state['model'], _state['quantized'])
+
+        _model = model
+        _state['ready_at'] = time.time()
+        _state['status'] = 'ready'
+        print(f"Whisper model loaded in {_state['ready_at'] - _state['started_at']:.1f}s!")
+    except Exception as e:
+        _state['status'] = 'failed'
+        _state['error'] = str(e)
+        print(f"Error loading Whisper model: {e}")
+    finally:
+        # Wake up waiters even on failure so they can report the error
+        _ready.set()
+
+
+def start_loading(background=True):
+    """Start loading the model once; later calls are no-ops"""
+    global _thread
+    with _lock:
+        if _state['started_at'] is not None:
+            return
+        _state['started_at'] = time.time()
+        if background:
+            _thread = threading.Thread(target=_load, name='whisper-loader', daemon=True)
+            _thread.start()
+            return
+    _load()
+
+
+def _start_pool(workers, max_queue, preload=False, threads=0):
+    """
+    Start the worker processes. Each one loads its own copy of the model, or
+    with `preload` the model is loaded here first and the forked workers share it.
+    """
+    global _pool
+    with _lock:
+        if _state['started_at'] is not None:
+            return
+        _state['started_at'] = time.time()
+        _state['status'] = 'loading'
+
+    model = None
+    if preload:
+        label = f"{_state['model']}{' (int8)' if _state['quantized'] else ''}"
+        print(f"Loading Whisper model '{label}' once for all the workers...")
+        try:
+            model = load_model(_state['model'], _state['quantized'])
+        except Exception as e:
+            _state['status'] = 'failed'
+            _state['error'] = str(e)
+            print(f"Error loading Whisper model: {e}")
+            _ready.set()
+            return
+        _state['imported_at'] = time.time()
+        # The collector writes to the objects it scans, which would copy their
+        # pages into every worker: leave everything allocated so far alone
+        gc.freeze()
+
+    print(f"Starting {workers} Whisper worker process(es)...")
+    _pool = InferencePool(workers, _state['model'], max_queue=max_queue, quantize=_state['quantized'],
+                          model=model, threads=threads)
+    _pool.start()
+
+    def watch():
+        _pool.wait_ready()
+        if _pool.failed:
+            _state['status'] = 'failed'
+            _state['error'] = '; '.join(_pool.failures)
+        else:
+            _state['ready_at'] = time.time()
+            _state['status'] = 'ready'
+            print(f"Whisper pool ready in {_state['ready_at'] - _state['started_at']:.1f}s!")
+        _ready.set()
+
+    threading.Thread(target=watch, name='whisper-pool-watch', daemon=True).start()
+
+
+def configure(model_name=WHISPER_MODEL_NAME, quantize=False):
+    """Choose the model before it starts loading; returns False if it is too late"""
+    with _lock:
+        if _state['started_at'] is not None:
+            return False
+        _state['model'] = model_name
+        _state['quantized'] = bool(quantize)
+        return True
+
+
+def use_model(model, name=None):
+    """Transcribe with an already loaded model (or any object with Whisper's transcribe()), e.g. in benchmarks"""
+    global _model
+    with _lock:
+        _model = model
+        now = time.time()
+        _state['model'] = name or _state['model']
+        _state['started_at'] = _state['started_at'] or now
+        _state['ready_at'] = now
+        _state['status'] = 'ready'
+    _ready.set()
+
+
+def boot(mode='background', workers=0, max_queue=8, preload=False, threads=0):
+    """
+    Apply the configured startup mode when the app starts.
+    With workers > 0, transcription runs in a pool of worker processes
+    instead of the web process; with `preload`, the model is loaded once in
+    this process (synchronously) and shared copy-on-write by the workers.
+    `threads` sets torch's thread count in each worker (0: torch's default).
+    """
+    if mode not in STARTUP_MODES:
+        print(f"Unknown Whisper startup mode '{mode}', using 'background'")
+        mode = 'background'
+    if workers > 0:
+        _start_pool(workers, max_queue, preload=preload, threads=threads)
+        if mode == 'eager':
+            _ready.wait()
+    elif mode == 'eager':
+        start_loading(background=False)
+    elif mode == 'background':
+        start_loading(background=True)
+
+
+def is_ready():
+    return _state['status'] == 'ready'
+
+
+def wait_until_ready(timeout=None):
+    """
+    Wait up to `timeout` seconds for the model (or the worker pool).
+    Returns False if it is still loading after the timeout.
+    Raises RuntimeError if loading failed.
+    """
+    start_loading(background=True)
+    _ready.wait(timeout)
+    if _state['status'] == 'failed':
+        raise RuntimeError(f"Whisper model failed to load: {_state['error']}")
+    return _state['status'] == 'ready'
+
+
+class TranscriptionTimeout(Exception):
+    """Raised when a pooled transcription is not done within its timeout"""
+
+
+def transcribe(audio, timeout=None, **options):
+    """
+    Run Whisper on `audio` (a file path or a 16 kHz float32 array) and return
+    Whisper's result dict. Raises PoolBusy when the worker queue is full and
+    TranscriptionTimeout when the pool does not answer within `timeout`.
+    """
+    if _pool is not None:
+        try:
+            return _pool.submit(audio, **options).result(timeout)
+        except FutureTimeout:
+            raise TranscriptionTimeout(f"Transcription took more than {timeout:g}s, the workers are overloaded")
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
+        return _model.transcribe(audio, **options)
+
+
+def decode_options(profile=None):
+    """Whisper decoding options of a profile (unknown or missing: the default one)"""
+    return dict(DECODE_PROFILES.get(profile or DEFAULT_PROFILE, DECODE_PROFILES[DEFAULT_PROFILE]))
+
+
+def settings():
+    """Model settings that affect transcription output (used in cache keys)"""
+    return {'model': _state['model'], 'quantized': _state['quantized']}
+
+
+def format_transcript(segments):
+    """Build the /transcribe payload: one '[12.3s] text' line per segment"""
+    formatted_transcript = ""
+    word_count = 0
+    for segment in segments:
+        text = segment["text"].strip()
+        word_count += len(text.split())
+        formatted_transcript += f"[{segment['start']:.1f}s] {text}\n"
+    return {'transcript': formatted_transcript, 'word_count': word_count}
+
+
+def status():
+    """Snapshot of the loading progress for /readyz"""
+    now = time.time()
+    snapshot = dict(_state)
+    started = snapshot['started_at']
+    if started is not None:
+        end = snapshot['ready_at'] or now
+        snapshot['elapsed'] = round(end - started, 2)
+    if snapshot['imported_at'] is not None:
+        snapshot['import_time'] = round(snapshot['imported_at'] - started, 2)
+    snapshot['ready'] = snapshot['status'] == 'ready'
+    snapshot['pool'] = _pool.stats() if _pool is not None else None
+    return snapshot